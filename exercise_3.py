@@ -3,6 +3,7 @@ import json
 import uuid
 from collections import defaultdict
 from datetime import timedelta
+from pathlib import Path
 from typing import Mapping
 
 from _constants import (
@@ -32,20 +33,10 @@ from openbus_light.plan import (
     LinePlanningNetwork,
     LinePlanningParameters,
     LPPData,
+    LPPResult,
     create_line_planning_problem,
     create_summary,
 )
-from openbus_light.plot import (
-    PlotBackground,
-    create_colormap,
-    create_station_and_demand_plot,
-    create_station_and_line_plot,
-    plot_lines_in_swiss_coordinates,
-    plot_network_in_swiss_coordinate_grid,
-    plot_network_usage_in_swiss_coordinates,
-    plot_usage_for_each_direction,
-)
-from openbus_light.plot.demand import create_od_plot
 
 
 def get_paths() -> ScenarioPaths:
@@ -128,10 +119,13 @@ def update_scenario(
     return update_frequencies(updated_scenario, new_frequencies_by_line_id)
 
 
-def do_the_line_planning(experiment_id: str, use_current_frequencies: bool, parameters: LinePlanningParameters) -> None:
+def do_the_line_planning(
+    experiment_id: str, use_current_frequencies: bool, parameters: LinePlanningParameters, create_plots: bool = True
+) -> None:
     """
     Do the line planning. If an optimal solution is found, plot available v.s. used capacity
         for each line, and summary of the planning. Otherwise, raise warning.
+    :param create_plots: bool, whether to plot the scenario and the result, or only write the summary
     :return: None
     """
     paths = get_paths()
@@ -147,16 +141,8 @@ def do_the_line_planning(experiment_id: str, use_current_frequencies: bool, para
     )
 
     (dump_path := (RESULT_DIRECTORY / experiment_id)).mkdir(parents=True, exist_ok=True)
-    figure = create_station_and_demand_plot(
-        stations=planning_data.scenario.stations, plot_background=PlotBackground(WINTERTHUR_IMAGE, GPS_BOX)
-    )
-    figure.savefig(dump_path / "stations_and_caught_demand.jpg", dpi=900)
-    figure = create_od_plot(planning_data.scenario.demand_matrix, planning_data.scenario.stations)
-    figure.write_html(dump_path / "origin_destination_matrix.html")
-    figure = plot_network_in_swiss_coordinate_grid(
-        planning_data.network, create_colormap([line.number for line in planning_data.scenario.bus_lines])
-    )
-    figure.write_html(dump_path / "network_in_swiss_coordinates.html")
+    if create_plots:
+        plot_the_scenario(planning_data, dump_path)
 
     lpp = create_line_planning_problem(planning_data)
     print("Solving the line planning problem...")
@@ -170,6 +156,54 @@ def do_the_line_planning(experiment_id: str, use_current_frequencies: bool, para
     with open(dump_path / f"{experiment_id}.Summary.json", "w") as f:
         json.dump(create_summary(planning_data, result), f, indent=4)
 
+    if create_plots:
+        plot_the_result(planning_data, result, dump_path)
+
+
+def plot_the_scenario(planning_data: LPPData, dump_path: Path) -> None:
+    """
+    Plot the stations with their caught demand, the origin destination matrix and the network.
+    :param planning_data: LPPData
+    :param dump_path: Path, the directory to save the plots to
+    :return: None
+    """
+    # the plotting libraries are only imported when plotting, runs with --no_plots start faster
+    from openbus_light.plot import (
+        PlotBackground,
+        create_colormap,
+        create_od_plot,
+        create_station_and_demand_plot,
+        plot_network_in_swiss_coordinate_grid,
+    )
+
+    figure = create_station_and_demand_plot(
+        stations=planning_data.scenario.stations, plot_background=PlotBackground(WINTERTHUR_IMAGE, GPS_BOX)
+    )
+    figure.savefig(dump_path / "stations_and_caught_demand.jpg", dpi=900)
+    figure = create_od_plot(planning_data.scenario.demand_matrix, planning_data.scenario.stations)
+    figure.write_html(dump_path / "origin_destination_matrix.html")
+    figure = plot_network_in_swiss_coordinate_grid(
+        planning_data.network, create_colormap([line.number for line in planning_data.scenario.bus_lines])
+    )
+    figure.write_html(dump_path / "network_in_swiss_coordinates.html")
+
+
+def plot_the_result(planning_data: LPPData, result: LPPResult, dump_path: Path) -> None:
+    """
+    Plot available v.s. used capacity for each line, the lines and the usage of the network.
+    :param planning_data: LPPData
+    :param result: LPPResult, a successful result of the line planning problem
+    :param dump_path: Path, the directory to save the plots to
+    :return: None
+    """
+    from openbus_light.plot import (
+        PlotBackground,
+        create_station_and_line_plot,
+        plot_lines_in_swiss_coordinates,
+        plot_network_usage_in_swiss_coordinates,
+        plot_usage_for_each_direction,
+    )
+
     for line, passengers in result.solution.passengers_per_link.items():
         plot_usage_for_each_direction(line, passengers).write_html(
             (dump_path / f"available_vs_used_capacity_for_line_{line.number}.html")
@@ -283,10 +317,19 @@ def main() -> None:
         default=False,
         help="Use the current frequencies of the lines in the line planning problem.",
     )
+    parser.add_argument(
+        "--no_plots",
+        "--no-plots",
+        action="store_true",
+        default=False,
+        help="Only solve and write the summary, skips the plots (and importing the plotting libraries).",
+    )
     args = parser.parse_args()
 
     experiment_id = args.experiment_id if args.experiment_id is not None else str(uuid.uuid4())
-    do_the_line_planning(experiment_id, args.use_current_frequencies, _convert_args_to_parameters(args))
+    do_the_line_planning(
+        experiment_id, args.use_current_frequencies, _convert_args_to_parameters(args), not args.no_plots
+    )
 
 
 if __name__ == "__main__":
@@ -1,22 +1,18 @@
 import os
 import pickle
 import tempfile
-from collections import defaultdict
 from datetime import timedelta
 from typing import AbstractSet
 
-import pandas as pd
 import plotly.graph_objects as go
 from _constants import RESULT_DIRECTORY
 from exercise_3 import get_paths
-from pandas import DataFrame
-from tqdm import tqdm
 
+from openbus_light.analyse import calculate_dwell_times_by_station, calculate_trip_times_by_station_pair
 from openbus_light.manipulate import load_scenario
 from openbus_light.manipulate.recorded_trip import enrich_lines_with_recorded_trips
-from openbus_light.model import CHF, BusLine, CHFPerHour, LineFrequency, LineNr, Meter, MeterPerSecond, RecordedTrip
+from openbus_light.model import CHF, BusLine, CHFPerHour, LineFrequency, LineNr, Meter, MeterPerSecond
 from openbus_light.plan import LinePlanningParameters
-from openbus_light.utils import pairwise
 
 
 def configure_parameters() -> LinePlanningParameters:
@@ -37,48 +33,6 @@ def configure_parameters() -> LinePlanningParameters:
     )
 
 
-def calculate_trip_times(recorded_trip: RecordedTrip) -> pd.DataFrame:
-    """
-    Calculate the planned and observed trip times between consecutive stops in a recorded trip.
-    :param recorded_trip: RecordedTrip, contains trip information
-    :return: pd.DataFrame, contains two columns, each recording the planned and observed trip time
-    """
-    trip_time_planned = (
-        arrival - departure
-        for departure, arrival in zip(
-            recorded_trip.record["departure_planned"][:-1], recorded_trip.record["arrival_planned"][1:]
-        )
-    )
-    trip_time_observed = (
-        arrival - departure
-        for departure, arrival in zip(
-            recorded_trip.record["departure_observed"][:-1], recorded_trip.record["arrival_observed"][1:]
-        )
-    )
-    return pd.DataFrame({"trip_time_planned": trip_time_planned, "trip_time_observed": trip_time_observed})
-
-
-def calculate_dwell_times(recorded: RecordedTrip) -> DataFrame:
-    """
-    Calculate the planned and observed dwell time at each stop in a recorded trip.
-    :param recorded: RecordedTrip, contains trip information
-    :return: DataFrame, contains two columns, each recording the planned and observed dwell time
-    """
-    dwell_time_planned = (
-        departure - arrival
-        for arrival, departure in zip(
-            recorded.record["arrival_planned"][1:-1], recorded.record["departure_planned"][1:-1]
-        )
-    )
-    dwell_time_observed = (
-        departure - arrival
-        for arrival, departure in zip(
-            recorded.record["arrival_observed"][1:-1], recorded.record["departure_observed"][1:-1]
-        )
-    )
-    return pd.DataFrame({"dwell_time_planned": dwell_time_planned, "dwell_time_observed": dwell_time_observed})
-
-
 def load_bus_lines_with_measurements(selected: AbstractSet[LineNr]) -> tuple[BusLine, ...]:
     """
     Load the bus lines with recorded measurements, enrich lines with recorded trips, and cache the result.
@@ -110,24 +64,18 @@ def analysis_template(selected_line_numbers: AbstractSet[LineNr]) -> None:
     """
     for line in load_bus_lines_with_measurements(selected_line_numbers):
         for direction in (line.direction_up, line.direction_down):
-            trip_times_by_station_pair = defaultdict(list)
-            dwell_times_by_station = defaultdict(list)
-            for trip in tqdm(direction.recorded_trips, desc=f"Analyzing {line.number} {direction.name}"):
-                stations = trip.record["station_name"]
-                observed_trip_times = calculate_trip_times(trip)["trip_time_observed"]
-                for (a, b), trip_time in zip(pairwise(stations), observed_trip_times):
-                    trip_times_by_station_pair[(a, b)].append(trip_time.total_seconds())
-                observed_dwell_times = calculate_dwell_times(trip)["dwell_time_observed"]
-                for dwell_time, station in zip(observed_dwell_times, stations):
-                    dwell_times_by_station[station].append(dwell_time.total_seconds())
+            trip_times_by_station_pair = calculate_trip_times_by_station_pair(direction.recorded_trip_table)
+            # each dwell time belongs to the station where it is observed (earlier versions of this exercise paired
+            # the dwell time of a stop with the station before it, so the dwell time plots differ from theirs)
+            dwell_times_by_station = calculate_dwell_times_by_station(direction.recorded_trip_table)
 
             # Now, let's create the violin plot for the trip times.
             fig = go.Figure()
 
             # Adding a violin plot for each station pair.
             for a, b in direction.station_names_as_pairs:
-                observed_dwell_times = trip_times_by_station_pair[(a, b)]
-                fig.add_trace(go.Violin(y=observed_dwell_times, name=f"{a} to {b} (n={len(observed_dwell_times)})"))
+                observed_trip_times = trip_times_by_station_pair.observed_of((a, b))
+                fig.add_trace(go.Violin(y=observed_trip_times, name=f"{a} to {b} (n={len(observed_trip_times)})"))
 
             fig.update_layout(
                 title=f"Observed Trip Times for line {line.name}, direction {direction.name}",
@@ -143,7 +91,7 @@ def analysis_template(selected_line_numbers: AbstractSet[LineNr]) -> None:
 
             # Adding a violin plot for each station.
             for station in direction.station_sequence:
-                observed_dwell_times = dwell_times_by_station[station]
+                observed_dwell_times = dwell_times_by_station.observed_of(station)
                 fig.add_trace(go.Violin(y=observed_dwell_times, name=f"{station} (n={len(observed_dwell_times)})"))
 
             fig.update_layout(
@@ -0,0 +1,43 @@
+from typing import TYPE_CHECKING
+
+from ..utils import lazy_exports
+
+if TYPE_CHECKING:
+    from .delay_cube import BINS_PER_DAY, DELAY_KINDS, DelayCube, DelaySlice
+    from .headway import BunchingEvents, HeadwayRegularity, analyse_headways
+    from .quantile_sketch import QuantileSketch
+    from .running_time import (
+        GroupedTimes,
+        RunningTimeSketches,
+        calculate_dwell_times_by_station,
+        calculate_trip_times_by_station_pair,
+    )
+    from .stop_alignment import StopAlignment, align_recorded_trips
+    from .vehicle_block import (
+        VehicleBlocks,
+        VehicleRequirement,
+        compare_vehicle_requirements,
+        reconstruct_vehicle_blocks,
+    )
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        ".delay_cube": ("BINS_PER_DAY", "DELAY_KINDS", "DelayCube", "DelaySlice"),
+        ".headway": ("BunchingEvents", "HeadwayRegularity", "analyse_headways"),
+        ".quantile_sketch": ("QuantileSketch",),
+        ".running_time": (
+            "GroupedTimes",
+            "RunningTimeSketches",
+            "calculate_dwell_times_by_station",
+            "calculate_trip_times_by_station_pair",
+        ),
+        ".stop_alignment": ("StopAlignment", "align_recorded_trips"),
+        ".vehicle_block": (
+            "VehicleBlocks",
+            "VehicleRequirement",
+            "compare_vehicle_requirements",
+            "reconstruct_vehicle_blocks",
+        ),
+    },
+)
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+from typing import Iterable, NamedTuple, Optional
+
+import numpy as np
+
+from ..model import BusLine, DirectionName, LineName, RecordedTripTable, StationName
+
+BINS_PER_DAY = 96
+DELAY_KINDS = ("arrival", "departure")
+DEFAULT_DELAY_EDGES = np.arange(-300, 1801, 60, dtype=np.float64)
+_NANOSECONDS_PER_BIN = 24 * 3600 * 10**9 // BINS_PER_DAY
+
+
+class DelaySlice(NamedTuple):
+    """
+    The delays of a slice of the cube, per bin of the time of day: the number of delays, their sum in seconds
+        and their histogram over ``edges`` (with a first column for smaller and a last column for larger delays).
+    """
+
+    counts: np.ndarray
+    sums: np.ndarray
+    histograms: np.ndarray
+    edges: np.ndarray
+
+    @property
+    def means(self) -> np.ndarray:
+        """
+        Get the mean delay per bin.
+        :return: np.ndarray, the mean delay in seconds (NaN if there is no delay in the bin)
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.sums / self.counts
+
+    def quantile(self, fraction: float) -> np.ndarray:
+        """
+        Estimate a quantile of the delays per bin, interpolating linearly within the histogram bucket.
+        :param fraction: float, the quantile, in [0, 1]
+        :return: np.ndarray, the delay in seconds, clipped to the edges (NaN if there is no delay in the bin)
+        """
+        cumulative = np.cumsum(self.histograms, axis=1)
+        target = fraction * self.counts
+        bucket = np.argmax(cumulative >= target[:, None], axis=1)
+        within = np.take_along_axis(self.histograms, bucket[:, None], axis=1)[:, 0]
+        below = np.take_along_axis(cumulative, bucket[:, None], axis=1)[:, 0] - within
+        lower = self.edges[np.clip(bucket - 1, 0, len(self.edges) - 1)]
+        upper = self.edges[np.clip(bucket, 0, len(self.edges) - 1)]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            share = np.clip((target - below) / within, 0.0, 1.0)
+        return np.where(self.counts > 0, lower + np.nan_to_num(share) * (upper - lower), np.nan)
+
+
+class DelayCube:
+    """
+    The observed minus planned arrival and departure delays of recorded trips, aggregated in cells of
+        (line, direction, station, kind of delay, bin of 15 minutes of the planned time of day). Each cell holds
+        the number and sum of its delays and their histogram, such that cubes can be extended by new trips or
+        merged, and a slice costs the number of its cells, not of the delays.
+    """
+
+    def __init__(self, delay_edges: np.ndarray = DEFAULT_DELAY_EDGES) -> None:
+        """
+        :param delay_edges: np.ndarray, the ascending edges of the buckets of the histograms, in seconds
+        """
+        self._edges = np.asarray(delay_edges, dtype=np.float64)
+        self._cells: dict[tuple[LineName, DirectionName, StationName], int] = {}
+        self._counts = np.zeros((0, len(DELAY_KINDS), BINS_PER_DAY), dtype=np.int64)
+        self._sums = np.zeros((0, len(DELAY_KINDS), BINS_PER_DAY), dtype=np.float64)
+        self._histograms = np.zeros((0, len(DELAY_KINDS), BINS_PER_DAY, len(self._edges) + 1), dtype=np.int64)
+
+    @property
+    def cells(self) -> tuple[tuple[LineName, DirectionName, StationName], ...]:
+        return tuple(self._cells)
+
+    def add_lines(self, lines: Iterable[BusLine]) -> None:
+        """
+        Add the delays of the recorded trips of both directions of lines.
+        :param lines: Iterable[BusLine], lines with recorded trips
+        """
+        for line in lines:
+            for direction in (line.direction_up, line.direction_down):
+                self.add_recorded_trips(line.name, direction.name, direction.recorded_trip_table)
+
+    def add_recorded_trips(self, line: LineName, direction: DirectionName, table: RecordedTripTable) -> None:
+        """
+        Add the delays at the stops of recorded trips, stops without planned or observed time are skipped.
+        :param line: LineName, the line of the trips
+        :param direction: DirectionName, the direction of the trips
+        :param table: RecordedTripTable, the stops of the trips
+        """
+        cell_of_station = np.array(
+            [self._add_cell((line, direction, station)) for station in table.station_names], dtype=np.int64
+        )
+        cell_of_stop = cell_of_station[table.station_ids]
+        for kind, (planned, observed) in enumerate(
+            ((table.arrival_planned, table.arrival_observed), (table.departure_planned, table.departure_observed))
+        ):
+            is_recorded = ~(np.isnat(planned.view("datetime64[ns]")) | np.isnat(observed.view("datetime64[ns]")))
+            planned, observed = planned[is_recorded], observed[is_recorded]
+            cells = (cell_of_stop[is_recorded] * len(DELAY_KINDS) + kind) * BINS_PER_DAY + (
+                planned // _NANOSECONDS_PER_BIN
+            ) % BINS_PER_DAY
+            delays = (observed - planned) / 1e9
+            _add_by_index(self._counts.reshape(-1), cells, np.ones(len(cells), dtype=np.int64))
+            _add_by_index(self._sums.reshape(-1), cells, delays)
+            buckets = cells * (len(self._edges) + 1) + np.searchsorted(self._edges, delays, side="right")
+            _add_by_index(self._histograms.reshape(-1), buckets, np.ones(len(buckets), dtype=np.int64))
+
+    def merge(self, other: DelayCube) -> DelayCube:
+        """
+        Merge two cubes with the same edges into a new one.
+        :param other: DelayCube, the cube to merge with
+        :return: DelayCube
+        """
+        if not np.array_equal(self._edges, other._edges):  # pylint: disable=protected-access
+            raise ValueError("only cubes with the same delay edges can be merged")
+        merged = DelayCube(self._edges)
+        for cube in (self, other):
+            # pylint: disable=protected-access
+            rows = np.array([merged._add_cell(cell) for cell in cube._cells], dtype=np.int64)
+            merged._counts[rows] += cube._counts[: len(rows)]
+            merged._sums[rows] += cube._sums[: len(rows)]
+            merged._histograms[rows] += cube._histograms[: len(rows)]
+        return merged
+
+    def slice(
+        self,
+        kind: str,
+        line: Optional[LineName] = None,
+        direction: Optional[DirectionName] = None,
+        station: Optional[StationName] = None,
+    ) -> DelaySlice:
+        """
+        Aggregate the delays of the cells that match the given line, direction and station.
+        :param kind: str, one of ``DELAY_KINDS``
+        :param line: Optional[LineName], the line, all lines if None
+        :param direction: Optional[DirectionName], the direction, all directions if None
+        :param station: Optional[StationName], the station, all stations if None
+        :return: DelaySlice, the delays per bin of the time of day
+        """
+        if kind not in DELAY_KINDS:
+            raise KeyError(f"{kind} is not one of {DELAY_KINDS}")
+        rows = np.array(
+            [
+                row
+                for (line_name, direction_name, station_name), row in self._cells.items()
+                if line in (None, line_name) and direction in (None, direction_name) and station in (None, station_name)
+            ],
+            dtype=np.int64,
+        )
+        selected_kind = DELAY_KINDS.index(kind)
+        return DelaySlice(
+            counts=self._counts[rows, selected_kind].sum(axis=0),
+            sums=self._sums[rows, selected_kind].sum(axis=0),
+            histograms=self._histograms[rows, selected_kind].sum(axis=0),
+            edges=self._edges,
+        )
+
+    def _add_cell(self, cell: tuple[LineName, DirectionName, StationName]) -> int:
+        """
+        Get the row of a cell, the arrays are grown (by doubling) if it is new.
+        :param cell: tuple[LineName, DirectionName, StationName], the line, direction and station
+        :return: int, the row of the cell
+        """
+        if cell in self._cells:
+            return self._cells[cell]
+        row = len(self._cells)
+        if row == len(self._counts):
+            self._counts = _grow(self._counts)
+            self._sums = _grow(self._sums)
+            self._histograms = _grow(self._histograms)
+        self._cells[cell] = row
+        return row
+
+
+def _grow(array: np.ndarray) -> np.ndarray:
+    """
+    Double the number of rows of an array (at least 8), the new rows are zero.
+    :param array: np.ndarray, the array
+    :return: np.ndarray, the larger array
+    """
+    return np.concatenate((array, np.zeros((max(len(array), 8), *array.shape[1:]), dtype=array.dtype)))
+
+
+def _add_by_index(target: np.ndarray, indices: np.ndarray, values: np.ndarray) -> None:
+    """
+    Add values to the entries of an array (in place), summing the values of equal indices first, such that
+        the cost depends on the number of values and not on the size of the array.
+    :param target: np.ndarray, the (flat) array to add to
+    :param indices: np.ndarray, the entry of each value
+    :param values: np.ndarray, the values to add
+    """
+    unique_indices, position = np.unique(indices, return_inverse=True)
+    target[unique_indices] += np.bincount(position, weights=values, minlength=len(unique_indices)).astype(target.dtype)
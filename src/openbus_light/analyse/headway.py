@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+from ..model import BusLine, DirectionName, LineName, StationName
+
+_NANOSECONDS_PER_DAY = 24 * 3600 * 10**9
+_NAT = np.datetime64("NaT", "ns").view(np.int64)
+
+
+class HeadwayRegularity(NamedTuple):
+    """
+    The observed headways at each (line, direction, station) of ``keys``, per bin of the time of day of the
+        later departure: their number, mean in seconds and coefficient of variation (NaN without headways).
+    """
+
+    keys: tuple[tuple[LineName, DirectionName, StationName], ...]
+    counts: np.ndarray
+    means: np.ndarray
+    coefficients_of_variation: np.ndarray
+
+
+class BunchingEvents(NamedTuple):
+    """
+    Departures that follow the previous one at the same (line, direction, station) much closer than planned:
+        the index into the keys, the (later) observed departure, and the observed and planned headway in seconds.
+    """
+
+    keys: tuple[tuple[LineName, DirectionName, StationName], ...]
+    key_indices: np.ndarray
+    departures: np.ndarray
+    observed_headways: np.ndarray
+    planned_headways: np.ndarray
+
+
+def analyse_headways(
+    lines: Iterable[BusLine],
+    bin_duration: timedelta = timedelta(hours=1),
+    bunching_share: float = 0.25,
+    maximal_headway: timedelta = timedelta(hours=2),
+) -> tuple[HeadwayRegularity, BunchingEvents]:
+    """
+    Sort the observed departures of the recorded trips of lines (e.g. from ``enrich_lines_with_recorded_trips``)
+        per (line, direction, station) and calculate the headways between consecutive departures at once.
+    :param lines: Iterable[BusLine], lines with recorded trips
+    :param bin_duration: timedelta, the bins of the time of day, must divide a day
+    :param bunching_share: float, a headway shorter than this share of the planned headway is bunching
+    :param maximal_headway: timedelta, longer gaps (e.g. over night) are not headways
+    :return: tuple[HeadwayRegularity, BunchingEvents], the regularity per bin and the bunching events
+    """
+    bin_in_nanoseconds = int(bin_duration.total_seconds() * 10**9)
+    if bin_in_nanoseconds <= 0 or _NANOSECONDS_PER_DAY % bin_in_nanoseconds != 0:
+        raise ValueError(f"{bin_duration=} must divide a day")
+    bins_per_day = _NANOSECONDS_PER_DAY // bin_in_nanoseconds
+    keys, key_of_stop, observed, planned = _gather_departures(lines)
+    headway_key, later_departure, observed_headways, planned_headways = _find_headways(
+        key_of_stop, observed, planned, maximal_headway
+    )
+    with np.errstate(invalid="ignore"):
+        is_bunched = observed_headways < bunching_share * planned_headways
+    return (
+        _calculate_regularity(
+            keys, headway_key, later_departure // bin_in_nanoseconds, observed_headways, bins_per_day
+        ),
+        BunchingEvents(
+            keys=keys,
+            key_indices=headway_key[is_bunched],
+            departures=later_departure[is_bunched].view("datetime64[ns]"),
+            observed_headways=observed_headways[is_bunched],
+            planned_headways=planned_headways[is_bunched],
+        ),
+    )
+
+
+def _find_headways(
+    key_of_stop: np.ndarray, observed: np.ndarray, planned: np.ndarray, maximal_headway: timedelta
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sort the departures by key and observed time, and take the differences of consecutive departures of a key.
+    :param key_of_stop: np.ndarray, the index of the key of each departure
+    :param observed: np.ndarray, the observed departures (int64 nanoseconds)
+    :param planned: np.ndarray, the planned departures (int64 nanoseconds, NaT if not planned)
+    :param maximal_headway: timedelta, longer gaps are not headways
+    :return: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray], per headway the index of its key, the later
+        observed departure, and the observed and planned headway in seconds (NaN if not planned)
+    """
+    order = np.lexsort((observed, key_of_stop))
+    key_of_stop, observed, planned = key_of_stop[order], observed[order], planned[order]
+    observed_headways = np.diff(observed) / 1e9
+    planned_headways = np.where(
+        (planned[1:] == _NAT) | (planned[:-1] == _NAT), np.nan, (planned[1:] - planned[:-1]) / 1e9
+    )
+    is_headway = (key_of_stop[1:] == key_of_stop[:-1]) & (observed_headways <= maximal_headway.total_seconds())
+    return (
+        key_of_stop[1:][is_headway],
+        observed[1:][is_headway],
+        observed_headways[is_headway],
+        planned_headways[is_headway],
+    )
+
+
+def _calculate_regularity(
+    keys: tuple[tuple[LineName, DirectionName, StationName], ...],
+    headway_key: np.ndarray,
+    headway_bin: np.ndarray,
+    headways: np.ndarray,
+    bins_per_day: int,
+) -> HeadwayRegularity:
+    """
+    Aggregate the number, sum and sum of squares of the headways per key and bin of the time of day.
+    :param keys: tuple, the (line, direction, station) keys
+    :param headway_key: np.ndarray, the index of the key of each headway
+    :param headway_bin: np.ndarray, the bin since the epoch of the later departure of each headway
+    :param headways: np.ndarray, the headways in seconds
+    :param bins_per_day: int, the number of bins of the time of day
+    :return: HeadwayRegularity
+    """
+    cells = headway_key * bins_per_day + headway_bin % bins_per_day
+    shape, size = (len(keys), bins_per_day), len(keys) * bins_per_day
+    counts = np.bincount(cells, minlength=size).reshape(shape)
+    sums = np.bincount(cells, weights=headways, minlength=size).reshape(shape)
+    squares = np.bincount(cells, weights=headways**2, minlength=size).reshape(shape)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+        deviations = np.sqrt(np.maximum(squares / counts - means**2, 0.0))
+        return HeadwayRegularity(keys=keys, counts=counts, means=means, coefficients_of_variation=deviations / means)
+
+
+def _gather_departures(
+    lines: Iterable[BusLine],
+) -> tuple[tuple[tuple[LineName, DirectionName, StationName], ...], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Gather the stops with an observed departure of the recorded trips of both directions of lines.
+    :param lines: Iterable[BusLine], lines with recorded trips
+    :return: tuple, the (line, direction, station) keys, and per stop the index of its key, the observed and
+        the planned departure (int64 nanoseconds, NaT if not planned)
+    """
+    keys: list[tuple[LineName, DirectionName, StationName]] = []
+    key_of_stop, observed, planned = [np.empty(0, np.int64)], [np.empty(0, np.int64)], [np.empty(0, np.int64)]
+    for line in lines:
+        for direction in (line.direction_up, line.direction_down):
+            table = direction.recorded_trip_table
+            is_observed = table.departure_observed != _NAT
+            key_of_station = len(keys) + np.arange(len(table.station_names), dtype=np.int64)
+            keys.extend((line.name, direction.name, station) for station in table.station_names)
+            key_of_stop.append(key_of_station[table.station_ids[is_observed]])
+            observed.append(np.asarray(table.departure_observed[is_observed], dtype=np.int64))
+            planned.append(np.asarray(table.departure_planned[is_observed], dtype=np.int64))
+    return tuple(keys), np.concatenate(key_of_stop), np.concatenate(observed), np.concatenate(planned)
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import math
+from typing import Sequence
+
+import numpy as np
+
+_CAPACITY_DECAY = 2 / 3
+
+
+class QuantileSketch:
+    """
+    A KLL sketch of the quantiles of a stream of values, whose memory is bounded by about ``3 * k`` values,
+        independent of the number of values added. The values of level ``h`` stand for ``2**h`` values each.
+        Sketches can be merged, e.g. the sketches of different files or processes, and pickled.
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0) -> None:
+        """
+        Create an empty sketch, a larger ``k`` gives more accurate quantiles.
+        :param k: int, the capacity of the highest level
+        :param seed: int, seeds the choice of the values that are kept when a level is compacted
+        """
+        if k < 2:
+            raise ValueError(f"k must be at least 2, not {k}")
+        self._k = k
+        self._levels: list[np.ndarray] = [np.empty(0, dtype=np.float64)]
+        self._count = 0
+        self._random = np.random.default_rng(seed)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def __len__(self) -> int:
+        return sum(len(level) for level in self._levels)
+
+    def update(self, values: np.ndarray | Sequence[float]) -> None:
+        """
+        Add values to the sketch, NaN are ignored.
+        :param values: np.ndarray | Sequence[float], the values
+        """
+        as_array = np.asarray(values, dtype=np.float64).ravel()
+        as_array = as_array[~np.isnan(as_array)]
+        self._levels[0] = np.concatenate((self._levels[0], as_array))
+        self._count += len(as_array)
+        self._compress()
+
+    def merge(self, other: QuantileSketch) -> QuantileSketch:
+        """
+        Merge two sketches into a new one, which sketches the values of both.
+        :param other: QuantileSketch, the sketch to merge with
+        :return: QuantileSketch, with the larger ``k`` of both
+        """
+        # pylint: disable=protected-access
+        merged = QuantileSketch(max(self._k, other._k), seed=int(self._random.integers(1 << 32)))
+        merged._absorb(other._levels, other._count)
+        merged._absorb(self._levels, self._count)
+        return merged
+
+    def quantile(self, fraction: float | np.ndarray) -> float | np.ndarray:
+        """
+        Estimate quantiles of the values added, as the smallest value whose estimated rank is at least ``fraction``.
+        :param fraction: float | np.ndarray, the quantiles, in [0, 1]
+        :return: float | np.ndarray, the estimated values of the quantiles (NaN if the sketch is empty)
+        """
+        quantiles = np.asarray(fraction, dtype=np.float64)
+        if np.any((quantiles < 0) | (quantiles > 1)):
+            raise ValueError(f"quantiles must be within [0, 1], not {fraction}")
+        if self._count == 0:
+            return np.full_like(quantiles, np.nan)[()]
+        values = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(level), 1 << h, dtype=np.int64) for h, level in enumerate(self._levels)])
+        order = np.argsort(values, kind="stable")
+        cumulative_weights = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative_weights, quantiles * cumulative_weights[-1], side="left")
+        return values[order][np.minimum(positions, len(values) - 1)][()]
+
+    def _absorb(self, levels: Sequence[np.ndarray], count: int) -> None:
+        """
+        Add the levels of another sketch to the levels of this sketch.
+        :param levels: Sequence[np.ndarray], the values of each level of the other sketch
+        :param count: int, the number of values the other sketch stands for
+        """
+        self._levels.extend(np.empty(0, dtype=np.float64) for _ in range(len(levels) - len(self._levels)))
+        for height, level in enumerate(levels):
+            self._levels[height] = np.concatenate((self._levels[height], level))
+        self._count += count
+        self._compress()
+
+    def _capacity(self, level: int) -> int:
+        return max(2, math.ceil(self._k * _CAPACITY_DECAY ** (len(self._levels) - 1 - level)))
+
+    def _compress(self) -> None:
+        """
+        Compact the lowest level that exceeds its capacity, until the sketch fits into its total capacity: half
+            of its sorted values (either the odd or the even ones) are promoted to the next level.
+        """
+        while len(self) > sum(self._capacity(h) for h in range(len(self._levels))):
+            level = next(h for h in range(len(self._levels)) if len(self._levels[h]) >= self._capacity(h))
+            if level + 1 == len(self._levels):
+                self._levels.append(np.empty(0, dtype=np.float64))
+            values = np.sort(self._levels[level])
+            kept = values[len(values) - len(values) % 2 :]
+            promoted = values[int(self._random.integers(2)) : len(values) - len(values) % 2 : 2]
+            self._levels[level] = kept
+            self._levels[level + 1] = np.concatenate((self._levels[level + 1], promoted))
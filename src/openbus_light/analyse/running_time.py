@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import cached_property
+from typing import Generic, Hashable, Iterable, TypeVar
+
+import numpy as np
+
+from ..manipulate.direction import update_trip_times
+from ..model import BusLine, Direction, DirectionName, LineName, RecordedTripTable, StationName
+from .quantile_sketch import QuantileSketch
+
+KeyT = TypeVar("KeyT", bound=Hashable)
+
+
+@dataclass(frozen=True, eq=False)
+class GroupedTimes(Generic[KeyT]):
+    """
+    Planned and observed times in seconds (NaN if not recorded), grouped by key: the times of ``keys[i]``
+        are the entries ``offsets[i]:offsets[i + 1]`` of ``planned`` and ``observed``.
+    """
+
+    keys: tuple[KeyT, ...]
+    offsets: np.ndarray
+    planned: np.ndarray
+    observed: np.ndarray
+
+    @cached_property
+    def _index_of_key(self) -> dict[KeyT, int]:
+        return {key: i for i, key in enumerate(self.keys)}
+
+    def _entries_of(self, key: KeyT) -> slice:
+        """
+        Get the entries of the times of a key, which are empty if there are none.
+        :param key: KeyT, the key of the group
+        :return: slice, the entries of its times
+        """
+        if key not in self._index_of_key:
+            return slice(0, 0)
+        i = self._index_of_key[key]
+        return slice(self.offsets[i], self.offsets[i + 1])
+
+    def planned_of(self, key: KeyT) -> np.ndarray:
+        """
+        Get the planned times of a group.
+        :param key: KeyT, the key of the group
+        :return: np.ndarray, the times in seconds (float64)
+        """
+        return self.planned[self._entries_of(key)]
+
+    def observed_of(self, key: KeyT) -> np.ndarray:
+        """
+        Get the observed times of a group.
+        :param key: KeyT, the key of the group
+        :return: np.ndarray, the times in seconds (float64)
+        """
+        return self.observed[self._entries_of(key)]
+
+
+def calculate_trip_times_by_station_pair(table: RecordedTripTable) -> GroupedTimes[tuple[StationName, StationName]]:
+    """
+    Calculate the planned and observed trip times between consecutive stops of all trips in a table, from the
+        departure at the first to the arrival at the second stop, grouped by the pair of stations.
+    :param table: RecordedTripTable, the stops of the recorded trips (e.g. of a direction)
+    :return: GroupedTimes[tuple[StationName, StationName]], the trip times by pair of stations
+    """
+    is_last_stop = np.zeros(len(table.station_ids), dtype=bool)
+    is_last_stop[table.trip_offsets[1:] - 1] = True
+    departures = np.flatnonzero(~is_last_stop)
+    arrivals = departures + 1
+    codes = table.station_ids[departures] * len(table.station_names) + table.station_ids[arrivals]
+    unique_codes, offsets, order = _group_by(codes)
+    return GroupedTimes(
+        keys=tuple(
+            (
+                table.station_names[code // len(table.station_names)],
+                table.station_names[code % len(table.station_names)],
+            )
+            for code in unique_codes.tolist()
+        ),
+        offsets=offsets,
+        planned=_seconds_between(table.departure_planned[departures], table.arrival_planned[arrivals])[order],
+        observed=_seconds_between(table.departure_observed[departures], table.arrival_observed[arrivals])[order],
+    )
+
+
+def calculate_dwell_times_by_station(table: RecordedTripTable) -> GroupedTimes[StationName]:
+    """
+    Calculate the planned and observed dwell times at the intermediate stops of all trips in a table, from the
+        arrival to the departure, grouped by station. The first and the last stop of a trip have no dwell time.
+    :param table: RecordedTripTable, the stops of the recorded trips (e.g. of a direction)
+    :return: GroupedTimes[StationName], the dwell times by station
+    """
+    is_terminal_stop = np.zeros(len(table.station_ids), dtype=bool)
+    is_terminal_stop[table.trip_offsets[:-1]] = True
+    is_terminal_stop[table.trip_offsets[1:] - 1] = True
+    stops = np.flatnonzero(~is_terminal_stop)
+    unique_ids, offsets, order = _group_by(table.station_ids[stops])
+    return GroupedTimes(
+        keys=tuple(table.station_names[i] for i in unique_ids.tolist()),
+        offsets=offsets,
+        planned=_seconds_between(table.arrival_planned[stops], table.departure_planned[stops])[order],
+        observed=_seconds_between(table.arrival_observed[stops], table.departure_observed[stops])[order],
+    )
+
+
+class RunningTimeSketches:
+    """
+    Quantile sketches of the observed trip times per (line, direction, station pair) and of the observed
+        dwell times per (line, direction, station), whose memory does not grow with the number of trips.
+        Sketches of different files or processes can be merged.
+    """
+
+    def __init__(self, k: int = 200) -> None:
+        """
+        :param k: int, the accuracy of each sketch (see ``QuantileSketch``)
+        """
+        self._k = k
+        self._trip_times: dict[tuple[LineName, DirectionName, tuple[StationName, StationName]], QuantileSketch] = {}
+        self._dwell_times: dict[tuple[LineName, DirectionName, StationName], QuantileSketch] = {}
+
+    def add_lines(self, lines: Iterable[BusLine]) -> None:
+        """
+        Add the recorded trips of both directions of lines, e.g. after ``enrich_lines_with_recorded_trips``.
+        :param lines: Iterable[BusLine], lines with recorded trips
+        """
+        for line in lines:
+            for direction in (line.direction_up, line.direction_down):
+                self.add_recorded_trips(line.name, direction.name, direction.recorded_trip_table)
+
+    def add_recorded_trips(self, line: LineName, direction: DirectionName, table: RecordedTripTable) -> None:
+        """
+        Add the observed trip and dwell times of the recorded trips of a direction.
+        :param line: LineName, the line of the trips
+        :param direction: DirectionName, the direction of the trips
+        :param table: RecordedTripTable, the stops of the trips
+        """
+        trip_times = calculate_trip_times_by_station_pair(table)
+        for pair in trip_times.keys:
+            self._sketch_of(self._trip_times, (line, direction, pair)).update(trip_times.observed_of(pair))
+        dwell_times = calculate_dwell_times_by_station(table)
+        for station in dwell_times.keys:
+            self._sketch_of(self._dwell_times, (line, direction, station)).update(dwell_times.observed_of(station))
+
+    def merge(self, other: RunningTimeSketches) -> RunningTimeSketches:
+        """
+        Merge the sketches of two aggregators into a new one.
+        :param other: RunningTimeSketches, the aggregator to merge with
+        :return: RunningTimeSketches
+        """
+        # pylint: disable=protected-access
+        merged = RunningTimeSketches(max(self._k, other._k))
+        merged._trip_times = _merge_sketches(self._trip_times, other._trip_times)
+        merged._dwell_times = _merge_sketches(self._dwell_times, other._dwell_times)
+        return merged
+
+    def trip_time_quantiles(
+        self, line: LineName, direction: DirectionName, quantile: float
+    ) -> dict[tuple[StationName, StationName], timedelta]:
+        """
+        Estimate a quantile of the observed trip times of each station pair of a direction.
+        :param line: LineName, the line
+        :param direction: DirectionName, the direction of the line
+        :param quantile: float, the quantile, in [0, 1]
+        :return: dict[tuple[StationName, StationName], timedelta], the trip time by observed station pair
+        """
+        return {
+            pair: timedelta(seconds=float(sketch.quantile(quantile)))
+            for (line_name, direction_name, pair), sketch in self._trip_times.items()
+            if line_name == line and direction_name == direction and sketch.count > 0
+        }
+
+    def dwell_time_quantiles(
+        self, line: LineName, direction: DirectionName, quantile: float
+    ) -> dict[StationName, timedelta]:
+        """
+        Estimate a quantile of the observed dwell times at each station of a direction.
+        :param line: LineName, the line
+        :param direction: DirectionName, the direction of the line
+        :param quantile: float, the quantile, in [0, 1]
+        :return: dict[StationName, timedelta], the dwell time by observed station
+        """
+        return {
+            station: timedelta(seconds=float(sketch.quantile(quantile)))
+            for (line_name, direction_name, station), sketch in self._dwell_times.items()
+            if line_name == line and direction_name == direction and sketch.count > 0
+        }
+
+    def calibrate(self, line: BusLine, quantile: float = 0.5) -> BusLine:
+        """
+        Calibrate the trip times of both directions of a line to a quantile of the observed trip times,
+            station pairs without observation keep their trip time.
+        :param line: BusLine, the line to calibrate
+        :param quantile: float, the quantile, in [0, 1]
+        :return: BusLine, the line with calibrated trip times
+        """
+
+        def calibrated(direction: Direction) -> Direction:
+            trip_times = dict(direction.trip_time_by_pair())
+            trip_times.update(self.trip_time_quantiles(line.name, direction.name, quantile))
+            return update_trip_times(trip_times, direction)
+
+        return line._replace(direction_up=calibrated(line.direction_up), direction_down=calibrated(line.direction_down))
+
+    def _sketch_of(self, sketches: dict[KeyT, QuantileSketch], key: KeyT) -> QuantileSketch:
+        if key not in sketches:
+            sketches[key] = QuantileSketch(self._k)
+        return sketches[key]
+
+
+def _merge_sketches(
+    sketches: dict[KeyT, QuantileSketch], other_sketches: dict[KeyT, QuantileSketch]
+) -> dict[KeyT, QuantileSketch]:
+    """
+    Merge the sketches of equal keys, the sketches of the other keys are taken as they are.
+    :param sketches: dict[KeyT, QuantileSketch], sketches by key
+    :param other_sketches: dict[KeyT, QuantileSketch], other sketches by key
+    :return: dict[KeyT, QuantileSketch], the merged sketches by key
+    """
+    merged = {**sketches, **other_sketches}
+    for key in sketches.keys() & other_sketches.keys():
+        merged[key] = sketches[key].merge(other_sketches[key])
+    return merged
+
+
+def _group_by(codes: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Group entries by their (integer) code.
+    :param codes: np.ndarray, the code of each entry
+    :return: tuple[np.ndarray, np.ndarray, np.ndarray], the ascending distinct codes, the offsets of their
+        groups and the order of the entries that arranges them in groups (stable within a group)
+    """
+    unique_codes, counts = np.unique(codes, return_counts=True)
+    offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    return unique_codes, offsets, np.argsort(codes, kind="stable")
+
+
+def _seconds_between(earlier: np.ndarray, later: np.ndarray) -> np.ndarray:
+    """
+    Calculate the time between two arrays of times, in nanoseconds since the epoch (int64, or NaT).
+    :param earlier: np.ndarray, the earlier times
+    :param later: np.ndarray, the later times
+    :return: np.ndarray, the time in seconds (float64, NaN where either time is NaT)
+    """
+    return (later.view("datetime64[ns]") - earlier.view("datetime64[ns]")) / np.timedelta64(1, "s")
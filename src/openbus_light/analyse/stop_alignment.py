@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from typing import NamedTuple
+
+import numpy as np
+from numba import njit, prange
+
+from ..model import BusLine, RecordedTripTable
+
+
+class StopAlignment(NamedTuple):
+    """
+    The alignment of the stop sequences of recorded trips with both directions of a line: ``matched_stops[i, d]``
+        is the number of stops of trip ``i`` that are visited in the order of direction ``d`` (0 for up, 1 for
+        down), i.e. the length of the longest common subsequence of both.
+    """
+
+    matched_stops: np.ndarray
+    stop_counts: np.ndarray
+    direction_lengths: np.ndarray
+
+    @property
+    def stop_share(self) -> np.ndarray:
+        """
+        Get the share of the recorded stops of each trip that are visited in the order of each direction.
+        :return: np.ndarray, the share per trip and direction, 1 if the trip does not deviate from the direction
+        """
+        return self.matched_stops / np.maximum(self.stop_counts, 1)[:, None]
+
+    @property
+    def route_share(self) -> np.ndarray:
+        """
+        Get the share of the stations of each direction that each trip visits in order.
+        :return: np.ndarray, the share per trip and direction, 1 if the trip serves the whole direction
+        """
+        return self.matched_stops / np.maximum(self.direction_lengths, 1)[None, :]
+
+    @property
+    def best_direction(self) -> np.ndarray:
+        """
+        Get the direction that matches most recorded stops of each trip (up on a tie).
+        :return: np.ndarray, 0 for up, 1 for down, -1 if no stop of the trip is served by the line
+        """
+        return np.where(self.matched_stops.max(axis=1) > 0, np.argmax(self.matched_stops, axis=1), -1)
+
+
+def align_recorded_trips(line: BusLine, table: RecordedTripTable) -> StopAlignment:
+    """
+    Align the stop sequence of each recorded trip with the station sequences of both directions of a line.
+        The stations are compared as integer codes, and all trips are aligned in one compiled pass.
+    :param line: BusLine, the line with both directions
+    :param table: RecordedTripTable, the stops of the recorded trips (e.g. of a direction of the line)
+    :return: StopAlignment, the number of stops matched per trip and direction
+    """
+    directions = (line.direction_up, line.direction_down)
+    code_of_station = {
+        station: code
+        for code, station in enumerate(sorted({s for direction in directions for s in direction.station_sequence}))
+    }
+    code_of_table_station = np.array([code_of_station.get(name, -1) for name in table.station_names], dtype=np.int64)
+    stops = code_of_table_station[table.station_ids]
+    matched_stops = np.stack(
+        [
+            _calculate_common_subsequence_lengths(
+                stops,
+                np.asarray(table.trip_offsets, dtype=np.int64),
+                np.array([code_of_station[s] for s in direction.station_sequence], dtype=np.int64),
+            )
+            for direction in directions
+        ],
+        axis=1,
+    )
+    return StopAlignment(
+        matched_stops=matched_stops,
+        stop_counts=np.diff(table.trip_offsets),
+        direction_lengths=np.array([direction.station_count for direction in directions], dtype=np.int64),
+    )
+
+
+@njit(cache=True, parallel=True)
+def _calculate_common_subsequence_lengths(
+    stops: np.ndarray, trip_offsets: np.ndarray, reference: np.ndarray
+) -> np.ndarray:
+    """
+    Calculate the length of the longest common subsequence of the stops of each trip and a reference sequence,
+        with one row of the dynamic program per trip. Negative codes never match.
+    :param stops: np.ndarray, the station code of each stop of all trips
+    :param trip_offsets: np.ndarray, the stops of trip ``i`` are ``trip_offsets[i]:trip_offsets[i + 1]``
+    :param reference: np.ndarray, the station codes of the reference sequence
+    :return: np.ndarray, the length per trip
+    """
+    lengths = np.empty(len(trip_offsets) - 1, dtype=np.int64)
+    for trip in prange(len(trip_offsets) - 1):  # pylint: disable=not-an-iterable
+        row = np.zeros(len(reference) + 1, dtype=np.int64)
+        for stop in range(trip_offsets[trip], trip_offsets[trip + 1]):
+            diagonal = 0
+            for j, code in enumerate(reference):
+                above = row[j + 1]
+                if code == stops[stop]:
+                    row[j + 1] = diagonal + 1
+                elif row[j] > above:
+                    row[j + 1] = row[j]
+                diagonal = above
+        lengths[trip] = row[len(reference)]
+    return lengths
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Collection, Iterable, NamedTuple
+
+import numpy as np
+
+from ..model import BusLine, CirculationId, LineName
+from ..plan import LinePlanningParameters, calculate_required_vehicles
+
+
+class VehicleBlocks(NamedTuple):
+    """
+    The blocks of vehicles reconstructed from recorded trips: a block is a sequence of trips of one line with
+        the same circulation, each starting at most the maximal layover after the previous one ended. Each block
+        occupies one vehicle from its ``starts`` to its ``ends`` (datetime64[ns]).
+    """
+
+    lines: tuple[LineName, ...]
+    circulation_ids: tuple[CirculationId, ...]
+    starts: np.ndarray
+    ends: np.ndarray
+    trip_counts: np.ndarray
+
+    def peak_vehicles(self) -> dict[LineName, int]:
+        """
+        Count the maximal number of blocks of each line that are in service at the same time.
+        :return: dict[LineName, int], the peak number of simultaneous vehicles per line
+        """
+        if len(self.lines) == 0:
+            return {}
+        line_names, line_of_block = np.unique(np.array(self.lines, dtype=str), return_inverse=True)
+        line_of_event = np.concatenate((line_of_block, line_of_block))
+        times = np.concatenate((self.starts, self.ends)).view(np.int64)
+        changes = np.concatenate((np.ones(len(self.starts), np.int64), -np.ones(len(self.ends), np.int64)))
+        # within a line by time, a vehicle that is released is available for a block starting at the same time
+        order = np.lexsort((changes, times, line_of_event))
+        in_service = np.cumsum(changes[order])  # each line adds as many vehicles as it releases
+        first_event_of_line = np.searchsorted(line_of_event[order], np.arange(len(line_names)))
+        return dict(
+            zip(
+                (LineName(name) for name in line_names.tolist()),
+                np.maximum.reduceat(in_service, first_event_of_line).tolist(),
+            )
+        )
+
+
+class VehicleRequirement(NamedTuple):
+    line: LineName
+    observed_peak: int
+    modelled: int
+
+
+def reconstruct_vehicle_blocks(
+    lines: Iterable[BusLine], maximal_layover: timedelta = timedelta(hours=1)
+) -> VehicleBlocks:
+    """
+    Reconstruct the vehicle blocks from the recorded trips of both directions of lines, in one sort of all trips
+        by line, circulation and start. A trip lasts from the departure at its first to the arrival at its last
+        stop, observed if recorded and planned otherwise. Trips without circulation or times are skipped.
+    :param lines: Iterable[BusLine], lines with recorded trips
+    :param maximal_layover: timedelta, a longer pause between two trips of a circulation starts a new block
+    :return: VehicleBlocks, ordered by line, circulation and start
+    """
+    line_of_trip, circulation_of_trip, start_of_trip, end_of_trip = _gather_trips(lines)
+    is_known = (circulation_of_trip != "") & ~np.isnat(start_of_trip) & ~np.isnat(end_of_trip)
+    order = np.flatnonzero(is_known)[
+        np.lexsort((start_of_trip[is_known], circulation_of_trip[is_known], line_of_trip[is_known]))
+    ]
+    line_of_trip, circulation_of_trip = line_of_trip[order], circulation_of_trip[order]
+    start_of_trip, end_of_trip = start_of_trip[order], end_of_trip[order]
+
+    is_first_of_block = np.ones(len(order), dtype=bool)
+    is_first_of_block[1:] = (
+        (line_of_trip[1:] != line_of_trip[:-1])
+        | (circulation_of_trip[1:] != circulation_of_trip[:-1])
+        | (start_of_trip[1:] - end_of_trip[:-1] > np.timedelta64(maximal_layover))
+    )
+    first_trips = np.flatnonzero(is_first_of_block)
+    if len(first_trips) == 0:
+        no_times = np.empty(0, dtype="datetime64[ns]")
+        return VehicleBlocks(tuple(), tuple(), no_times, no_times, np.empty(0, dtype=np.int64))
+    return VehicleBlocks(
+        lines=tuple(LineName(name) for name in line_of_trip[first_trips].tolist()),
+        circulation_ids=tuple(CirculationId(circulation) for circulation in circulation_of_trip[first_trips].tolist()),
+        starts=start_of_trip[first_trips],
+        ends=np.maximum.reduceat(end_of_trip, first_trips),
+        trip_counts=np.diff(np.append(first_trips, len(order))),
+    )
+
+
+def compare_vehicle_requirements(
+    blocks: VehicleBlocks, active_lines: Collection[BusLine], parameters: LinePlanningParameters
+) -> tuple[VehicleRequirement, ...]:
+    """
+    Compare the observed peak of simultaneous vehicles with the number of vehicles the line planning problem
+        requires for each active line, at its (single) permitted frequency.
+    :param blocks: VehicleBlocks, the reconstructed blocks
+    :param active_lines: Collection[BusLine], the lines with the planned frequency, e.g. of a solution
+    :param parameters: LinePlanningParameters, the parameters of the line planning problem
+    :return: tuple[VehicleRequirement, ...], per active line, 0 observed if there is no block of the line
+    """
+    observed_peaks = blocks.peak_vehicles()
+    return tuple(
+        VehicleRequirement(
+            line=line.name,
+            observed_peak=observed_peaks.get(line.name, 0),
+            modelled=calculate_required_vehicles(line, line.permitted_frequencies[0], parameters),
+        )
+        for line in active_lines
+    )
+
+
+def _gather_trips(lines: Iterable[BusLine]) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Gather the line, the circulation, the start and the end of the recorded trips of both directions of lines.
+        The trips are taken at their positions in the table, which may hold more trips than the direction.
+    :param lines: Iterable[BusLine], lines with recorded trips
+    :return: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray], the columns per trip
+    """
+    line_names, circulation_ids = [np.empty(0, dtype=str)], [np.empty(0, dtype=str)]
+    starts, ends = [np.empty(0, dtype="datetime64[ns]")], [np.empty(0, dtype="datetime64[ns]")]
+    for line in lines:
+        for direction in (line.direction_up, line.direction_down):
+            table = direction.recorded_trip_table
+            positions = np.array([trip.position for trip in direction.recorded_trips], dtype=np.int64)
+            line_names.append(np.full(len(positions), line.name))
+            circulation_ids.append(np.array([trip.circulation_id for trip in direction.recorded_trips], dtype=str))
+            first_stops, last_stops = table.trip_offsets[positions], table.trip_offsets[positions + 1] - 1
+            starts.append(_first_recorded(table.departure_observed, table.departure_planned)[first_stops])
+            ends.append(_first_recorded(table.arrival_observed, table.arrival_planned)[last_stops])
+    return np.concatenate(line_names), np.concatenate(circulation_ids), np.concatenate(starts), np.concatenate(ends)
+
+
+def _first_recorded(observed: np.ndarray, planned: np.ndarray) -> np.ndarray:
+    """
+    Take the observed times, and the planned where no time was observed.
+    :param observed: np.ndarray, the observed times (int64 nanoseconds, or NaT)
+    :param planned: np.ndarray, the planned times (int64 nanoseconds, or NaT)
+    :return: np.ndarray, the times (datetime64[ns])
+    """
+    observed_times = observed.view("datetime64[ns]")
+    return np.where(np.isnat(observed_times), planned.view("datetime64[ns]"), observed_times)
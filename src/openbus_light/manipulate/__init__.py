@@ -1,4 +1,33 @@
-from .demand import load_demand_matrix
-from .paths import ScenarioPaths
-from .point import calculate_distance_in_m
-from .scenario import load_scenario
+from typing import TYPE_CHECKING
+
+from ..utils import lazy_exports
+
+if TYPE_CHECKING:
+    from .demand import load_demand_matrix
+    from .demand_store import DemandMatrixWriter, open_demand_matrix, save_demand_matrix
+    from .measurement_store import MeasurementPartition, MeasurementStore
+    from .paths import ScenarioPaths
+    from .point import (
+        calculate_distance_in_m,
+        calculate_distance_matrix_in_m,
+        calculate_distance_matrix_in_parallel,
+        calculate_distances_from_point_in_m,
+    )
+    from .scenario import load_scenario
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        ".demand": ("load_demand_matrix",),
+        ".demand_store": ("DemandMatrixWriter", "open_demand_matrix", "save_demand_matrix"),
+        ".measurement_store": ("MeasurementPartition", "MeasurementStore"),
+        ".paths": ("ScenarioPaths",),
+        ".point": (
+            "calculate_distance_in_m",
+            "calculate_distance_matrix_in_m",
+            "calculate_distance_matrix_in_parallel",
+            "calculate_distances_from_point_in_m",
+        ),
+        ".scenario": ("load_scenario",),
+    },
+)
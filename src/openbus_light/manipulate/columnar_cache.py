@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Callable, Mapping
+
+import numpy as np
+
+CACHE_DIRECTORY = Path(tempfile.gettempdir()) / ".openbus_light_cache"
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def calculate_file_hash(path: Path) -> str:
+    """
+    Calculate the hash of the content of a file, reading it in chunks.
+    :param path: Path, the file to hash
+    :return: str, the hexadecimal SHA-256 of the content
+    """
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(_HASH_CHUNK_SIZE):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def load_columns_cached(
+    source: Path, parse: Callable[[Path], Mapping[str, np.ndarray]], kind: str, cache_directory: Path = CACHE_DIRECTORY
+) -> dict[str, np.ndarray]:
+    """
+    Load the typed columns parsed from a source file. The first call parses the file and stores each column as
+        ``.npy`` file, in a directory named by ``kind`` and the hash of the source. Later calls map these files
+        into memory (read-only), such that neither text is parsed nor archives are decompressed again.
+    :param source: Path, the file that is parsed
+    :param parse: Callable[[Path], Mapping[str, np.ndarray]], parses the source into columns of equal length,
+        which must not be object arrays (use fixed width strings instead)
+    :param kind: str, names the parsed content, change it whenever ``parse`` changes its result
+    :param cache_directory: Path, where the parsed columns are stored
+    :return: dict[str, np.ndarray], the columns by name
+    """
+    return open_cached_columns(cache_columns(source, parse, kind, cache_directory))
+
+
+def cache_columns(
+    source: Path, parse: Callable[[Path], Mapping[str, np.ndarray]], kind: str, cache_directory: Path = CACHE_DIRECTORY
+) -> Path:
+    """
+    Parse a source file into the cache, unless its columns are cached already (see ``load_columns_cached``).
+    :param source: Path, the file that is parsed
+    :param parse: Callable[[Path], Mapping[str, np.ndarray]], parses the source into columns of equal length
+    :param kind: str, names the parsed content
+    :param cache_directory: Path, where the parsed columns are stored
+    :return: Path, the directory of the cached columns, which can be opened by other processes as well
+    """
+    cached_at = cache_directory / f"{kind}-{calculate_file_hash(source)}"
+    if not cached_at.is_dir():
+        store_columns(parse(source), cached_at)
+    return cached_at
+
+
+def open_cached_columns(cached_at: Path) -> dict[str, np.ndarray]:
+    """
+    Map the cached columns into memory (read-only), processes that open the same columns share their pages.
+    :param cached_at: Path, the directory of the cached columns
+    :return: dict[str, np.ndarray], the columns by name
+    """
+    return {
+        column_file.stem: np.load(column_file, mmap_mode="r", allow_pickle=False)
+        for column_file in sorted(cached_at.glob("*.npy"))
+    }
+
+
+def store_columns(columns: Mapping[str, np.ndarray], cached_at: Path) -> None:
+    """
+    Store the columns next to the final directory and move them there at once, such that a concurrent or
+        interrupted process never finds an incomplete directory.
+    :param columns: Mapping[str, np.ndarray], the columns by name
+    :param cached_at: Path, the directory of the columns
+    """
+    cached_at.parent.mkdir(parents=True, exist_ok=True)
+    being_written = cached_at.with_name(f"{cached_at.name}.{uuid.uuid4().hex}.partial")
+    being_written.mkdir()
+    try:
+        for name, column in columns.items():
+            if column.dtype.hasobject:
+                raise TypeError(f"{name} is an object array, which cannot be mapped into memory")
+            np.save(being_written / f"{name}.npy", column, allow_pickle=False)
+        os.replace(being_written, cached_at)
+    except OSError:
+        if not cached_at.is_dir():
+            raise
+    finally:
+        shutil.rmtree(being_written, ignore_errors=True)
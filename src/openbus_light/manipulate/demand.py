@@ -1,167 +1,189 @@
 from __future__ import annotations
 
-import uuid
-from collections import Counter
-from itertools import chain, product
 from pathlib import Path
-from typing import Collection, Sequence
+from typing import Sequence
 
 import numpy as np
 import pandas as pd
 
-from ..model import DemandMatrix, DistrictPoint, PointIn2D, Station
-from ..model.type import DistrictName, DistrictPointId, Meter, StationName
+from ..model import DemandMatrix, DistrictPoint, PointIn2D, StationTable
+from ..model.type import DistrictName, DistrictPointId, Meter
 from ..plan import LinePlanningParameters
 from ..utils import skip_one_line_in_file
+from .columnar_cache import load_columns_cached
 from .paths import ScenarioPaths
-from .point import calculate_distance_in_m
+from .spatial_index import find_nearest_station_within_radius
 
 
 def _load_all_district_points(path_to_demand_district_points: Path) -> tuple[DistrictPoint, ...]:
     """
-    Load all district points. From file convert to DistrictPoints.
+    Load all district points. From file convert to DistrictPoints, identified by their index in the file
+        (the disaggregation does not use the ids, so no random ids are generated).
     :param path_to_demand_district_points: str, path and name of the file
     :return: tuple[DistrictPoints, ...], tuple of all the district points
     """
+    columns = load_columns_cached(path_to_demand_district_points, _parse_district_points, "district_points")
+    return tuple(
+        DistrictPoint(
+            district_name=DistrictName(district_name),
+            position=PointIn2D(lat=lat, long=long),
+            id=DistrictPointId(str(index)),
+        )
+        for index, (district_name, lat, long) in enumerate(
+            zip(columns["district_name"].tolist(), columns["lat"].tolist(), columns["long"].tolist())
+        )
+    )
+
+
+def _parse_district_points(path_to_demand_district_points: Path) -> dict[str, np.ndarray]:
+    """
+    Parse the district points that belong to a district.
+    :param path_to_demand_district_points: Path, path and name of the file
+    :return: dict[str, np.ndarray], the columns district_name, lat and long
+    """
     with open(path_to_demand_district_points, encoding="utf-8") as file:
         skip_one_line_in_file(file)
         raw_demand_points = pd.read_csv(file, sep=",", encoding="utf-8", dtype=str)
+    raw_demand_points = raw_demand_points[raw_demand_points.BEZIRKE.notnull()]
+    return {
+        "district_name": raw_demand_points.BEZIRKE.to_numpy(dtype=str),
+        "lat": np.fromiter(map(float, raw_demand_points.YCOORD), dtype=np.float64, count=len(raw_demand_points)),
+        "long": np.fromiter(map(float, raw_demand_points.XCOORD), dtype=np.float64, count=len(raw_demand_points)),
+    }
 
-    return tuple(
-        DistrictPoint(
-            district_name=row.BEZIRKE,
-            position=PointIn2D(lat=float(row.YCOORD), long=float(row.XCOORD)),
-            id=DistrictPointId(str(uuid.uuid4())),
-        )
-        for row in raw_demand_points.itertuples(index=False)
-        if not pd.isnull(row.BEZIRKE)
+
+def associate_district_points(
+    stations: StationTable, parameters: LinePlanningParameters, paths: ScenarioPaths
+) -> StationTable:
+    """
+    Associate the district points with the stations, see ``_map_district_to_nearest_station``.
+    :param stations: StationTable, the bus stations
+    :param parameters: LinePlanningParameters, parameters for the line planning problem
+    :param paths: ScenarioPaths, paths in the scenario
+    :return: StationTable, the stations with their associated district points
+    """
+    return _map_district_to_nearest_station(
+        _load_all_district_points(paths.to_districts), stations, parameters.demand_association_radius
     )
 
 
 def load_demand_matrix(
-    stations: Sequence[Station], parameters: LinePlanningParameters, paths: ScenarioPaths
+    stations: StationTable, parameters: LinePlanningParameters, paths: ScenarioPaths
 ) -> DemandMatrix:
     """
     Load demand matrix.
-    :param stations: Sequence[Station], sequence of bus stations
+    :param stations: StationTable, the bus stations with their associated district points
+        (see ``associate_district_points``)
     :param parameters: LinePlanningParameters, parameters for the line planning problem
     :param paths: ScenarioPaths, paths in the scenario
     :return: DemandMatrix, an alphabetically sorted demand matrix, with origin stations,
-        destination stations, and demand between them
+        destination stations, and demand between them, raises ValueError if no district point is associated
     """
-    all_district_points = _load_all_district_points(paths.to_districts)
+    if len(stations.district_points) == 0:
+        raise ValueError("no district points are associated with the stations, see associate_district_points")
     demanded_relations = _load_all_demanded_relations(paths.to_demand)
-
-    _map_district_to_nearest_station(all_district_points, stations, parameters.demand_association_radius)
-
-    covered_district_points = tuple(chain.from_iterable(station.district_points for station in stations))
-    stations_per_district = Counter(station.district_name for station in covered_district_points)
-    demand_between_district_points = _distribute_demand_between_districts(
-        covered_district_points, parameters.demand_scaling, demanded_relations, stations_per_district
-    )
-    from_station_to_other_stations = _map_demand_from_districts_to_stations(demand_between_district_points, stations)
-
-    return DemandMatrix(matrix=_sort_from_station_to_other_stations(from_station_to_other_stations))
+    return _disaggregate_demand_to_stations(stations, demanded_relations, parameters.demand_scaling)
 
 
 def _map_district_to_nearest_station(
-    all_district_points: Collection[DistrictPoint], stations: Sequence[Station], association_radius: Meter
-) -> None:
+    all_district_points: Sequence[DistrictPoint], stations: StationTable, association_radius: Meter
+) -> StationTable:
     """
     Associate each district point with the nearest station. if the distance between
         district point and station is within the radius, assign the district to the station.
-    :param all_district_points: Collection[DistrictPoints], the collection of all district points
-    :param stations: Sequence[Station], sequence of all the stations
+    :param all_district_points: Sequence[DistrictPoints], the sequence of all district points
+    :param stations: StationTable, all the stations
     :param association_radius: int, specified radius around stations
+    :return: StationTable, the stations with their associated district points, in the order given
     """
-    for district_point in all_district_points:
-        distances = tuple(
-            min(calculate_distance_in_m(district_point.position, point) for point in station.points)
-            for station in stations
-        )
-        nearest_station_index: int = np.argmin(distances)  # type:ignore
-        if distances[nearest_station_index] < association_radius:
-            nearest_stop = stations[nearest_station_index]
-            nearest_stop.district_points.append(district_point)
+    nearest_station_indices = find_nearest_station_within_radius(
+        tuple(district_point.position for district_point in all_district_points), stations, association_radius
+    )
+    return stations.with_district_points(all_district_points, nearest_station_indices)
 
 
-def _map_demand_from_districts_to_stations(
-    demand_between_district_points: dict[DistrictPointId, dict[DistrictPointId, float]], stations: Collection[Station]
-) -> dict[StationName, dict[StationName, float]]:
+def _disaggregate_demand_to_stations(
+    stations: StationTable, demanded_relations: dict[tuple[DistrictName, DistrictName], float], demand_scale: float
+) -> DemandMatrix:
     """
-    Mao the demand between districts to demand between stations.
-    :param demand_between_district_points: dict[str, dict[str, float]], a dict where the key
-        is the origin district, the value is a nested dict of destined district and demand
-        between them
-    :param stations: Collection[Station], collection of stations
-    :return: dict[str, dict[str, float]], a dict where the key is the origin station, the
-        value is a nested dict of the destined station and demand between two stations
+    Distribute the demand between districts evenly over their district points and sum it per station,
+        as matrix product ``scale * A @ R @ A.T``, where ``R`` is the demand between the covered districts
+        and ``A[s, d]`` is the share of the district points of ``d`` that are associated with station ``s``.
+        The product is only formed between the stations with district points, of which the nonzero entries are
+        kept as compressed sparse rows.
+    :param stations: StationTable, the stations with their associated district points
+    :param demanded_relations: dict[tuple[str, str], float], the demand between districts
+    :param demand_scale: float, a scaling factor
+    :return: DemandMatrix, the demand between the stations, sorted alphabetically
     """
-    return {
-        origin.name: {
-            destination.name: sum(
-                demand_between_district_points[origin_district.id][destination_district.id]
-                for origin_district, destination_district in product(
-                    origin.district_points, destination.district_points
-                )
-            )
-            for destination in stations
-        }
-        for origin in stations
-    }
+    district_names, district_of_point = np.unique(
+        np.array([point.district_name for point in stations.district_points], dtype=str), return_inverse=True
+    )
+    points_per_district = np.bincount(district_of_point, minlength=len(district_names))
+    assignment = np.zeros((len(stations), len(district_names)))
+    np.add.at(
+        assignment, (stations.station_of_district_point, district_of_point), 1 / points_per_district[district_of_point]
+    )
+    sorted_stations = np.argsort(np.array(stations.names, dtype=str), kind="stable")
+    assignment = assignment[sorted_stations]
+    demand_between_districts = _create_district_demand_matrix(
+        tuple(DistrictName(name) for name in district_names.tolist()), demanded_relations
+    )
+    covered = np.flatnonzero(assignment.any(axis=1))
+    demand_between_covered = (assignment[covered] * demand_scale) @ demand_between_districts @ assignment[covered].T
+    origin_indices, destination_indices = np.nonzero(demand_between_covered)
+    sorted_names = tuple(stations.names[i] for i in sorted_stations.tolist())
+    return DemandMatrix.from_csr(
+        sorted_names,
+        sorted_names,
+        np.searchsorted(covered[origin_indices], np.arange(len(sorted_names) + 1)),
+        covered[destination_indices],
+        demand_between_covered[origin_indices, destination_indices],
+    )
 
 
-def _sort_from_station_to_other_stations(
-    from_station_to_other_stations: dict[StationName, dict[StationName, float]],
-) -> dict[StationName, dict[StationName, float]]:
+def _create_district_demand_matrix(
+    district_names: Sequence[DistrictName], demanded_relations: dict[tuple[DistrictName, DistrictName], float]
+) -> np.ndarray:
     """
-    Sort the dictionary alphabetically based on origin names and destination names.
-    :param from_station_to_other_stations: dict[str, dict[str, float]], original dict
-    :return: dict[str, dict[str, float]], sorted dict
+    Arrange the demand between the given districts as square array, every relation between them must be given.
+    :param district_names: Sequence[str], the district of each row and column
+    :param demanded_relations: dict[tuple[str, str], float], the demand between districts
+    :return: np.ndarray, the demand from the district of the row to the district of the column
     """
-    return {
-        origin_key: dict(sorted(demand.items(), key=lambda x: x[0]))
-        for origin_key, demand in sorted(from_station_to_other_stations.items(), key=lambda x: x[0])
-    }
+    return np.array(
+        [[demanded_relations[origin, destination] for destination in district_names] for origin in district_names],
+        dtype=np.float64,
+    ).reshape(len(district_names), len(district_names))
 
 
-def _distribute_demand_between_districts(
-    covered_district_points: Collection[DistrictPoint],
-    demand_scale: float,
-    demanded_relations: dict[tuple[DistrictName, DistrictName], float],
-    stations_per_district: dict[DistrictName, int],
-) -> dict[DistrictPointId, dict[DistrictPointId, float]]:
+def _load_all_demanded_relations(path_to_demand: Path) -> dict[tuple[DistrictName, DistrictName], float]:
     """
-    Distribute the demand between districts.
-    :param covered_district_points: Collection[DistrictPoints], collection of the district points
-    :param demand_scale: float, a scaling factor
-    :param demanded_relations: dict[tuple[str, str], float], the original demand between districts
-    :param stations_per_district: dict[str, int], number of stations in each district
-    :return: dict[str, dict[str, float]], demand between original and destination districts
+    Load all the origins and destinations with the demand between them.
+    :param path_to_demand: str, path and name of the file
+    :return: dict[tuple[str, str], float], a dict where that key is origin and destination,
+        and value is the demand between them
     """
+    columns = load_columns_cached(path_to_demand, _parse_demanded_relations, "demanded_relations")
     return {
-        origin_district.id: {
-            target_district.id: demanded_relations[origin_district.district_name, target_district.district_name]
-            * (1 / stations_per_district[origin_district.district_name])
-            * (1 / stations_per_district[target_district.district_name])
-            * demand_scale
-            for target_district in covered_district_points
-        }
-        for origin_district in covered_district_points
+        (DistrictName(origin), DistrictName(destination)): round(demand * 1.87, 4)
+        for origin, destination, demand in zip(
+            columns["origin"].tolist(), columns["destination"].tolist(), columns["demand"].tolist()
+        )
     }
 
 
-def _load_all_demanded_relations(path_to_demand: Path) -> dict[tuple[DistrictName, DistrictName], float]:
+def _parse_demanded_relations(path_to_demand: Path) -> dict[str, np.ndarray]:
     """
-    Load all the origins and destinations with the demand between them.
-    :param path_to_demand: str, path and name of the file
-    :return: dict[tuple[str, str], float], a dict where that key is origin and destination,
-        and value is the demand between them
+    Parse the demand between districts.
+    :param path_to_demand: Path, path and name of the file
+    :return: dict[str, np.ndarray], the columns origin, destination and demand
     """
     with open(path_to_demand, encoding="utf-8") as file:
         skip_one_line_in_file(file)
         raw_demand = pd.read_csv(file, sep=",", encoding="utf-8", dtype=str)
-        return {
-            (DistrictName(relation.FROM), DistrictName(relation.TO)): round(float(relation.DEMAND) * 1.87, 4)
-            for relation in raw_demand.itertuples(index=False)
-        }
+    return {
+        "origin": raw_demand.FROM.to_numpy(dtype=str),
+        "destination": raw_demand.TO.to_numpy(dtype=str),
+        "demand": np.fromiter(map(float, raw_demand.DEMAND), dtype=np.float64, count=len(raw_demand)),
+    }
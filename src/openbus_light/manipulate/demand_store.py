@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from types import TracebackType
+from typing import BinaryIO, Optional, Sequence
+
+import numpy as np
+
+from ..model import DemandMatrix
+from ..model.type import StationName
+
+_DESCRIPTION_FILE = "demand_matrix.json"
+_INDEX_DTYPE = np.dtype("<i8")
+_VALUE_DTYPE = np.dtype("<f8")
+
+
+class DemandMatrixWriter:
+    """
+    Write a demand matrix row by row (i.e. origin by origin) into a directory, such that only the current row
+        and the sums per station are held in memory. The entries are appended to binary files, which
+        ``open_demand_matrix`` maps into memory again.
+    """
+
+    def __init__(self, directory: Path, destinations: Sequence[StationName]) -> None:
+        """
+        :param directory: Path, the directory to write to, it is created if it does not exist
+        :param destinations: Sequence[StationName], the destination of each column
+        """
+        self._directory = directory
+        self._destinations = tuple(destinations)
+        self._origins: list[StationName] = []
+        self._row_offsets: list[int] = [0]
+        self._row_sums: list[float] = []
+        self._column_sums = np.zeros(len(self._destinations), dtype=_VALUE_DTYPE)
+        self._files: Optional[tuple[BinaryIO, BinaryIO]] = None
+
+    def __enter__(self) -> DemandMatrixWriter:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._files = (
+            open(self._directory / "destination_indices.bin", "wb"),  # pylint: disable=consider-using-with
+            open(self._directory / "values.bin", "wb"),  # pylint: disable=consider-using-with
+        )
+        return self
+
+    def __exit__(
+        self,
+        exception_type: Optional[type[BaseException]],
+        exception: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        assert self._files is not None, "the writer was not entered"
+        for file in self._files:
+            file.close()
+        if exception_type is None:
+            self._write_description_and_sums()
+
+    def add_row(self, origin: StationName, destination_indices: np.ndarray, values: np.ndarray) -> None:
+        """
+        Append the demand starting from the next origin.
+        :param origin: StationName, the origin of the row
+        :param destination_indices: np.ndarray, the column of each entry, each column at most once
+        :param values: np.ndarray, the demand of each entry
+        """
+        assert self._files is not None, "the writer was not entered"
+        if len(destination_indices) != len(values):
+            raise ValueError(f"{origin} has {len(destination_indices)} destinations, but {len(values)} values")
+        order = np.argsort(destination_indices, kind="stable")
+        destination_indices = np.asarray(destination_indices, dtype=_INDEX_DTYPE)[order]
+        values = np.asarray(values, dtype=_VALUE_DTYPE)[order]
+        destination_indices.tofile(self._files[0])
+        values.tofile(self._files[1])
+        np.add.at(self._column_sums, destination_indices, values)
+        self._origins.append(origin)
+        self._row_offsets.append(self._row_offsets[-1] + len(values))
+        # summed in order with bincount (not the pairwise values.sum()), as DemandMatrix does for its row sums, such
+        # that a written matrix has bit-identical marginals to the same matrix in memory
+        self._row_sums.append(float(np.bincount(np.zeros(len(values), dtype=np.int64), weights=values, minlength=1)[0]))
+
+    def _write_description_and_sums(self) -> None:
+        """
+        Write the per-station arrays and the description, which marks the matrix as complete.
+        """
+        np.asarray(self._row_offsets, dtype=_INDEX_DTYPE).tofile(self._directory / "row_offsets.bin")
+        np.asarray(self._row_sums, dtype=_VALUE_DTYPE).tofile(self._directory / "row_sums.bin")
+        self._column_sums.tofile(self._directory / "column_sums.bin")
+        with open(self._directory / _DESCRIPTION_FILE, "w", encoding="utf-8") as file:
+            json.dump(
+                {"origins": self._origins, "destinations": self._destinations, "entries": self._row_offsets[-1]}, file
+            )
+
+
+def save_demand_matrix(demand_matrix: DemandMatrix, directory: Path) -> None:
+    """
+    Save the demand matrix into a directory, from which ``open_demand_matrix`` maps it into memory.
+    :param demand_matrix: DemandMatrix, the demand matrix to save
+    :param directory: Path, the directory to write to, it is created if it does not exist
+    """
+    with DemandMatrixWriter(directory, demand_matrix.all_destinations()) as writer:
+        for block in demand_matrix.iterate_origin_blocks():
+            for origin in block.all_origins():
+                writer.add_row(origin, *block.row(origin))
+
+
+def open_demand_matrix(directory: Path) -> DemandMatrix:
+    """
+    Open a demand matrix written by ``DemandMatrixWriter`` or ``save_demand_matrix``. The entries are mapped
+        into memory (read-only), only the rows that are accessed are read from disk.
+    :param directory: Path, the directory of the demand matrix
+    :return: DemandMatrix, the memory-mapped demand matrix
+    """
+    with open(directory / _DESCRIPTION_FILE, encoding="utf-8") as file:
+        description = json.load(file)
+    number_of_entries = description["entries"]
+
+    def map_entries(name: str, dtype: np.dtype) -> np.ndarray:
+        if number_of_entries == 0:  # an empty file cannot be mapped
+            return np.empty(0, dtype=dtype)
+        return np.memmap(directory / name, dtype=dtype, mode="r", shape=(number_of_entries,))
+
+    return DemandMatrix.from_sorted_csr(
+        tuple(StationName(origin) for origin in description["origins"]),
+        tuple(StationName(destination) for destination in description["destinations"]),
+        np.fromfile(directory / "row_offsets.bin", dtype=_INDEX_DTYPE),
+        map_entries("destination_indices.bin", _INDEX_DTYPE),
+        map_entries("values.bin", _VALUE_DTYPE),
+        np.fromfile(directory / "row_sums.bin", dtype=_VALUE_DTYPE),
+        np.fromfile(directory / "column_sums.bin", dtype=_VALUE_DTYPE),
+    )
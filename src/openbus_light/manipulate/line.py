@@ -1,20 +1,26 @@
-import glob
+import hashlib
 import json
-import os
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import timedelta
 from itertools import chain
 from pathlib import Path
 from statistics import mean
-from typing import Any, Sequence
+from typing import Any, Iterable, Mapping, Sequence
 
+import numpy as np
 from tqdm import tqdm
 
 from ..model import BusLine, Direction, DirectionName, LineFrequency, LineName, LineNr, VehicleCapacity
 from ..model.type import StationName
+from .columnar_cache import CACHE_DIRECTORY, open_cached_columns, store_columns
 from .direction import update_trip_times
 
+_DIRECTION_NAMES = (DirectionName("a"), DirectionName("b"))
+# part of the name of the catalogue, to be increased whenever the columns of _compile_catalogue change
+_CATALOGUE_FORMAT_VERSION = 1
+
 
 def _convert_seconds_to_timedelta(seconds: float) -> timedelta:
     """
@@ -43,13 +49,13 @@ class LineFactory:
         direction_a = Direction(
             station_sequence=tuple(map(str, json_data["linie_a"])),  # type: ignore
             trip_times=tuple(map(_convert_seconds_to_timedelta, json_data["fahrzeiten_a"])),
-            name=DirectionName("a"),
+            name=_DIRECTION_NAMES[0],
         )
 
         direction_b = Direction(
             station_sequence=tuple(map(str, json_data["linie_b"])),  # type: ignore
             trip_times=tuple(map(_convert_seconds_to_timedelta, json_data["fahrzeiten_b"])),
-            name=DirectionName("b"),
+            name=_DIRECTION_NAMES[1],
         )
 
         if not direction_a.station_count == json_data["stops_a"]:
@@ -60,19 +66,124 @@ class LineFactory:
         return BusLine(idx, line_name, direction_a, direction_b, self.regular_capacity, self.permitted_frequencies)
 
 
-def load_lines_from_json(line_factory: LineFactory, path_to_lines: Path) -> tuple[BusLine, ...]:
+def load_lines_from_json(
+    line_factory: LineFactory, path_to_lines: Path, max_workers: int = 8, cache_directory: Path = CACHE_DIRECTORY
+) -> tuple[BusLine, ...]:
     """
-    Iterate over each json file and create bus lines from the data.
+    Load the bus lines from the JSON files in a directory, numbered in the order of the sorted file names.
+        The first call reads the files concurrently and compiles them into one catalogue of columns (station
+        indices and trip times of all directions), which later calls map into memory instead of opening every
+        file. The catalogue is named by the directory, the names, sizes and modification times of the files and
+        the version of its format.
     :param line_factory: LineFactory, contains capacity and permitted frequency of lines
     :param path_to_lines: str, path to the directory containing JSON files with bus line data
+    :param max_workers: int, the number of threads reading the files
+    :param cache_directory: Path, where the catalogue is stored
     :return: tuple[BusLine, ...], a tuple containing the loaded BusLine objects
     """
-    loaded_lines: list[BusLine] = []
-    all_files_to_load = glob.glob(os.path.join(path_to_lines, "*.json"))
-    for i, line_to_load in enumerate(tqdm(all_files_to_load, desc="importing lines", colour="blue")):
-        with open(line_to_load, encoding="utf-8") as json_file:
-            loaded_lines.append(line_factory.create_line_from_json(LineNr(i), json.load(json_file)))
-    return tuple(loaded_lines)
+    files_to_load = sorted(Path(path_to_lines).glob("*.json"))
+    cached_at = cache_directory / f"line_catalogue-{_calculate_listing_hash(Path(path_to_lines), files_to_load)}"
+    if not cached_at.is_dir():
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            loaded_json = tuple(
+                tqdm(
+                    executor.map(_read_json, files_to_load),
+                    total=len(files_to_load),
+                    desc="importing lines",
+                    colour="blue",
+                )
+            )
+        store_columns(
+            _compile_catalogue(
+                line_factory.create_line_from_json(LineNr(i), json_data) for i, json_data in enumerate(loaded_json)
+            ),
+            cached_at,
+        )
+    return _create_lines_from_catalogue(line_factory, open_cached_columns(cached_at))
+
+
+def _read_json(path: Path) -> dict[Any, Any]:
+    """
+    Read a JSON file.
+    :param path: Path, the file
+    :return: dict[Any, Any], its content
+    """
+    with open(path, encoding="utf-8") as json_file:
+        return json.load(json_file)
+
+
+def _calculate_listing_hash(directory: Path, paths: Sequence[Path]) -> str:
+    """
+    Calculate a hash of the resolved directory, the names, sizes and modification times of its files and the
+        version of the catalogue format, which changes if any file changes, without reading them.
+    :param directory: Path, the directory of the files
+    :param paths: Sequence[Path], the files
+    :return: str, the hexadecimal SHA-256 of the listing
+    """
+    listing = hashlib.sha256(f"{_CATALOGUE_FORMAT_VERSION}\0{directory.resolve()}\n".encode("utf-8"))
+    for path in paths:
+        status = path.stat()
+        listing.update(f"{path.name}\0{status.st_size}\0{status.st_mtime_ns}\n".encode("utf-8"))
+    return listing.hexdigest()
+
+
+def _compile_catalogue(lines: Iterable[BusLine]) -> dict[str, np.ndarray]:
+    """
+    Compile lines into columns: the names of the lines and of all stations, and for the directions of all lines
+        (a then b of each line) the concatenated station indices and trip times in seconds, with offsets.
+    :param lines: Iterable[BusLine], the lines, in the order of their number
+    :return: dict[str, np.ndarray], the columns of the catalogue
+    """
+    lines = tuple(lines)
+    directions = tuple(direction for line in lines for direction in (line.direction_up, line.direction_down))
+    station_names = sorted({station for direction in directions for station in direction.station_sequence})
+    index_of_station = {station: index for index, station in enumerate(station_names)}
+    return {
+        "line_names": np.array([line.name for line in lines], dtype=str),
+        "station_names": np.array(station_names, dtype=str),
+        "station_ids": np.array(
+            [index_of_station[station] for direction in directions for station in direction.station_sequence],
+            dtype=np.int64,
+        ),
+        "trip_times": np.array(
+            [trip_time.total_seconds() for direction in directions for trip_time in direction.trip_times],
+            dtype=np.float64,
+        ),
+        "direction_offsets": np.cumsum([0, *(direction.station_count for direction in directions)], dtype=np.int64),
+    }
+
+
+def _create_lines_from_catalogue(line_factory: LineFactory, catalogue: Mapping[str, np.ndarray]) -> tuple[BusLine, ...]:
+    """
+    Create the lines from the columns of a catalogue, the trip times of a direction with n stations are
+        at the offset of the direction minus its index, as there are n - 1 of them.
+    :param line_factory: LineFactory, contains capacity and permitted frequency of lines
+    :param catalogue: Mapping[str, np.ndarray], the columns of the catalogue
+    :return: tuple[BusLine, ...], the lines
+    """
+    station_names = tuple(StationName(name) for name in catalogue["station_names"].tolist())
+    station_ids, trip_times = catalogue["station_ids"].tolist(), catalogue["trip_times"].tolist()
+    offsets = catalogue["direction_offsets"].tolist()
+
+    def create_direction(index: int) -> Direction:
+        begin, end = offsets[index], offsets[index + 1]
+        return Direction(
+            name=_DIRECTION_NAMES[index % 2],
+            station_sequence=tuple(station_names[station_id] for station_id in station_ids[begin:end]),
+            trip_times=tuple(map(_convert_seconds_to_timedelta, trip_times[begin - index : end - index - 1])),
+        )
+
+    return tuple(
+        BusLine(
+            LineNr(i),
+            LineName(name),
+            create_direction(2 * i),
+            create_direction(2 * i + 1),
+            line_factory.regular_capacity,
+            line_factory.permitted_frequencies,
+        )
+        for i, name in enumerate(catalogue["line_names"].tolist())
+    )
 
 
 def _equalise_travel_times_per_link(lines: Sequence[BusLine]) -> tuple[BusLine, ...]:
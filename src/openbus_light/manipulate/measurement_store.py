@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import replace
+from pathlib import Path
+from typing import Collection, Mapping, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from ..model import BusLine, Direction, LineName, RecordedTrip, RecordedTripTable, StationName, TripNr
+from ..model.type import CirculationId
+from .columnar_cache import calculate_file_hash, open_cached_columns, store_columns
+from .recorded_trip import enrich_lines_with_recorded_trips
+
+_MANIFEST_FILE = "manifest.json"
+
+
+class MeasurementPartition(NamedTuple):
+    name: str
+    source_names: tuple[str, ...]
+    source_hashes: tuple[str, ...]
+    first_departure: np.datetime64
+    last_departure: np.datetime64
+    trip_count: int
+
+    def overlaps(self, earliest: Optional[np.datetime64], latest: Optional[np.datetime64]) -> bool:
+        """
+        Check whether some trips of the partition may depart within the given (closed) time window.
+        :param earliest: Optional[np.datetime64], the start of the window, unbounded if None
+        :param latest: Optional[np.datetime64], the end of the window, unbounded if None
+        :return: bool
+        """
+        if self.trip_count == 0:
+            return False
+        return not (
+            (earliest is not None and self.last_departure < earliest)
+            or (latest is not None and self.first_departure > latest)
+        )
+
+
+class MeasurementStore:
+    """
+    An append-only store of the recorded trips of lines, with one partition per ingested measurement file.
+        A partition holds the trips segmented and assigned to the directions, as ``.npy`` columns that are
+        mapped into memory. The manifest records the source files of each partition (by hash, such that a file
+        is ingested once) and the range of their planned departures (such that queries skip partitions).
+    """
+
+    def __init__(self, directory: Path, lines: Collection[BusLine]) -> None:
+        """
+        Open the store in the directory, it is created if it does not exist.
+        :param directory: Path, the directory of the store
+        :param lines: Collection[BusLine], the lines whose trips are stored, the stored trips are assigned to
+            their directions, hence a store only accepts the lines it was created with
+        """
+        self._directory = directory
+        self._lines = tuple(sorted(lines, key=lambda line: line.name))
+        self._line_fingerprint = _calculate_line_fingerprint(self._lines)
+        self._partitions: list[MeasurementPartition] = []
+        if (directory / _MANIFEST_FILE).is_file():
+            self._read_manifest()
+
+    @property
+    def partitions(self) -> tuple[MeasurementPartition, ...]:
+        return tuple(self._partitions)
+
+    def contains(self, source: Path) -> bool:
+        """
+        Check whether the content of a file was ingested already (under any name).
+        :param source: Path, the measurement file
+        :return: bool
+        """
+        source_hash = calculate_file_hash(source)
+        return any(source_hash in partition.source_hashes for partition in self._partitions)
+
+    def append(self, source: Path, max_workers: int = 1) -> bool:
+        """
+        Ingest a measurement file into a new partition, unless its content was ingested already. Only this file
+            is parsed, segmented and assigned to directions, the existing partitions are not touched.
+        :param source: Path, the measurement file (zipped or plain csv)
+        :param max_workers: int, the number of processes for the lines, see ``enrich_lines_with_recorded_trips``
+        :return: bool, whether the file was ingested
+        """
+        source_hash = calculate_file_hash(source)
+        if any(source_hash in partition.source_hashes for partition in self._partitions):
+            return False
+        enriched_lines = enrich_lines_with_recorded_trips(source, self._lines, max_workers)
+        columns = _columns_of_lines(enriched_lines, {line.name: i for i, line in enumerate(self._lines)})
+        self._add_partition(source_hash, columns, (source.name,), (source_hash,))
+        self._write_manifest()
+        return True
+
+    def compact(self) -> None:
+        """
+        Merge all partitions into one, which is written before the manifest refers to it and the merged
+            partitions are removed.
+        """
+        if len(self._partitions) <= 1:
+            return
+        merged = self._partitions
+        columns = _concatenate_partitions([open_cached_columns(self._directory / p.name) for p in merged])
+        name = hashlib.sha256("".join(partition.name for partition in merged).encode("utf-8")).hexdigest()
+        self._partitions = []
+        self._add_partition(
+            name,
+            columns,
+            tuple(source for partition in merged for source in partition.source_names),
+            tuple(source for partition in merged for source in partition.source_hashes),
+        )
+        self._write_manifest()
+        for partition in merged:
+            shutil.rmtree(self._directory / partition.name, ignore_errors=True)
+
+    def query(
+        self, earliest: Optional[np.datetime64] = None, latest: Optional[np.datetime64] = None
+    ) -> tuple[BusLine, ...]:
+        """
+        Get the lines with the stored trips whose planned first departure is within the given (closed) time
+            window. Only the partitions that overlap the window are opened, and only the selected trips copied.
+        :param earliest: Optional[np.datetime64], the start of the window, unbounded if None
+        :param latest: Optional[np.datetime64], the end of the window, unbounded if None
+        :return: tuple[BusLine, ...], the lines of the store (sorted by name), the trips of each direction
+            in the order of the partitions and numbered from zero
+        """
+        tables: dict[int, list[RecordedTripTable]] = {}
+        circulation_ids: dict[int, list[np.ndarray]] = {}
+        for partition in self._partitions:
+            if not partition.overlaps(earliest, latest):
+                continue
+            columns = open_cached_columns(self._directory / partition.name)
+            table = _create_table(columns)
+            first_departures = table.departure_planned[table.trip_offsets[:-1]].view("datetime64[ns]")
+            is_selected = np.ones(table.trip_count, dtype=bool)
+            if earliest is not None:
+                is_selected &= first_departures >= np.datetime64(earliest, "ns")
+            if latest is not None:
+                is_selected &= first_departures <= np.datetime64(latest, "ns")
+            direction_of_trip = 2 * columns["line_ids"] + columns["directions"]
+            for direction_key in np.unique(direction_of_trip[is_selected]).tolist():
+                positions = np.flatnonzero(is_selected & (direction_of_trip == direction_key))
+                tables.setdefault(direction_key, []).append(table.select_trips(positions))
+                circulation_ids.setdefault(direction_key, []).append(columns["circulation_ids"][positions])
+
+        def with_trips(line: BusLine, direction: Direction, direction_key: int) -> Direction:
+            return _with_recorded_trips(
+                line.name,
+                direction,
+                RecordedTripTable.concatenate(tables.get(direction_key, [])),
+                np.concatenate(circulation_ids.get(direction_key, [np.empty(0, dtype=str)])),
+            )
+
+        return tuple(
+            line._replace(
+                direction_up=with_trips(line, line.direction_up, 2 * i),
+                direction_down=with_trips(line, line.direction_down, 2 * i + 1),
+            )
+            for i, line in enumerate(self._lines)
+        )
+
+    def _add_partition(
+        self,
+        name: str,
+        columns: Mapping[str, np.ndarray],
+        source_names: tuple[str, ...],
+        source_hashes: tuple[str, ...],
+    ) -> None:
+        """
+        Store the columns of a new partition and describe it, the manifest is not written.
+        """
+        store_columns(columns, self._directory / name)
+        first_departures = columns["departure_planned"][columns["trip_offsets"][:-1]].view("datetime64[ns]")
+        first_departures = first_departures[~np.isnat(first_departures)]
+        self._partitions.append(
+            MeasurementPartition(
+                name=name,
+                source_names=source_names,
+                source_hashes=source_hashes,
+                first_departure=first_departures.min() if len(first_departures) else np.datetime64("NaT", "ns"),
+                last_departure=first_departures.max() if len(first_departures) else np.datetime64("NaT", "ns"),
+                trip_count=len(columns["trip_offsets"]) - 1,
+            )
+        )
+
+    def _read_manifest(self) -> None:
+        with open(self._directory / _MANIFEST_FILE, encoding="utf-8") as file:
+            manifest = json.load(file)
+        if manifest["lines"] != self._line_fingerprint:
+            raise ValueError(f"the store in {self._directory} holds the trips of other lines")
+        self._partitions = [
+            MeasurementPartition(
+                name=partition["name"],
+                source_names=tuple(partition["source_names"]),
+                source_hashes=tuple(partition["source_hashes"]),
+                first_departure=np.datetime64(partition["first_departure"], "ns"),
+                last_departure=np.datetime64(partition["last_departure"], "ns"),
+                trip_count=partition["trip_count"],
+            )
+            for partition in manifest["partitions"]
+        ]
+
+    def _write_manifest(self) -> None:
+        """
+        Replace the manifest at once, such that it always refers to complete partitions.
+        """
+        manifest = {
+            "lines": self._line_fingerprint,
+            "partitions": [
+                {
+                    "name": partition.name,
+                    "source_names": partition.source_names,
+                    "source_hashes": partition.source_hashes,
+                    "first_departure": str(partition.first_departure),
+                    "last_departure": str(partition.last_departure),
+                    "trip_count": partition.trip_count,
+                }
+                for partition in self._partitions
+            ],
+        }
+        being_written = self._directory / f"{_MANIFEST_FILE}.partial"
+        with open(being_written, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(being_written, self._directory / _MANIFEST_FILE)
+
+
+def _calculate_line_fingerprint(lines: Sequence[BusLine]) -> str:
+    """
+    Calculate a hash of the names and station sequences of the lines, which the assigned directions depend on.
+    :param lines: Sequence[BusLine], the lines
+    :return: str, the hexadecimal SHA-256
+    """
+    description = [
+        (line.name, direction.name, direction.station_sequence)
+        for line in lines
+        for direction in (line.direction_up, line.direction_down)
+    ]
+    return hashlib.sha256(json.dumps(description).encode("utf-8")).hexdigest()
+
+
+def _columns_of_lines(lines: Sequence[BusLine], line_ids: Mapping[str, int]) -> dict[str, np.ndarray]:
+    """
+    Arrange the recorded trips of the lines in columns: the stops of all trips in one table, and for each trip
+        its line (as index), its direction (0 for up, 1 for down) and its circulation.
+    :param lines: Sequence[BusLine], the lines with recorded trips
+    :param line_ids: Mapping[str, int], the index of each line in the store
+    :return: dict[str, np.ndarray], the columns by name
+    """
+    directions = [
+        (line, i, direction) for line in lines for i, direction in enumerate((line.direction_up, line.direction_down))
+    ]
+    table = RecordedTripTable.concatenate([direction.recorded_trip_table for _, _, direction in directions])
+    return {
+        "station_names": np.array(table.station_names, dtype=str),
+        "station_ids": table.station_ids,
+        "arrival_planned": table.arrival_planned,
+        "arrival_observed": table.arrival_observed,
+        "departure_planned": table.departure_planned,
+        "departure_observed": table.departure_observed,
+        "trip_offsets": table.trip_offsets,
+        "line_ids": np.concatenate(
+            [np.full(len(direction.recorded_trips), line_ids[line.name], np.int64) for line, _, direction in directions]
+            + [np.empty(0, dtype=np.int64)]
+        ),
+        "directions": np.concatenate(
+            [np.full(len(direction.recorded_trips), i, np.int64) for _, i, direction in directions]
+            + [np.empty(0, dtype=np.int64)]
+        ),
+        "circulation_ids": np.array(
+            [trip.circulation_id for _, _, direction in directions for trip in direction.recorded_trips], dtype=str
+        ),
+    }
+
+
+def _concatenate_partitions(partitions: Sequence[Mapping[str, np.ndarray]]) -> dict[str, np.ndarray]:
+    """
+    Concatenate the columns of partitions, in their order.
+    :param partitions: Sequence[Mapping[str, np.ndarray]], the columns of each partition
+    :return: dict[str, np.ndarray], the columns of one partition with the trips of all
+    """
+    table = RecordedTripTable.concatenate([_create_table(columns) for columns in partitions])
+    return {
+        "station_names": np.array(table.station_names, dtype=str),
+        "station_ids": table.station_ids,
+        "arrival_planned": table.arrival_planned,
+        "arrival_observed": table.arrival_observed,
+        "departure_planned": table.departure_planned,
+        "departure_observed": table.departure_observed,
+        "trip_offsets": table.trip_offsets,
+        **{
+            name: np.concatenate([columns[name] for columns in partitions])
+            for name in ("line_ids", "directions", "circulation_ids")
+        },
+    }
+
+
+def _create_table(columns: Mapping[str, np.ndarray]) -> RecordedTripTable:
+    """
+    Refer to the stops of the trips of a partition as table, without copying them.
+    :param columns: Mapping[str, np.ndarray], the columns of the partition
+    :return: RecordedTripTable
+    """
+    return RecordedTripTable(
+        station_names=tuple(StationName(name) for name in columns["station_names"].tolist()),
+        station_ids=columns["station_ids"],
+        arrival_planned=columns["arrival_planned"],
+        arrival_observed=columns["arrival_observed"],
+        departure_planned=columns["departure_planned"],
+        departure_observed=columns["departure_observed"],
+        trip_offsets=columns["trip_offsets"],
+    )
+
+
+def _with_recorded_trips(
+    line_name: LineName, direction: Direction, table: RecordedTripTable, circulation_ids: np.ndarray
+) -> Direction:
+    """
+    Replace the recorded trips of a direction by the trips of a table.
+    :param line_name: LineName, the line of the trips
+    :param direction: Direction, the direction of the trips
+    :param table: RecordedTripTable, the stops of the trips
+    :param circulation_ids: np.ndarray, the circulation of each trip
+    :return: Direction, with the recorded trips
+    """
+    stop_counts = np.diff(table.trip_offsets)
+    first_stations = table.station_ids[table.trip_offsets[:-1]].tolist()
+    last_stations = table.station_ids[table.trip_offsets[1:] - 1].tolist()
+    return replace(
+        direction,
+        recorded_trips=tuple(
+            RecordedTrip(
+                line=line_name,
+                direction=direction.name,
+                trip_nr=TripNr(i),
+                circulation_id=CirculationId(circulation_id),
+                start=table.station_names[first],
+                end=table.station_names[last],
+                stop_count=stop_count,
+                table=table,
+                position=i,
+            )
+            for i, (circulation_id, first, last, stop_count) in enumerate(
+                zip(circulation_ids.tolist(), first_stations, last_stations, stop_counts.tolist())
+            )
+        ),
+    )
@@ -1,6 +1,7 @@
 from math import atan2, cos, radians, sin, sqrt
 
-from numba import njit
+import numpy as np
+from numba import njit, prange
 
 from ..model import PointIn2D
 
@@ -15,10 +16,80 @@ def calculate_distance_in_m(point_1: PointIn2D, point_2: PointIn2D) -> float:
     :param point_2: PointIn2D, coordinate ot the second point
     :return: float, distance between points
     """
-    d_lon = radians(point_2.long) - radians(point_1.long)  # lon2 - lon1
-    d_lat = radians(point_2.lat) - radians(point_1.lat)  # lat2 - lat1
+    return _calculate_distance_in_m(point_1.lat, point_1.long, point_2.lat, point_2.long)
 
-    value_a = sin(d_lat / 2) ** 2 + cos(point_1.lat) * cos(point_2.lat) * sin(d_lon / 2) ** 2
+
+@njit(cache=True)
+def _calculate_distance_in_m(lat_1: float, long_1: float, lat_2: float, long_2: float) -> float:
+    """
+    Calculate the Haversine distance between two points given by their coordinates,
+        all kernels working on coordinates must use this function to get identical distances.
+    :param lat_1: float, latitude of the first point
+    :param long_1: float, longitude of the first point
+    :param lat_2: float, latitude of the second point
+    :param long_2: float, longitude of the second point
+    :return: float, distance between points
+    """
+    d_lon = radians(long_2) - radians(long_1)  # lon2 - lon1
+    d_lat = radians(lat_2) - radians(lat_1)  # lat2 - lat1
+
+    value_a = sin(d_lat / 2) ** 2 + cos(lat_1) * cos(lat_2) * sin(d_lon / 2) ** 2
     value_c = 2 * atan2(sqrt(value_a), sqrt(1 - value_a))
 
     return R * value_c
+
+
+@njit(cache=True)
+def calculate_distances_from_point_in_m(
+    lat: float, long: float, other_lat: np.ndarray, other_long: np.ndarray
+) -> np.ndarray:
+    """
+    Calculate the Haversine distances from one point to many points, identical to ``calculate_distance_in_m``.
+    :param lat: float, latitude of the point
+    :param long: float, longitude of the point
+    :param other_lat: np.ndarray, contiguous float64 latitudes of the other points
+    :param other_long: np.ndarray, contiguous float64 longitudes of the other points
+    :return: np.ndarray, the distance to each of the other points
+    """
+    distances = np.empty(len(other_lat), dtype=np.float64)
+    for j, (lat_2, long_2) in enumerate(zip(other_lat, other_long)):
+        distances[j] = _calculate_distance_in_m(lat, long, lat_2, long_2)
+    return distances
+
+
+@njit(cache=True)
+def calculate_distance_matrix_in_m(
+    lat_1: np.ndarray, long_1: np.ndarray, lat_2: np.ndarray, long_2: np.ndarray
+) -> np.ndarray:
+    """
+    Calculate the Haversine distances between all points of two sets, identical to ``calculate_distance_in_m``.
+    :param lat_1: np.ndarray, contiguous float64 latitudes of the first points
+    :param long_1: np.ndarray, contiguous float64 longitudes of the first points
+    :param lat_2: np.ndarray, contiguous float64 latitudes of the second points
+    :param long_2: np.ndarray, contiguous float64 longitudes of the second points
+    :return: np.ndarray, the matrix whose row i and column j is the distance from the first point i to the second j
+    """
+    distances = np.empty((len(lat_1), len(lat_2)), dtype=np.float64)
+    for i, (lat, long) in enumerate(zip(lat_1, long_1)):
+        distances[i] = calculate_distances_from_point_in_m(lat, long, lat_2, long_2)
+    return distances
+
+
+@njit(cache=True, parallel=True)
+def calculate_distance_matrix_in_parallel(
+    lat_1: np.ndarray, long_1: np.ndarray, lat_2: np.ndarray, long_2: np.ndarray
+) -> np.ndarray:
+    """
+    Calculate the same matrix as ``calculate_distance_matrix_in_m``, the rows are distributed over all cores.
+        Worth it for large matrices only, as starting the threads has its cost.
+    :param lat_1: np.ndarray, contiguous float64 latitudes of the first points
+    :param long_1: np.ndarray, contiguous float64 longitudes of the first points
+    :param lat_2: np.ndarray, contiguous float64 latitudes of the second points
+    :param long_2: np.ndarray, contiguous float64 longitudes of the second points
+    :return: np.ndarray, the matrix whose row i and column j is the distance from the first point i to the second j
+    """
+    distances = np.empty((len(lat_1), len(lat_2)), dtype=np.float64)
+    for i in prange(len(lat_1)):  # pylint: disable=not-an-iterable
+        for j, (lat, long) in enumerate(zip(lat_2, long_2)):
+            distances[i, j] = _calculate_distance_in_m(lat_1[i], long_1[i], lat, long)
+    return distances
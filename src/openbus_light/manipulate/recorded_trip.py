@@ -1,154 +1,257 @@
+import hashlib
+import multiprocessing
 import warnings
 import zipfile
 from collections import defaultdict
-from collections.abc import KeysView
+from collections.abc import Iterator, KeysView
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from dataclasses import replace
-from enum import IntEnum
-from itertools import chain
+from functools import partial
 from pathlib import Path
 from types import MappingProxyType
-from typing import Any, Collection, Iterable, Mapping, NamedTuple, Optional, Sequence
+from typing import IO, Any, Collection, Mapping, NamedTuple, Sequence
 
+import numpy as np
 import pandas as pd
 
-from ..model import BusLine, Direction, DirectionName, LineName, RecordedTrip, StationName, TripNr
-from ..utils import pairwise, skip_one_line_in_file
-
-
-def enrich_lines_with_recorded_trips(path: Path, lines: Collection[BusLine]) -> tuple[BusLine, ...]:
+from ..analyse.stop_alignment import align_recorded_trips
+from ..model import BusLine, Direction, DirectionName, LineName, RecordedTrip, RecordedTripTable, StationName, TripNr
+from ..utils import skip_one_line_in_file
+from .columnar_cache import cache_columns, open_cached_columns
+
+_MEASUREMENTS_PER_CHUNK = 100_000
+_MINIMAL_STOP_SHARE = 0.5
+_TEXT_COLUMNS = ("LINIEN_TEXT", "UMLAUF_ID", "HALTESTELLEN_NAME")
+_TIME_FORMATS = MappingProxyType(
+    {
+        "ANKUNFTSZEIT": "%d.%m.%Y %H:%M",
+        "ABFAHRTSZEIT": "%d.%m.%Y %H:%M",
+        "AN_PROGNOSE": "%d.%m.%Y %H:%M:%S",
+        "AB_PROGNOSE": "%d.%m.%Y %H:%M:%S",
+    }
+)
+
+
+def enrich_lines_with_recorded_trips(
+    path: Path, lines: Collection[BusLine], max_workers: int = 1
+) -> tuple[BusLine, ...]:
     """
     Enrich lines by converting specified columns to datetime format, and adding recorded trips
-        in the directions of bus lines.
+        in the directions of bus lines. The lines are independent, such that they can be processed by
+        a pool of processes, which map the cached columns into memory instead of receiving copies. The processes
+        are spawned, as forking after the threaded kernels (numba) ran can deadlock.
     :param path: str, path to the file holding the recorded trips
     :param lines: Collection[BusLine], collection of bus lines
-    :return: tuple[BusLine], a tuple of enriched BusLines
+    :param max_workers: int, the number of processes for the lines, 1 processes them in this process
+    :return: tuple[BusLine], a tuple of enriched BusLines, ordered by line name
     """
-    if path.suffix == ".zip":
-        with zipfile.ZipFile(path, "r") as zip_file:
-            with zip_file.open(zip_file.namelist()[0], "r") as file_handle:
-                skip_one_line_in_file(file_handle)
-                raw_measurements = pd.read_csv(file_handle, sep=";", encoding="utf-8", dtype=str)
-    else:
-        with open(path, encoding="utf-8", mode="r") as file_handle:
-            skip_one_line_in_file(file_handle)
-            raw_measurements = pd.read_csv(file_handle, sep=";", encoding="utf-8", dtype=str)
-
-    enriched_lines = []
     lines_by_name = {line.name: line for line in lines}
-    for line_id, grouped_measurements in raw_measurements.groupby("LINIEN_TEXT"):
-        line_id = LineName(str(line_id))
-        if line_id not in lines_by_name:
-            continue
-        first_conversion = _convert_these_columns_to_datetime(
-            grouped_measurements, ("ANKUNFTSZEIT", "ABFAHRTSZEIT"), "%d.%m.%Y %H:%M"
+    hash_of_line_names = hashlib.sha256("\n".join(sorted(lines_by_name)).encode("utf-8")).hexdigest()[:16]
+    cached_at = cache_columns(
+        path, partial(_parse_measurements, line_names=frozenset(lines_by_name)), f"measurements-{hash_of_line_names}"
+    )
+    columns = open_cached_columns(cached_at)
+    line_names, line_of_row, rows_per_line = np.unique(columns["LINIEN_TEXT"], return_inverse=True, return_counts=True)
+    rows_by_line = np.split(np.argsort(line_of_row, kind="stable"), np.cumsum(rows_per_line)[:-1])
+    lines_to_enrich = [lines_by_name[LineName(line_id)] for line_id in line_names.tolist()]
+    if max_workers <= 1 or len(lines_to_enrich) <= 1:
+        return tuple(
+            _add_recorded_trips_to_line(line, _select_rows(columns, rows))
+            for line, rows in zip(lines_to_enrich, rows_by_line)
         )
-        second_conversion = _convert_these_columns_to_datetime(
-            first_conversion, ("AN_PROGNOSE", "AB_PROGNOSE"), "%d.%m.%Y %H:%M:%S"
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return tuple(
+            executor.map(partial(_add_recorded_trips_from_cached_columns, cached_at), lines_to_enrich, rows_by_line)
         )
-        enriched_lines.append(_add_recorded_trips_to_line(lines_by_name[line_id], second_conversion))
-    return tuple(enriched_lines)
 
 
-def _convert_these_columns_to_datetime(
-    data_frame: pd.DataFrame, columns: Iterable[str], datetime_format: Optional[str]
-) -> pd.DataFrame:
+def _add_recorded_trips_from_cached_columns(cached_at: Path, line: BusLine, rows: np.ndarray) -> BusLine:
     """
-    Convert specified columns to datetime format. Parsing errors are set to NaT.
-    :param data_frame: pd.DataFrame, dataframe of bus line information
-    :param columns: Iterable[str], iterable of names of the column that need to be converted to datetime
-    :param datetime_format: Optional[str], specified format of the datetime, that guides the conversion
-    :return: pd.DataFrame, dataframe with specified columns converted to datetime
+    Add the recorded trips to a line in a worker process, which maps the cached columns into memory itself.
+    :param cached_at: Path, the directory of the cached measurements
+    :param line: BusLine
+    :param rows: np.ndarray, the rows of the measurements of this line
+    :return: BusLine, bus line with recorded trips added in the directions
     """
-    for column in columns:
-        data_frame[column] = pd.to_datetime(data_frame[column], errors="coerce", format=datetime_format)
-    return data_frame
+    return _add_recorded_trips_to_line(line, _select_rows(open_cached_columns(cached_at), rows))
 
 
-def __is_the_start_of_a_run(row_as_tuple: tuple[Any, ...]) -> bool:
+def _select_rows(columns: Mapping[str, np.ndarray], rows: np.ndarray) -> dict[str, np.ndarray]:
     """
-    Check whether a row is the start of the run by checking whether the ''ANKUNFTSZEIT'' is null,
-        because at the start of a run, the arrival time is usually not recorded.
-    :param row_as_tuple: tuple[Any, ...], tuple that represents a row from a dataframe
-    :return: bool, True indicates that the row is the start of the run
+    Copy the given rows of the measurements, without the line name.
+    :param columns: Mapping[str, np.ndarray], the columns of the measurements
+    :param rows: np.ndarray, the rows to select
+    :return: dict[str, np.ndarray], the selected rows of the columns
     """
-    return pd.isnull(row_as_tuple.ANKUNFTSZEIT)  # type: ignore
+    return {name: column[rows] for name, column in columns.items() if name != "LINIEN_TEXT"}
 
 
-def __is_the_end_of_a_run(row_as_tuple: tuple[Any, ...]) -> bool:
+def _parse_measurements(path: Path, line_names: Collection[LineName]) -> dict[str, np.ndarray]:
     """
-    Check whether a row is the start of the run by checking whether the ''ABFAHRTSZEIT'' is null.
-    :param row_as_tuple: tuple[Any, ...], tuple that represents a row from a dataframe
-    :return: bool, True indicates that the row is the end of the run
+    Parse the measurements of the given lines, from a zipped or plain csv file. The file is decompressed and
+        parsed in chunks, of which only the rows of the given lines and the needed columns are kept. The times
+        are converted to nanoseconds since the epoch (as int64, NaT if they cannot be parsed), missing texts
+        become empty.
+    :param path: Path, path to the file holding the recorded trips
+    :param line_names: Collection[LineName], the lines whose measurements are kept
+    :return: dict[str, np.ndarray], the columns LINIEN_TEXT, UMLAUF_ID, HALTESTELLEN_NAME and the times
     """
-    return pd.isnull(row_as_tuple.ABFAHRTSZEIT)  # type: ignore
-
-
-class _Event(IntEnum):
-    START = 1
-    END = -1
+    parsed_chunks = [
+        {
+            **{name: np.empty(0, dtype=str) for name in _TEXT_COLUMNS},
+            **{name: np.empty(0, dtype=np.int64) for name in _TIME_FORMATS},
+        }
+    ]
+    with _open_measurements(path) as file_handle:
+        for chunk in pd.read_csv(
+            file_handle,
+            sep=";",
+            encoding="utf-8",
+            dtype=str,
+            usecols=[*_TEXT_COLUMNS, *_TIME_FORMATS],
+            chunksize=_MEASUREMENTS_PER_CHUNK,
+        ):
+            parsed_chunks.append(_parse_chunk_of_measurements(chunk[chunk.LINIEN_TEXT.isin(list(line_names))]))
+    return {name: np.concatenate([chunk[name] for chunk in parsed_chunks]) for name in parsed_chunks[0]}
+
+
+@contextmanager
+def _open_measurements(path: Path) -> Iterator[IO[Any]]:
+    """
+    Open the (zipped) csv file holding the recorded trips, positioned after the separator line.
+    :param path: Path, path to the file holding the recorded trips
+    :return: Iterator[IO], the file handle, which streams the decompressed content of an archive
+    """
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(path, "r") as zip_file:
+            with zip_file.open(zip_file.namelist()[0], "r") as file_handle:
+                skip_one_line_in_file(file_handle)
+                yield file_handle
+    else:
+        with open(path, encoding="utf-8", mode="r") as file_handle:
+            skip_one_line_in_file(file_handle)
+            yield file_handle
 
 
-def _find_indices_of_start_and_end_pairs(measurements: pd.DataFrame) -> tuple[tuple[int, int], ...]:
+def _parse_chunk_of_measurements(measurements: pd.DataFrame) -> dict[str, np.ndarray]:
     """
-    Find the pair of indices of start and end of a run.
-    :param measurements: pd.DataFrame, dataframe containing information of the run
-    :return: tuple[tuple[int, int], ...], tuple of pairs of start and end index
+    Convert the texts and times of measurements into typed columns.
+    :param measurements: pd.DataFrame, measurements as texts
+    :return: dict[str, np.ndarray], the texts (missing ones empty) and the times in ns since the epoch (or NaT)
     """
-
-    first_departure_with_index = (
-        (_Event.START, i) for i, row in enumerate(measurements.itertuples(index=False)) if __is_the_start_of_a_run(row)
-    )
-    last_arrival_with_index = (
-        (_Event.END, i) for i, row in enumerate(measurements.itertuples(index=False)) if __is_the_end_of_a_run(row)
-    )
-    events_with_indexes = sorted(
-        chain.from_iterable((first_departure_with_index, last_arrival_with_index)), key=lambda p: p[1]
-    )
-    return tuple(
-        (first_index, second_index)
-        for (first_event, first_index), (second_event, second_index) in pairwise(events_with_indexes)
-        if first_event == _Event.START and second_event == _Event.END
-    )
+    return {
+        **{name: measurements[name].fillna("").to_numpy(dtype=str) for name in _TEXT_COLUMNS},
+        **{
+            name: pd.to_datetime(measurements[name], errors="coerce", format=datetime_format)
+            .to_numpy(dtype="datetime64[ns]")
+            .view(np.int64)
+            for name, datetime_format in _TIME_FORMATS.items()
+        },
+    }
+
+
+def _find_indices_of_start_and_end_pairs(
+    arrival_planned: np.ndarray, departure_planned: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Find the pairs of indices of start and end of a run. A run starts where the planned arrival is missing
+        (it is usually not recorded at the start) and ends where the planned departure is missing. The start
+        and end events are ordered by row (the start first within a row), a run is a start followed by an end.
+    :param arrival_planned: np.ndarray, the planned arrival of each row, in ns since the epoch (int64, or NaT)
+    :param departure_planned: np.ndarray, the planned departure of each row, in ns since the epoch (int64, or NaT)
+    :return: tuple[np.ndarray, np.ndarray], the indices of the start and of the end of each run
+    """
+    is_event = np.empty(2 * len(arrival_planned), dtype=bool)
+    is_event[0::2] = np.isnat(arrival_planned.view("datetime64[ns]"))
+    is_event[1::2] = np.isnat(departure_planned.view("datetime64[ns]"))
+    events = np.flatnonzero(is_event)
+    rows, is_end = events // 2, (events % 2).astype(bool)
+    is_start_of_pair = ~is_end[:-1] & is_end[1:]
+    return rows[:-1][is_start_of_pair], rows[1:][is_start_of_pair]
 
 
 def _extract_recorded_trips(
-    line_id: LineName, measurements: pd.DataFrame, pairs: Collection[tuple[int, int]]
+    line_id: LineName, measurements: Mapping[str, np.ndarray], begins: np.ndarray, ends: np.ndarray
 ) -> dict[tuple[StationName, StationName], Sequence[RecordedTrip]]:
     """
-    Extract recorded trips from the measurements.
+    Extract recorded trips from the measurements, the stops of all trips are stored in one table.
     :param line_id: LineName, name of the bus line
-    :param measurements: pd.DataFrame, dataframe containing information of the run
-    :param pairs: Collection[tuple[int, int]], pairs of start and end index
+    :param measurements: Mapping[str, np.ndarray], the columns of the measurements of the line
+    :param begins: np.ndarray, the index of the start of each run
+    :param ends: np.ndarray, the index of the end of each run
     :return: dict[tuple[StationName, StationName], Sequence[RecordedTrip]],
     start station and end station with recorded trips
     """
+    stop_counts = ends - begins + 1
+    table = _create_recorded_trip_table(measurements, begins, stop_counts)
+    station_names_of_rows = measurements["HALTESTELLEN_NAME"]
 
     recorded_trips_by_start_end = defaultdict(list)
-    for i, (begin, end) in enumerate(pairs):
+    for i, (circulation_id, start, end, stop_count) in enumerate(
+        zip(
+            measurements["UMLAUF_ID"][begins].tolist(),
+            station_names_of_rows[begins].tolist(),
+            station_names_of_rows[ends].tolist(),
+            stop_counts.tolist(),
+        )
+    ):
         recorded_trip = RecordedTrip(
             line=line_id,
             direction=DirectionName("UNDEFINED"),
             trip_nr=TripNr(i),
-            circulation_id=measurements.iloc[begin].UMLAUF_ID,
-            start=measurements.iloc[begin].HALTESTELLEN_NAME,
-            end=measurements.iloc[end].HALTESTELLEN_NAME,
-            stop_count=end - begin + 1,
-            record=pd.DataFrame(
-                {
-                    "station_name": row.HALTESTELLEN_NAME,
-                    "arrival_planned": row.ANKUNFTSZEIT,
-                    "arrival_observed": row.AN_PROGNOSE,
-                    "departure_planned": row.ABFAHRTSZEIT,
-                    "departure_observed": row.AB_PROGNOSE,
-                }
-                for row in measurements[begin : end + 1].itertuples(index=False)
-            ),
+            circulation_id=circulation_id,
+            start=start,
+            end=end,
+            stop_count=stop_count,
+            table=table,
+            position=i,
         )
         recorded_trips_by_start_end[(recorded_trip.start, recorded_trip.end)].append(recorded_trip)
 
     return {key: tuple(value) for key, value in recorded_trips_by_start_end.items()}
 
 
+def _create_recorded_trip_table(
+    measurements: Mapping[str, np.ndarray], begins: np.ndarray, stop_counts: np.ndarray
+) -> RecordedTripTable:
+    """
+    Copy the stops of the trips from the measurements into one table.
+    :param measurements: Mapping[str, np.ndarray], the columns of the measurements of the line
+    :param begins: np.ndarray, the row of the first stop of each trip
+    :param stop_counts: np.ndarray, the number of stops of each trip
+    :return: RecordedTripTable, the trips in the given order
+    """
+    trip_offsets = np.concatenate(([0], np.cumsum(stop_counts))).astype(np.int64)
+    rows = np.repeat(begins - trip_offsets[:-1], stop_counts) + np.arange(trip_offsets[-1])
+    station_names, station_ids = np.unique(measurements["HALTESTELLEN_NAME"][rows], return_inverse=True)
+
+    def times_of(column: str) -> np.ndarray:
+        return np.asarray(measurements[column][rows], dtype=np.int64)
+
+    return RecordedTripTable(
+        station_names=tuple(StationName(name) for name in station_names.tolist()),
+        station_ids=station_ids.astype(np.int64),
+        arrival_planned=times_of("ANKUNFTSZEIT"),
+        arrival_observed=times_of("AN_PROGNOSE"),
+        departure_planned=times_of("ABFAHRTSZEIT"),
+        departure_observed=times_of("AB_PROGNOSE"),
+        trip_offsets=trip_offsets,
+    )
+
+
+def _gather_in_one_table(trips: Sequence[RecordedTrip]) -> tuple[RecordedTrip, ...]:
+    """
+    Copy the stops of the given trips (of one line) into a new table, in the order of the trips.
+    :param trips: Sequence[RecordedTrip], trips that share a table
+    :return: tuple[RecordedTrip, ...], the trips referring to the new table
+    """
+    if len(trips) == 0:
+        return tuple()
+    table = trips[0].table.select_trips([trip.position for trip in trips])
+    return tuple(trip._replace(table=table, position=i) for i, trip in enumerate(trips))
+
+
 class StationOrdering(NamedTuple):
     first_occurrence: MappingProxyType[StationName, int]
     last_occurrence: MappingProxyType[StationName, int]
@@ -216,24 +319,57 @@ def _assign_recorded_trips_to_directions(
     return tuple(recorded_trips_in_direction_a), tuple(recorded_trips_in_direction_b), tuple(missed_trips)
 
 
-def _add_recorded_trips_to_line(line: BusLine, raw_recordings: pd.DataFrame) -> BusLine:
+def _assign_recorded_trips_by_alignment(
+    line: BusLine, trips: Sequence[RecordedTrip], minimal_stop_share: float = _MINIMAL_STOP_SHARE
+) -> tuple[tuple[RecordedTrip, ...], tuple[RecordedTrip, ...], tuple[RecordedTrip, ...]]:
+    """
+    Assign recorded trips, whose start or end station does not give a direction (e.g. trips from or to a depot,
+        or deviating trips), to the direction that visits most of their stops in order. A trip is only assigned
+        if at least the minimal share of its recorded stops is visited in the order of that direction.
+    :param line: BusLine
+    :param trips: Sequence[RecordedTrip], trips of the line that share a table
+    :param minimal_stop_share: float, the minimal share of the stops of a trip in the order of its direction
+    :return: tuple[tuple[RecordedTrip, ...], tuple[RecordedTrip, ...], tuple[RecordedTrip, ...]],
+        the trips assigned to direction a, to direction b, and the trips that still cannot be assigned
+    """
+    if len(trips) == 0:
+        return tuple(), tuple(), tuple()
+    alignment = align_recorded_trips(line, trips[0].table.select_trips([trip.position for trip in trips]))
+    best_direction = alignment.best_direction
+    is_aligned = (best_direction >= 0) & (
+        alignment.stop_share[np.arange(len(trips)), np.maximum(best_direction, 0)] >= minimal_stop_share
+    )
+    direction_of_trip = np.where(is_aligned, best_direction, -1).tolist()
+    return (
+        tuple(t._replace(direction=line.direction_up.name) for t, d in zip(trips, direction_of_trip) if d == 0),
+        tuple(t._replace(direction=line.direction_down.name) for t, d in zip(trips, direction_of_trip) if d == 1),
+        tuple(t for t, d in zip(trips, direction_of_trip) if d == -1),
+    )
+
+
+def _add_recorded_trips_to_line(line: BusLine, raw_recordings: Mapping[str, np.ndarray]) -> BusLine:
     """
-    Add recorded trips to the corresponding direction of the bus line.
+    Add recorded trips to the corresponding direction of the bus line, by their start and end station, or else by
+        the alignment of their stops with the directions.
     :param line: BusLine
-    :param raw_recordings: pd.DataFrame, dataframe containing trips information
+    :param raw_recordings: Mapping[str, np.ndarray], the columns of the measurements of the line
     :return: BusLine, bus line with recorded trips added in the directions
     """
-    index_pairs = _find_indices_of_start_and_end_pairs(raw_recordings)
-    recorded_trips = _extract_recorded_trips(line.name, raw_recordings, index_pairs)
-    in_direction_a, in_direction_b, no_direction = _assign_recorded_trips_to_directions(line, recorded_trips)
+    begins, ends = _find_indices_of_start_and_end_pairs(raw_recordings["ANKUNFTSZEIT"], raw_recordings["ABFAHRTSZEIT"])
+    recorded_trips = _extract_recorded_trips(line.name, raw_recordings, begins, ends)
+    in_direction_a, in_direction_b, unplaced = _assign_recorded_trips_to_directions(line, recorded_trips)
+    aligned_to_a, aligned_to_b, no_direction = _assign_recorded_trips_by_alignment(line, unplaced)
     if len(no_direction) > 0:
         warnings.warn(
             f"There are some measurements ({len(no_direction)}) in {line.number=}, {line.name=}\n"
             f"that cannot be assigned a direction \n"
-            f"while {len(in_direction_a)} and {len(in_direction_b)} are assigned to the directions.",
+            f"while {len(in_direction_a) + len(aligned_to_a)} and {len(in_direction_b) + len(aligned_to_b)} "
+            f"are assigned to the directions.",
             RuntimeWarning,
         )
     return line._replace(
-        direction_up=replace(line.direction_up, recorded_trips=in_direction_a),
-        direction_down=replace(line.direction_down, recorded_trips=in_direction_b),
+        direction_up=replace(line.direction_up, recorded_trips=_gather_in_one_table((*in_direction_a, *aligned_to_a))),
+        direction_down=replace(
+            line.direction_down, recorded_trips=_gather_in_one_table((*in_direction_b, *aligned_to_b))
+        ),
     )
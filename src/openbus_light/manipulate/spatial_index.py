@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+from math import asin, degrees, pi, radians, sin, sqrt
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+from numba import njit
+
+from ..model import PointIn2D, StationTable
+from ..model.type import Meter
+from .point import R, _calculate_distance_in_m, calculate_distance_matrix_in_m
+
+# relative and absolute padding of the search box, such that rounding can never exclude a point within the radius
+_RELATIVE_PADDING = 1e-6
+_ABSOLUTE_PADDING_IN_DEGREES = 1e-9
+# number of positions compared with all others at once, if no grid can be used
+_BLOCK_SIZE = 1024
+
+
+class _SearchBox(NamedTuple):
+    lat: float
+    long: float
+
+
+class _StopPoints(NamedTuple):
+    lat: np.ndarray
+    long: np.ndarray
+    station_index: np.ndarray
+
+    @classmethod
+    def from_table(cls, stations: StationTable) -> _StopPoints:
+        """
+        Take the points of all stations, in the order of the stations.
+        :param stations: StationTable
+        :return: _StopPoints, coordinates of all points together with the index of their station
+        """
+        return cls(lat=stations.point_lat, long=stations.point_long, station_index=stations.station_of_point)
+
+
+def find_nearest_station_within_radius(
+    positions: Sequence[PointIn2D], stations: StationTable, radius: Meter
+) -> np.ndarray:
+    """
+    Find for each position the station with the nearest point, if that point is closer than the radius.
+        The stop points are put into a uniform grid of latitude/longitude cells that are at least as large as
+        the radius, such that only the points in the neighbouring cells need to be compared. The distances are
+        the ones of ``calculate_distance_in_m`` and ties are resolved to the first station, so the result is
+        identical to comparing each position with every station. If the coordinates are such that a grid can not
+        bound the distances, all pairs are compared.
+    :param positions: Sequence[PointIn2D], the positions to associate (e.g. of district points)
+    :param stations: StationTable, the stations to associate with, each with at least one point
+    :param radius: Meter, only stations closer than this are associated
+    :return: np.ndarray, the index of the nearest station per position (-1 if none is within the radius)
+    """
+    stop_points = _StopPoints.from_table(stations)
+    position_lat = np.array([position.lat for position in positions], dtype=np.float64)
+    position_long = np.array([position.long for position in positions], dtype=np.float64)
+    if len(position_lat) == 0 or len(stop_points.lat) == 0:
+        return np.full(len(position_lat), -1, dtype=np.int64)
+    search_box = _calculate_search_box(
+        np.concatenate((position_lat, stop_points.lat)), np.concatenate((position_long, stop_points.long)), radius
+    )
+    if search_box is None:
+        return _find_nearest_station_by_comparing_all(position_lat, position_long, stop_points, float(radius))
+    cell_keys, long_cell_count = _calculate_cell_keys(stop_points.lat, stop_points.long, search_box)
+    order = np.argsort(cell_keys, kind="stable")
+    return _find_nearest_in_neighbouring_cells(
+        position_lat,
+        position_long,
+        stop_points.lat[order],
+        stop_points.long[order],
+        stop_points.station_index[order],
+        cell_keys[order],
+        long_cell_count,
+        search_box.lat,
+        search_box.long,
+        float(np.nanmin(stop_points.lat)),
+        float(np.nanmin(stop_points.long)),
+        float(radius),
+    )
+
+
+def find_pairs_within_radius(
+    lat: np.ndarray, long: np.ndarray, radius: Meter
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find all pairs of positions that are closer than the radius, using the same grid as
+        ``find_nearest_station_within_radius``. The pairs are ordered as by ``itertools.combinations``
+        and the distances are the ones of ``calculate_distance_in_m`` between the positions ``first`` and ``second``.
+        If the coordinates are such that a grid can not bound the distances, all pairs are compared.
+    :param lat: np.ndarray, the latitudes of the positions (e.g. of the centers of the stations)
+    :param long: np.ndarray, the longitudes of the positions
+    :param radius: Meter, only pairs closer than this are returned
+    :return: tuple[np.ndarray, np.ndarray, np.ndarray], the first indices, the second indices and the
+        distances of the pairs
+    """
+    lat, long = np.asarray(lat, dtype=np.float64), np.asarray(long, dtype=np.float64)
+    if len(lat) < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    if (search_box := _calculate_search_box(lat, long, radius)) is None:
+        return _find_pairs_by_comparing_all(lat, long, float(radius))
+    cell_keys, long_cell_count = _calculate_cell_keys(lat, long, search_box)
+    order = np.argsort(cell_keys, kind="stable")
+    first, second, distances = _find_pairs_in_neighbouring_cells(
+        lat, long, order, cell_keys, cell_keys[order], long_cell_count, float(radius)
+    )
+    pair_order = np.lexsort((second, first))
+    return first[pair_order], second[pair_order], distances[pair_order]
+
+
+def _find_nearest_station_by_comparing_all(
+    position_lat: np.ndarray, position_long: np.ndarray, stop_points: _StopPoints, radius: float
+) -> np.ndarray:
+    """
+    Find the nearest station by comparing each position with every stop point, a block of positions at a time.
+        A station's distance is the minimum over its points as taken by ``min``, which keeps a nan distance
+        to its first point and skips later ones, and ``np.argmin`` picks the first nan or minimum.
+    :param position_lat: np.ndarray, the latitudes of the positions
+    :param position_long: np.ndarray, the longitudes of the positions
+    :param stop_points: _StopPoints, the points of all stations
+    :param radius: float, only stations closer than this are associated
+    :return: np.ndarray, the index of the nearest station per position (-1 if none is within the radius)
+    """
+    first_point_of_station = np.flatnonzero(np.diff(stop_points.station_index, prepend=-1))
+    nearest_station = np.full(len(position_lat), -1, dtype=np.int64)
+    for start in range(0, len(position_lat), _BLOCK_SIZE):
+        block = slice(start, start + _BLOCK_SIZE)
+        distances = calculate_distance_matrix_in_m(
+            position_lat[block], position_long[block], stop_points.lat, stop_points.long
+        )
+        distance_per_station = np.fmin.reduceat(distances, first_point_of_station, axis=1)
+        distance_per_station[np.isnan(distances[:, first_point_of_station])] = np.nan
+        nearest = np.argmin(distance_per_station, axis=1)
+        within_radius = distance_per_station[np.arange(len(nearest)), nearest] < radius
+        nearest_station[block] = np.where(within_radius, stop_points.station_index[first_point_of_station[nearest]], -1)
+    return nearest_station
+
+
+def _find_pairs_by_comparing_all(
+    lat: np.ndarray, long: np.ndarray, radius: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find all pairs of positions that are closer than the radius by comparing each with every other position,
+        a block of positions at a time.
+    :param lat: np.ndarray, the latitudes of the positions
+    :param long: np.ndarray, the longitudes of the positions
+    :param radius: float, only pairs closer than this are returned
+    :return: tuple[np.ndarray, np.ndarray, np.ndarray], the first indices, the second indices and the distances
+    """
+    found: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+    for start in range(0, len(lat), _BLOCK_SIZE):
+        distances = calculate_distance_matrix_in_m(
+            lat[start : start + _BLOCK_SIZE], long[start : start + _BLOCK_SIZE], lat, long
+        )
+        first, second = np.nonzero(distances < radius)
+        is_pair = second > first + start
+        found.append((first[is_pair] + start, second[is_pair], distances[first[is_pair], second[is_pair]]))
+    return (
+        np.concatenate([first for first, _, _ in found]),
+        np.concatenate([second for _, second, _ in found]),
+        np.concatenate([distances for _, _, distances in found]),
+    )
+
+
+def _calculate_search_box(lat: np.ndarray, long: np.ndarray, radius: Meter) -> Optional[_SearchBox]:
+    """
+    Calculate the half widths (in degrees) of a box that contains all points closer than the radius.
+        ``calculate_distance_in_m`` applies ``cos`` to the latitude in degrees, hence the longitudinal
+        width depends on the smallest such cosine product in the data. If it can be zero or negative,
+        or the data spans so much that the distance is not monotonic, no box exists.
+    :param lat: np.ndarray, the latitudes of all points
+    :param long: np.ndarray, the longitudes of all points
+    :param radius: Meter, the search radius
+    :return: Optional[_SearchBox], the half widths, None if the distances can not be bounded
+    """
+    if not (np.all(np.isfinite(lat)) and np.all(np.isfinite(long))) or radius / R >= pi:
+        return None
+    lat_span, long_span = radians(float(np.ptp(lat))), radians(float(np.ptp(long)))
+    if long_span > pi or sin(lat_span / 2) ** 2 + sin(long_span / 2) ** 2 >= 1:
+        return None
+    cosines = np.cos(lat)
+    if not (np.all(cosines > 0) or np.all(cosines < 0)):
+        return None
+    minimal_cosine_product = float(np.min(np.abs(cosines))) ** 2
+    ratio = sin(radius / R / 2) ** 2 / minimal_cosine_product
+    if ratio >= 1:
+        return None
+    return _SearchBox(
+        lat=degrees(radius / R) * (1 + _RELATIVE_PADDING) + _ABSOLUTE_PADDING_IN_DEGREES,
+        long=degrees(2 * asin(sqrt(ratio))) * (1 + _RELATIVE_PADDING) + _ABSOLUTE_PADDING_IN_DEGREES,
+    )
+
+
+def _calculate_cell_keys(lat: np.ndarray, long: np.ndarray, search_box: _SearchBox) -> tuple[np.ndarray, int]:
+    """
+    Calculate the (flat) key of the grid cell of each point, the cells are as large as the search box.
+    :param lat: np.ndarray, the latitudes of the points
+    :param long: np.ndarray, the longitudes of the points
+    :param search_box: _SearchBox, the half widths of the search box
+    :return: tuple[np.ndarray, int], the keys and the number of cells in longitudinal direction
+    """
+    lat_cells = np.floor((lat - np.min(lat)) / search_box.lat).astype(np.int64)
+    long_cells = np.floor((long - np.min(long)) / search_box.long).astype(np.int64)
+    long_cell_count = int(np.max(long_cells)) + 1
+    return lat_cells * long_cell_count + long_cells, long_cell_count
+
+
+@njit(cache=True)
+def _find_nearest_in_neighbouring_cells(
+    position_lat: np.ndarray,
+    position_long: np.ndarray,
+    stop_lat: np.ndarray,
+    stop_long: np.ndarray,
+    stop_station_index: np.ndarray,
+    sorted_cell_keys: np.ndarray,
+    long_cell_count: int,
+    cell_lat: float,
+    cell_long: float,
+    origin_lat: float,
+    origin_long: float,
+    radius: float,
+) -> np.ndarray:
+    # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+    nearest_station = np.full(len(position_lat), -1, dtype=np.int64)
+    for i, lat in enumerate(position_lat):
+        lat_cell = int(np.floor((lat - origin_lat) / cell_lat))
+        long_cell = int(np.floor((position_long[i] - origin_long) / cell_long))
+        best_distance, best_station = np.inf, -1
+        for neighbour_lat_cell in range(lat_cell - 1, lat_cell + 2):
+            for neighbour_long_cell in range(max(long_cell - 1, 0), min(long_cell + 2, long_cell_count)):
+                key = neighbour_lat_cell * long_cell_count + neighbour_long_cell
+                start = np.searchsorted(sorted_cell_keys, key, side="left")
+                end = np.searchsorted(sorted_cell_keys, key, side="right")
+                for j in range(start, end):
+                    distance = _calculate_distance_in_m(lat, position_long[i], stop_lat[j], stop_long[j])
+                    if distance < best_distance or (distance == best_distance and stop_station_index[j] < best_station):
+                        best_distance, best_station = distance, stop_station_index[j]
+        if best_distance < radius:
+            nearest_station[i] = best_station
+    return nearest_station
+
+
+@njit(cache=True)
+def _find_pairs_in_neighbouring_cells(
+    lat: np.ndarray,
+    long: np.ndarray,
+    order: np.ndarray,
+    cell_keys: np.ndarray,
+    sorted_cell_keys: np.ndarray,
+    long_cell_count: int,
+    radius: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+    capacity = max(16, 4 * len(lat))
+    first, second = np.empty(capacity, dtype=np.int64), np.empty(capacity, dtype=np.int64)
+    distances, count = np.empty(capacity, dtype=np.float64), 0
+    for i, key in enumerate(cell_keys):
+        lat_cell, long_cell = key // long_cell_count, key % long_cell_count
+        for neighbour_lat_cell in range(lat_cell - 1, lat_cell + 2):
+            for neighbour_long_cell in range(max(long_cell - 1, 0), min(long_cell + 2, long_cell_count)):
+                neighbour_key = neighbour_lat_cell * long_cell_count + neighbour_long_cell
+                start = np.searchsorted(sorted_cell_keys, neighbour_key, side="left")
+                end = np.searchsorted(sorted_cell_keys, neighbour_key, side="right")
+                for j in order[start:end]:
+                    if j <= i:
+                        continue
+                    distance = _calculate_distance_in_m(lat[i], long[i], lat[j], long[j])
+                    if not distance < radius:
+                        continue
+                    if count == len(first):
+                        first, second, distances = _grow(first), _grow(second), _grow(distances)
+                    first[count], second[count], distances[count] = i, j, distance
+                    count += 1
+    return first[:count], second[:count], distances[:count]
+
+
+@njit(cache=True)
+def _grow(array: np.ndarray) -> np.ndarray:
+    grown = np.empty(2 * len(array), dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
@@ -3,30 +3,67 @@ from __future__ import annotations
 import zipfile
 from itertools import chain
 from pathlib import Path
-from typing import Collection
+from typing import Collection, Mapping
 
+import numpy as np
 import pandas as pd
 
 from ..model.line import BusLine
-from ..model.point import PointIn2D
-from ..model.station import Station
+from ..model.station import StationTable
 from ..model.type import StationName
 from ..utils import skip_one_line_in_file
+from .columnar_cache import load_columns_cached
 
 
-def load_served_stations(path_to_stations: Path, lines: Collection[BusLine]) -> tuple[Station, ...]:
+def load_station_table(path_to_stations: Path, lines: Collection[BusLine]) -> StationTable:
     """
-    Load served stations and the coordinates.
+    Load the served stations and the coordinates of their points.
     :param path_to_stations: str, name of file with contains station information
     :param lines: Collection[BusLine], collection of bus lines
-    :return: tuple[Station, ...], served stations with their coordinates
+    :return: StationTable, served stations with the coordinates of their points, ordered by name,
+        raises ValueError if a served station has no point (with known coordinates) in the file
     """
-    served_station_names = frozenset(
-        chain.from_iterable(
-            chain.from_iterable((line.direction_up.station_sequence, line.direction_down.station_sequence))
-            for line in lines
-        )
+    served_station_names = np.array(
+        sorted(
+            frozenset(
+                chain.from_iterable(
+                    chain.from_iterable((line.direction_up.station_sequence, line.direction_down.station_sequence))
+                    for line in lines
+                )
+            )
+        ),
+        dtype=str,
     )
+    point_offsets, lat, long = _select_points_of_stations(
+        load_columns_cached(path_to_stations, _parse_station_points, "station_points_by_name"), served_station_names
+    )
+    return StationTable.from_points(
+        tuple(StationName(name) for name in served_station_names.tolist()), point_offsets, lat, long
+    )
+
+
+def _select_points_of_stations(
+    columns: Mapping[str, np.ndarray], station_names: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Select the points of the given stations at once, from the points grouped by name.
+    :param columns: Mapping[str, np.ndarray], the columns name, lat and long, sorted by name
+    :param station_names: np.ndarray, the sorted and unique names of the stations
+    :return: tuple[np.ndarray, np.ndarray, np.ndarray], the points of station ``i`` are
+        ``point_offsets[i]:point_offsets[i + 1]`` of lat and long (empty if it has no point)
+    """
+    is_selected = np.isin(columns["name"], station_names)
+    names_of_points = columns["name"][is_selected]
+    point_offsets = np.append(np.searchsorted(names_of_points, station_names), len(names_of_points))
+    return point_offsets, np.asarray(columns["lat"][is_selected]), np.asarray(columns["long"][is_selected])
+
+
+def _parse_station_points(path_to_stations: Path) -> dict[str, np.ndarray]:
+    """
+    Parse the points of all stations, from a zipped or plain csv file, grouped by the name of their station.
+    :param path_to_stations: Path, name of file with contains station information
+    :return: dict[str, np.ndarray], the columns name, lat and long, sorted by name (and in file order within)
+    """
     if path_to_stations.suffix == ".zip":
         with zipfile.ZipFile(path_to_stations, "r") as zip_file:
             with zip_file.open(zip_file.namelist()[0], "r") as file_handle:
@@ -38,15 +75,11 @@ def load_served_stations(path_to_stations: Path, lines: Collection[BusLine]) ->
             stations_df = pd.read_csv(file_handle, sep=";", encoding="utf-8", dtype=str)
     else:
         raise ValueError(f"Unsupported file format: {path_to_stations}")
-
-    points_per_station: dict[str, list[PointIn2D]] = {name: [] for name in served_station_names}
-    for raw_point in stations_df.itertuples(index=False):
-        point_name = raw_point.BEZEICHNUNG_OFFIZIELL
-        if point_name not in served_station_names:
-            continue
-        points_per_station[point_name].append(PointIn2D(lat=float(raw_point.N_WGS84), long=float(raw_point.E_WGS84)))
-
-    return tuple(
-        Station(name=StationName(name), points=tuple(points), lines=tuple(), district_points=[], districts_names=[])
-        for name, points in points_per_station.items()
+    stations_df = stations_df[stations_df.BEZEICHNUNG_OFFIZIELL.notnull()].sort_values(
+        "BEZEICHNUNG_OFFIZIELL", kind="stable"
     )
+    return {
+        "name": stations_df.BEZEICHNUNG_OFFIZIELL.to_numpy(dtype=str),
+        "lat": stations_df.N_WGS84.to_numpy(dtype=np.float64),
+        "long": stations_df.E_WGS84.to_numpy(dtype=np.float64),
+    }
@@ -1,27 +1,32 @@
 from __future__ import annotations
 
 from datetime import timedelta
-from itertools import combinations
-from typing import Collection
 
-from ..model import Station, WalkableDistance
+import numpy as np
+
+from ..model import StationTable, WalkableDistance
 from ..plan import LinePlanningParameters
-from .point import calculate_distance_in_m
+from .spatial_index import find_pairs_within_radius
 
 
 def find_all_walkable_distances(
-    stations: Collection[Station], parameters: LinePlanningParameters
+    stations: StationTable, parameters: LinePlanningParameters
 ) -> tuple[WalkableDistance, ...]:
     """
-    Get all walkable distances between pairs of stations.
-    :param stations: Collection[Station], collection of bus stations
+    Get all walkable distances between pairs of stations. Only the pairs of stations in neighbouring cells
+        of a grid are compared, see ``find_pairs_within_radius``. Views are only created of the stations of a pair.
+    :param stations: StationTable, the bus stations
     :param parameters: LinePlanningParameters, parameters of line planning problem, including walking speed
         and maximal walking distances
     :return: tuple[WalkableDistance, ...], WalkableDistance between pairs of stations
     """
+    first_indices, second_indices, distances = find_pairs_within_radius(
+        stations.center_lat, stations.center_long, parameters.maximal_walking_distance
+    )
+    views = {index: stations.station(index) for index in np.union1d(first_indices, second_indices).tolist()}
     return tuple(
-        WalkableDistance(first, second, timedelta(seconds=distance / parameters.walking_speed_between_stations))
-        for first, second in combinations(stations, r=2)
-        if (distance := calculate_distance_in_m(first.center_position, second.center_position))
-        < parameters.maximal_walking_distance
+        WalkableDistance(
+            views[first], views[second], timedelta(seconds=distance / parameters.walking_speed_between_stations)
+        )
+        for first, second, distance in zip(first_indices.tolist(), second_indices.tolist(), distances.tolist())
     )
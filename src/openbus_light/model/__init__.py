@@ -3,9 +3,9 @@ from .direction import Direction
 from .district import District, DistrictPoint
 from .line import BusLine
 from .point import PointIn2D
-from .recordedtrip import RecordedTrip
+from .recordedtrip import RecordedTrip, RecordedTripTable
 from .scenario import PlanningScenario
-from .station import Station
+from .station import Station, StationTable
 from .type import (
     CHF,
     CHFPerHour,
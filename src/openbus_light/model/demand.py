@@ -1,44 +1,270 @@
-from collections.abc import Mapping
+from __future__ import annotations
+
+from collections.abc import Iterator, Mapping, Sequence
 from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
 
 from openbus_light.model.type import StationName
 
 
-@dataclass(frozen=True, slots=True)
-class DemandMatrix:
-    matrix: Mapping[StationName, Mapping[StationName, float]]
+@dataclass(frozen=True, slots=True, init=False, eq=False)
+class DemandMatrix:  # pylint: disable=too-many-instance-attributes
+    """
+    Demand between stations, stored as compressed sparse rows (CSR): the entries of the origin
+        ``origins[i]`` are ``values[row_offsets[i]:row_offsets[i + 1]]``, going to the stations
+        ``destinations[destination_indices[...]]`` (ascending within each row). The sums per origin and
+        per destination are calculated once. ``matrix`` offers the former dict of dicts as read-only view.
+    """
+
+    origins: tuple[StationName, ...]
+    destinations: tuple[StationName, ...]
+    row_offsets: np.ndarray
+    destination_indices: np.ndarray
+    values: np.ndarray
+    row_sums: np.ndarray
+    column_sums: np.ndarray
+    _origin_positions: Mapping[StationName, int]
+    _destination_positions: Mapping[StationName, int]
+
+    def __init__(self, matrix: Mapping[StationName, Mapping[StationName, float]]) -> None:
+        """
+        Create the demand matrix from a dict of dicts, every given entry is kept (also zeros).
+        :param matrix: Mapping[str, Mapping[str, float]], demand by origin and destination
+        """
+        destination_positions: dict[StationName, int] = {}
+        for flows_to in matrix.values():
+            for destination in flows_to:
+                destination_positions.setdefault(destination, len(destination_positions))
+        self._initialise(
+            tuple(matrix.keys()),
+            tuple(destination_positions.keys()),
+            np.cumsum([0] + [len(flows_to) for flows_to in matrix.values()], dtype=np.int64),
+            np.fromiter(
+                (destination_positions[d] for flows_to in matrix.values() for d in flows_to.keys()), dtype=np.int64
+            ),
+            np.fromiter((flow for flows_to in matrix.values() for flow in flows_to.values()), dtype=np.float64),
+        )
+
+    @classmethod
+    def from_csr(
+        cls,
+        origins: Sequence[StationName],
+        destinations: Sequence[StationName],
+        row_offsets: np.ndarray,
+        destination_indices: np.ndarray,
+        values: np.ndarray,
+    ) -> DemandMatrix:
+        """
+        Create the demand matrix from compressed sparse rows, see the class description.
+        :param origins: Sequence[StationName], the origin of each row
+        :param destinations: Sequence[StationName], the destination of each column
+        :param row_offsets: np.ndarray, the start of each row in the entries, followed by the number of entries
+        :param destination_indices: np.ndarray, the column of each entry
+        :param values: np.ndarray, the demand of each entry
+        :return: DemandMatrix
+        """
+        instance = cls.__new__(cls)
+        instance._initialise(
+            tuple(origins),
+            tuple(destinations),
+            np.asarray(row_offsets, dtype=np.int64),
+            np.asarray(destination_indices, dtype=np.int64),
+            np.asarray(values, dtype=np.float64),
+        )
+        return instance
+
+    @classmethod
+    def from_dense(cls, stations: Sequence[StationName], dense: np.ndarray) -> DemandMatrix:
+        """
+        Create the demand matrix from a square array, zeros are not stored (``between`` and ``matrix`` give 0.0).
+        :param stations: Sequence[StationName], the station of each row and column
+        :param dense: np.ndarray, the demand from the station of the row to the station of the column
+        :return: DemandMatrix
+        """
+        origin_indices, destination_indices = np.nonzero(dense)
+        return cls.from_csr(
+            stations,
+            stations,
+            np.searchsorted(origin_indices, np.arange(len(stations) + 1)),
+            destination_indices,
+            dense[origin_indices, destination_indices],
+        )
+
+    @classmethod
+    def from_sorted_csr(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        cls,
+        origins: Sequence[StationName],
+        destinations: Sequence[StationName],
+        row_offsets: np.ndarray,
+        destination_indices: np.ndarray,
+        values: np.ndarray,
+        row_sums: np.ndarray,
+        column_sums: np.ndarray,
+    ) -> DemandMatrix:
+        """
+        Create the demand matrix from compressed sparse rows that are sorted within each row and whose sums
+            are known, the arrays are used as they are (not copied), e.g. memory-mapped from disk.
+        :param origins: Sequence[StationName], the origin of each row
+        :param destinations: Sequence[StationName], the destination of each column
+        :param row_offsets: np.ndarray, the start of each row in the entries, followed by the number of entries
+        :param destination_indices: np.ndarray, the column of each entry, ascending within each row
+        :param values: np.ndarray, the demand of each entry
+        :param row_sums: np.ndarray, the total demand of each row
+        :param column_sums: np.ndarray, the total demand of each column
+        :return: DemandMatrix
+        """
+        instance = cls.__new__(cls)
+        instance._assign(
+            tuple(origins), tuple(destinations), row_offsets, destination_indices, values, row_sums, column_sums
+        )
+        return instance
+
+    def _initialise(
+        self,
+        origins: tuple[StationName, ...],
+        destinations: tuple[StationName, ...],
+        row_offsets: np.ndarray,
+        destination_indices: np.ndarray,
+        values: np.ndarray,
+    ) -> None:
+        """
+        Sort the entries within each row, calculate the sums and set the arrays.
+        :param origins: tuple[StationName, ...], the origin of each row
+        :param destinations: tuple[StationName, ...], the destination of each column
+        :param row_offsets: np.ndarray, the start of each row in the entries, followed by the number of entries
+        :param destination_indices: np.ndarray, the column of each entry
+        :param values: np.ndarray, the demand of each entry
+        """
+        if len(row_offsets) != len(origins) + 1 or not row_offsets[-1] == len(values) == len(destination_indices):
+            raise ValueError("the row offsets do not match the origins and the entries")
+        row_of_entry = np.repeat(np.arange(len(origins)), np.diff(row_offsets))
+        order = np.lexsort((destination_indices, row_of_entry))
+        destination_indices, values = destination_indices[order], values[order]
+        self._assign(
+            origins,
+            destinations,
+            row_offsets,
+            destination_indices,
+            values,
+            np.bincount(row_of_entry, weights=values, minlength=len(origins)),
+            np.bincount(destination_indices, weights=values, minlength=len(destinations)),
+        )
+
+    def _assign(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        origins: tuple[StationName, ...],
+        destinations: tuple[StationName, ...],
+        row_offsets: np.ndarray,
+        destination_indices: np.ndarray,
+        values: np.ndarray,
+        row_sums: np.ndarray,
+        column_sums: np.ndarray,
+    ) -> None:
+        """
+        Set the arrays (read-only) and the lookups of the stations.
+        :param origins: tuple[StationName, ...], the origin of each row
+        :param destinations: tuple[StationName, ...], the destination of each column
+        :param row_offsets: np.ndarray, the start of each row in the entries, followed by the number of entries
+        :param destination_indices: np.ndarray, the column of each entry, ascending within each row
+        :param values: np.ndarray, the demand of each entry
+        :param row_sums: np.ndarray, the total demand of each row
+        :param column_sums: np.ndarray, the total demand of each column
+        """
+        for name, value in (
+            ("origins", origins),
+            ("destinations", destinations),
+            ("row_offsets", row_offsets),
+            ("destination_indices", destination_indices),
+            ("values", values),
+            ("row_sums", row_sums),
+            ("column_sums", column_sums),
+            ("_origin_positions", {origin: i for i, origin in enumerate(origins)}),
+            ("_destination_positions", {destination: i for i, destination in enumerate(destinations)}),
+        ):
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+            object.__setattr__(self, name, value)
+
+    @property
+    def matrix(self) -> Mapping[StationName, Mapping[StationName, float]]:
+        """
+        Get a read-only view of the stored entries as dict of dicts, a pair of known stations that is not stored
+            gives 0.0.
+        :return: Mapping[str, Mapping[str, float]], demand by origin and destination
+        """
+        return _DemandMatrixView(self)
 
     def all_origins(self) -> tuple[StationName, ...]:
         """
         Get all the origins of the demand matrix.
         :return: tuple[str, ...], tuple of the names of origins
         """
-        return tuple(self.matrix.keys())
+        return self.origins
+
+    def all_destinations(self) -> tuple[StationName, ...]:
+        """
+        Get all the destinations of the demand matrix.
+        :return: tuple[str, ...], tuple of the names of destinations
+        """
+        return self.destinations
 
     def between(self, origin: StationName, destination: StationName) -> float:
         """
         Get the demand between two certain stations.
         :param origin: str, the origin station
         :param destination: str, the destined station
-        :return: the demand between the stations
+        :return: the demand between the stations, zero if it is not stored
         """
-        return self.matrix[origin][destination]
+        destination_indices, values = self.row(origin)
+        column = self._destination_positions.get(destination, -1)
+        position = np.searchsorted(destination_indices, column)
+        if position < len(destination_indices) and destination_indices[position] == column:
+            return float(values[position])
+        return 0.0
 
     def starting_from(self, origin: StationName) -> float:
         """
-        Calculate the total demand starting from the given origin.
+        Get the total demand starting from the given origin.
         :param origin: str, the origin station
         :return: the total demand from the origin
         """
-        return sum(self.matrix[origin].values())
+        return float(self.row_sums[self._origin_positions[origin]])
 
     def arriving_at(self, destination: StationName) -> float:
         """
-        Calculate the total demand arriving at the given destination.
+        Get the total demand arriving at the given destination.
         :param destination: str, the destined station
         :return: the total demand arriving at the destination
         """
-        return sum(destinations[destination] for destinations in self.matrix.values() if destination in destinations)
+        if destination not in self._destination_positions:
+            return 0.0
+        return float(self.column_sums[self._destination_positions[destination]])
+
+    def total(self) -> float:
+        """
+        Get the total demand of all origins.
+        :return: float, the total demand
+        """
+        return sum(self.row_sums.tolist())
+
+    def row(self, origin: StationName) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the stored entries starting from the given origin.
+        :param origin: str, the origin station
+        :return: tuple[np.ndarray, np.ndarray], the (ascending) destination indices and the demand
+        """
+        i = self._origin_positions[origin]
+        entries = slice(self.row_offsets[i], self.row_offsets[i + 1])
+        return self.destination_indices[entries], self.values[entries]
+
+    def origin_indices(self) -> np.ndarray:
+        """
+        Get the row of each stored entry, complementing ``destination_indices`` to coordinates (COO).
+        :return: np.ndarray, the index of the origin of each entry
+        """
+        return np.repeat(np.arange(len(self.origins)), np.diff(self.row_offsets))
 
     def all_od_pairs(self) -> tuple[tuple[StationName, StationName, float], ...]:
         """
@@ -46,5 +272,105 @@ class DemandMatrix:
         :return: tuple[tuple[str, str], ...], tuple of origin-destination pairs
         """
         return tuple(
-            (origin, destination, flow) for origin in self.matrix for destination, flow in self.matrix[origin].items()
+            zip(
+                (self.origins[i] for i in self.origin_indices().tolist()),
+                (self.destinations[j] for j in self.destination_indices.tolist()),
+                self.values.tolist(),
+            )
         )
+
+    def iterate_origin_blocks(self, maximal_origins_per_block: int = 128) -> Iterator[DemandMatrix]:
+        """
+        Iterate over consecutive blocks of origins, each block refers to (does not copy) the stored entries,
+            such that a memory-mapped demand matrix is processed with bounded memory.
+        :param maximal_origins_per_block: int, the number of origins per block (the last may have fewer)
+        :return: Iterator[DemandMatrix], the demand matrix of each block with all destinations
+        """
+        if maximal_origins_per_block < 1:
+            raise ValueError(f"{maximal_origins_per_block=} must be positive")
+        for first in range(0, len(self.origins), maximal_origins_per_block):
+            last = min(first + maximal_origins_per_block, len(self.origins))
+            entries = slice(self.row_offsets[first], self.row_offsets[last])
+            block_destination_indices, block_values = self.destination_indices[entries], self.values[entries]
+            yield DemandMatrix.from_sorted_csr(
+                self.origins[first:last],
+                self.destinations,
+                self.row_offsets[first : last + 1] - self.row_offsets[first],
+                block_destination_indices,
+                block_values,
+                self.row_sums[first:last],
+                np.bincount(block_destination_indices, weights=block_values, minlength=len(self.destinations)),
+            )
+
+    def restricted_to_origins(self, origins: Sequence[StationName]) -> DemandMatrix:
+        """
+        Get the demand matrix with the given origins only, all destinations are kept.
+        :param origins: Sequence[StationName], the origins to keep (in the given order)
+        :return: DemandMatrix
+        """
+        rows = [self._origin_positions[origin] for origin in origins]
+        entries = [np.arange(self.row_offsets[i], self.row_offsets[i + 1]) for i in rows]
+        selected = np.concatenate(entries) if entries else np.empty(0, dtype=np.int64)
+        return DemandMatrix.from_csr(
+            origins,
+            self.destinations,
+            np.cumsum([0] + [len(row_entries) for row_entries in entries], dtype=np.int64),
+            self.destination_indices[selected],
+            self.values[selected],
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, DemandMatrix):
+            return NotImplemented
+        return self.origins == other.origins and all(
+            dict(self.matrix[origin]) == dict(other.matrix[origin]) for origin in self.origins
+        )
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({len(self.origins)} origins, {len(self.values)} entries)"
+
+
+class _DemandMatrixView(Mapping[StationName, Mapping[StationName, float]]):
+    __slots__ = ("_demand_matrix",)
+
+    def __init__(self, demand_matrix: DemandMatrix) -> None:
+        self._demand_matrix = demand_matrix
+
+    def __getitem__(self, origin: StationName) -> Mapping[StationName, float]:
+        destination_indices, values = self._demand_matrix.row(origin)
+        destinations = self._demand_matrix.destinations
+        return _DemandRowView(
+            dict(zip((destinations[j] for j in destination_indices.tolist()), values.tolist())),
+            self._demand_matrix._destination_positions,  # pylint: disable=protected-access
+        )
+
+    def __iter__(self) -> Iterator[StationName]:
+        return iter(self._demand_matrix.origins)
+
+    def __len__(self) -> int:
+        return len(self._demand_matrix.origins)
+
+
+class _DemandRowView(Mapping[StationName, float]):
+    """
+    The stored entries of a row, iterating only over them, but giving 0.0 for every other known destination.
+    """
+
+    __slots__ = ("_stored", "_destinations")
+
+    def __init__(self, stored: dict[StationName, float], destinations: Mapping[StationName, int]) -> None:
+        self._stored = stored
+        self._destinations = destinations
+
+    def __getitem__(self, destination: StationName) -> float:
+        if destination in self._stored:
+            return self._stored[destination]
+        if destination in self._destinations:
+            return 0.0
+        raise KeyError(destination)
+
+    def __iter__(self) -> Iterator[StationName]:
+        return iter(self._stored)
+
+    def __len__(self) -> int:
+        return len(self._stored)
@@ -3,7 +3,7 @@ from datetime import timedelta
 from functools import cached_property
 
 from ..utils import pairwise
-from .recordedtrip import RecordedTrip
+from .recordedtrip import RecordedTrip, RecordedTripTable
 from .type import DirectionName, StationName
 
 
@@ -24,6 +24,17 @@ class Direction:
         ):
             raise RuntimeError(f"Invalid number of stops and trip times in {self}")
 
+    @property
+    def recorded_trip_table(self) -> RecordedTripTable:
+        """
+        Get the table that holds the stops of the recorded trips of this direction.
+        :return: RecordedTripTable, the shared table of the recorded trips (empty if there are none)
+        """
+        tables = {id(trip.table): trip.table for trip in self.recorded_trips}
+        if len(tables) > 1:
+            raise RuntimeError(f"The recorded trips of {self.name} are not stored in one table")
+        return next(iter(tables.values()), RecordedTripTable.empty())
+
     @cached_property
     def station_count(self) -> int:
         """
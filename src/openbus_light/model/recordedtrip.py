@@ -1,9 +1,164 @@
-from typing import NamedTuple
+from __future__ import annotations
 
-import pandas as pd
+from dataclasses import dataclass
+from functools import cached_property
+from typing import TYPE_CHECKING, NamedTuple, Sequence
+
+import numpy as np
 
 from openbus_light.model.type import CirculationId, DirectionName, LineName, StationName, TripNr
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+TIME_COLUMNS = ("arrival_planned", "arrival_observed", "departure_planned", "departure_observed")
+
+
+@dataclass(frozen=True, eq=False)
+class RecordedTripTable:
+    """
+    The stops of many recorded trips in contiguous columns: the stops of trip ``i`` are the rows
+        ``trip_offsets[i]:trip_offsets[i + 1]``. Stations are stored as index into ``station_names``,
+        times as nanoseconds since the epoch (int64, with the minimal value for NaT).
+    """
+
+    station_names: tuple[StationName, ...]
+    station_ids: np.ndarray
+    arrival_planned: np.ndarray
+    arrival_observed: np.ndarray
+    departure_planned: np.ndarray
+    departure_observed: np.ndarray
+    trip_offsets: np.ndarray
+
+    @classmethod
+    def empty(cls) -> RecordedTripTable:
+        """
+        Create a table without trips.
+        :return: RecordedTripTable
+        """
+        no_times = np.empty(0, dtype=np.int64)
+        return cls(tuple(), np.empty(0, dtype=np.int64), no_times, no_times, no_times, no_times, np.zeros(1, np.int64))
+
+    @classmethod
+    def concatenate(cls, tables: Sequence[RecordedTripTable]) -> RecordedTripTable:
+        """
+        Copy the trips of several tables into one table, in the order of the tables.
+        :param tables: Sequence[RecordedTripTable], the tables to concatenate
+        :return: RecordedTripTable, with the (sorted) stations of all tables
+        """
+        if len(tables) == 0:
+            return cls.empty()
+        station_names = tuple(sorted(set().union(*(table.station_names for table in tables))))
+        index_of_station = {name: i for i, name in enumerate(station_names)}
+        station_ids = [
+            np.array([index_of_station[name] for name in table.station_names], dtype=np.int64)[table.station_ids]
+            for table in tables
+        ]
+        stop_counts = [np.diff(table.trip_offsets) for table in tables]
+
+        def concatenate_column(column: str) -> np.ndarray:
+            return np.concatenate([getattr(table, column) for table in tables]).astype(np.int64)
+
+        return RecordedTripTable(
+            station_names,
+            np.concatenate(station_ids),
+            concatenate_column("arrival_planned"),
+            concatenate_column("arrival_observed"),
+            concatenate_column("departure_planned"),
+            concatenate_column("departure_observed"),
+            np.concatenate(([0], np.cumsum(np.concatenate(stop_counts)))).astype(np.int64),
+        )
+
+    @property
+    def trip_count(self) -> int:
+        return len(self.trip_offsets) - 1
+
+    def stops_of(self, position: int) -> slice:
+        """
+        Get the rows of the stops of a trip.
+        :param position: int, the position of the trip in the table
+        :return: slice, the rows of its stops
+        """
+        return slice(self.trip_offsets[position], self.trip_offsets[position + 1])
+
+    @cached_property
+    def trip_of_stop(self) -> np.ndarray:
+        """
+        Get the position of the trip of each stop (row).
+        :return: np.ndarray, the trip position per row
+        """
+        return np.repeat(np.arange(self.trip_count), np.diff(self.trip_offsets))
+
+    @cached_property
+    def _trips_by_first_departure(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Sort the trips by their planned first departure, trips without one are last.
+        :return: tuple[np.ndarray, np.ndarray], the sorted departures and the trip positions in this order
+        """
+        first_departures = self.departure_planned[self.trip_offsets[:-1]].view("datetime64[ns]")
+        order = np.argsort(first_departures, kind="stable")
+        return first_departures[order], order
+
+    @cached_property
+    def _index_of_station(self) -> dict[StationName, int]:
+        return {name: index for index, name in enumerate(self.station_names)}
+
+    @cached_property
+    def _trips_by_station(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Group the trips by the stations they stop at, as compressed sparse rows (each trip once per station).
+        :return: tuple[np.ndarray, np.ndarray], the trips stopping at station ``i`` are
+            ``trips[station_offsets[i]:station_offsets[i + 1]]``, ascending
+        """
+        station_and_trip = np.unique(self.station_ids * max(self.trip_count, 1) + self.trip_of_stop)
+        station_of_entry, trips = np.divmod(station_and_trip, max(self.trip_count, 1))
+        station_offsets = np.searchsorted(station_of_entry, np.arange(len(self.station_names) + 1))
+        return station_offsets, trips
+
+    def select_trips(self, positions: Sequence[int] | np.ndarray) -> RecordedTripTable:
+        """
+        Copy the given trips into a new table, with the same stations.
+        :param positions: Sequence[int] | np.ndarray, the positions of the trips (in the new order)
+        :return: RecordedTripTable
+        """
+        selected = np.asarray(positions, dtype=np.int64)
+        stop_counts = np.diff(self.trip_offsets)[selected]
+        trip_offsets = np.concatenate(([0], np.cumsum(stop_counts))).astype(np.int64)
+        rows = np.repeat(self.trip_offsets[selected] - trip_offsets[:-1], stop_counts) + np.arange(trip_offsets[-1])
+        return RecordedTripTable(
+            self.station_names,
+            self.station_ids[rows],
+            self.arrival_planned[rows],
+            self.arrival_observed[rows],
+            self.departure_planned[rows],
+            self.departure_observed[rows],
+            trip_offsets,
+        )
+
+    def trips_stopping_at(self, station: StationName) -> np.ndarray:
+        """
+        Find the trips that stop at the given station.
+        :param station: StationName, the station
+        :return: np.ndarray, the ascending positions of the trips, raises KeyError if the station is not in the table
+        """
+        if station not in self._index_of_station:
+            raise KeyError(f"{station} is not a station of the table")
+        station_offsets, trips = self._trips_by_station
+        index = self._index_of_station[station]
+        return trips[station_offsets[index] : station_offsets[index + 1]]
+
+    def trips_departing_within(self, earliest: np.datetime64, latest: np.datetime64) -> np.ndarray:
+        """
+        Find the trips whose planned first departure is within the given (closed) time window.
+        :param earliest: np.datetime64, the start of the window
+        :param latest: np.datetime64, the end of the window
+        :return: np.ndarray, the ascending positions of the trips
+        """
+        first_departures, order = self._trips_by_first_departure
+        begin = np.searchsorted(first_departures, np.datetime64(earliest, "ns"), side="left")
+        end = np.searchsorted(first_departures, np.datetime64(latest, "ns"), side="right")
+        return np.sort(order[begin:end])
+
 
 class RecordedTrip(NamedTuple):
     line: LineName
@@ -13,4 +168,36 @@ class RecordedTrip(NamedTuple):
     start: StationName
     end: StationName
     stop_count: int
-    record: pd.DataFrame
+    table: RecordedTripTable
+    position: int
+
+    @property
+    def station_names(self) -> tuple[StationName, ...]:
+        """
+        Get the stations of the stops of this trip.
+        :return: tuple[StationName, ...]
+        """
+        station_names = self.table.station_names
+        return tuple(station_names[i] for i in self.table.station_ids[self.table.stops_of(self.position)].tolist())
+
+    def times(self, column: str) -> np.ndarray:
+        """
+        Get the times of the stops of this trip.
+        :param column: str, one of ``TIME_COLUMNS``
+        :return: np.ndarray, the times (datetime64[ns], NaT if not recorded)
+        """
+        if column not in TIME_COLUMNS:
+            raise KeyError(f"{column} is not one of {TIME_COLUMNS}")
+        return getattr(self.table, column)[self.table.stops_of(self.position)].view("datetime64[ns]")
+
+    @property
+    def record(self) -> pd.DataFrame:
+        """
+        Get the stops of this trip as data frame, with the station name and the times.
+        :return: pd.DataFrame
+        """
+        import pandas as pd  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        return pd.DataFrame(
+            {"station_name": self.station_names, **{column: self.times(column) for column in TIME_COLUMNS}}
+        )
@@ -3,7 +3,7 @@ from typing import NamedTuple
 
 from .demand import DemandMatrix
 from .line import BusLine
-from .station import Station
+from .station import StationTable
 from .walkable_distance import WalkableDistance
 
 
@@ -11,7 +11,7 @@ class PlanningScenario(NamedTuple):
     demand_matrix: DemandMatrix
     bus_lines: tuple[BusLine, ...]
     walkable_distances: tuple[WalkableDistance, ...]
-    stations: tuple[Station, ...]
+    stations: StationTable
 
     def check_consistency(self) -> None:
         """
@@ -33,7 +33,7 @@ class PlanningScenario(NamedTuple):
             at least one line, raise error.
         :param all_served_station_names: frozenset[str], names of all stations that are served by bus lines
         """
-        all_station_names = frozenset(station.name for station in self.stations)
+        all_station_names = frozenset(self.stations.names)
         if not all_served_station_names.issuperset(all_station_names):
             not_served_stations = all_station_names.difference(all_served_station_names)
             raise ValueError(f"Some Stations are not served by any line: {not_served_stations}")
@@ -44,9 +44,7 @@ class PlanningScenario(NamedTuple):
             are not within the stations served by lines, raise error.
         :param all_served_station_names: frozenset[str], names of all stations that are served by bus lines
         """
-        all_stations_in_demand = set(
-            chain.from_iterable(flows_to.keys() for flows_to in self.demand_matrix.matrix.values())
-        ) | set(self.demand_matrix.all_origins())
+        all_stations_in_demand = set(self.demand_matrix.all_destinations()) | set(self.demand_matrix.all_origins())
         if not all_served_station_names.issuperset(all_stations_in_demand):
             not_served_stations = all_stations_in_demand.difference(all_served_station_names)
             raise ValueError(f"Some Origins or Destinations are not served by any line: {not_served_stations}")
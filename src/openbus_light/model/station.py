@@ -1,5 +1,8 @@
-from dataclasses import dataclass
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
 from functools import cached_property
+from typing import Collection, Sequence
 
 import numpy as np
 
@@ -30,3 +33,179 @@ class Station:
             lat=np.nanmean(tuple(p.lat for p in self.points)),  # type: ignore
             long=np.nanmean(tuple(p.long for p in self.points)),  # type: ignore
         )
+
+
+@dataclass(frozen=True, eq=False)
+class StationTable:
+    """
+    Stations in contiguous columns, a station is identified by its index into ``names``. The points of station
+        ``i`` are the rows ``point_offsets[i]:point_offsets[i + 1]`` of ``point_lat`` and ``point_long``, its
+        associated district points are ``district_points[district_point_offsets[i]:district_point_offsets[i + 1]]``.
+        ``Station`` objects are only created as views, by ``station`` or ``to_stations``.
+    """
+
+    names: tuple[StationName, ...]
+    point_offsets: np.ndarray
+    point_lat: np.ndarray
+    point_long: np.ndarray
+    district_points: tuple[DistrictPoint, ...]
+    district_point_offsets: np.ndarray
+
+    @classmethod
+    def from_points(
+        cls, names: Sequence[StationName], point_offsets: np.ndarray, point_lat: np.ndarray, point_long: np.ndarray
+    ) -> StationTable:
+        """
+        Create a table of stations without associated district points, each station needs at least one point
+            and a finite center (as a ``Station``).
+        :param names: Sequence[StationName], the names of the stations
+        :param point_offsets: np.ndarray, the points of station ``i`` are ``point_offsets[i]:point_offsets[i + 1]``
+        :param point_lat: np.ndarray, the latitudes of the points
+        :param point_long: np.ndarray, the longitudes of the points
+        :return: StationTable, raises ValueError if a station has no point or no finite center
+        """
+        table = cls(
+            names=tuple(names),
+            point_offsets=np.asarray(point_offsets, dtype=np.int64),
+            point_lat=np.asarray(point_lat, dtype=np.float64),
+            point_long=np.asarray(point_long, dtype=np.float64),
+            district_points=tuple(),
+            district_point_offsets=np.zeros(len(names) + 1, dtype=np.int64),
+        )
+        if len(without_points := np.flatnonzero(np.diff(table.point_offsets) == 0)) > 0:
+            raise ValueError(f"stations without points: {[table.names[i] for i in without_points.tolist()]}")
+        if len(without_center := np.flatnonzero(~np.isfinite(table.center_lat) | ~np.isfinite(table.center_long))):
+            raise ValueError(f"stations without finite center: {[table.names[i] for i in without_center.tolist()]}")
+        return table
+
+    @classmethod
+    def from_stations(cls, stations: Sequence[Station]) -> StationTable:
+        """
+        Copy stations with their points and district points into a table, keeping their order.
+        :param stations: Sequence[Station], the stations
+        :return: StationTable
+        """
+        return cls(
+            names=tuple(station.name for station in stations),
+            point_offsets=np.cumsum([0, *(len(station.points) for station in stations)], dtype=np.int64),
+            point_lat=np.array([point.lat for station in stations for point in station.points], dtype=np.float64),
+            point_long=np.array([point.long for station in stations for point in station.points], dtype=np.float64),
+            district_points=tuple(point for station in stations for point in station.district_points),
+            district_point_offsets=np.cumsum(
+                [0, *(len(station.district_points) for station in stations)], dtype=np.int64
+            ),
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @cached_property
+    def station_of_point(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.point_offsets))
+
+    @cached_property
+    def station_of_district_point(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.district_point_offsets))
+
+    @cached_property
+    def center_lat(self) -> np.ndarray:
+        return self._calculate_mean_per_station(self.point_lat)
+
+    @cached_property
+    def center_long(self) -> np.ndarray:
+        return self._calculate_mean_per_station(self.point_long)
+
+    @cached_property
+    def _index_of_name(self) -> dict[StationName, int]:
+        return {name: index for index, name in enumerate(self.names)}
+
+    def index_of(self, name: StationName) -> int:
+        """
+        Get the index of a station.
+        :param name: StationName, the name of the station
+        :return: int, its index, raises KeyError if there is no such station
+        """
+        return self._index_of_name[name]
+
+    def center_of(self, index: int) -> PointIn2D:
+        """
+        Get the center of a station, the mean of its points (ignoring missing coordinates).
+        :param index: int, the index of the station
+        :return: PointIn2D, the center
+        """
+        return PointIn2D(lat=float(self.center_lat[index]), long=float(self.center_long[index]))
+
+    def station(self, index: int) -> Station:
+        """
+        Create a view of a station, with copies of its points and district points.
+        :param index: int, the index of the station
+        :return: Station
+        """
+        points = slice(self.point_offsets[index], self.point_offsets[index + 1])
+        return Station(
+            name=self.names[index],
+            points=tuple(map(PointIn2D, self.point_lat[points].tolist(), self.point_long[points].tolist())),
+            lines=tuple(),
+            district_points=list(
+                self.district_points[self.district_point_offsets[index] : self.district_point_offsets[index + 1]]
+            ),
+            districts_names=[],
+        )
+
+    def to_stations(self) -> tuple[Station, ...]:
+        """
+        Create views of all stations, in the order of the table.
+        :return: tuple[Station, ...]
+        """
+        return tuple(self.station(index) for index in range(len(self)))
+
+    def with_district_points(
+        self, district_points: Sequence[DistrictPoint], station_indices: np.ndarray
+    ) -> StationTable:
+        """
+        Create a table of the same stations with district points associated, replacing the associated ones.
+        :param district_points: Sequence[DistrictPoint], the district points
+        :param station_indices: np.ndarray, the index of the station of each district point, -1 if none
+        :return: StationTable, the district points of a station are in the order they are given
+        """
+        associated = np.flatnonzero(np.asarray(station_indices) >= 0)
+        station_of_associated = np.asarray(station_indices)[associated]
+        order = associated[np.argsort(station_of_associated, kind="stable")]
+        return replace(
+            self,
+            district_points=tuple(district_points[i] for i in order.tolist()),
+            district_point_offsets=np.append(0, np.cumsum(np.bincount(station_of_associated, minlength=len(self)))),
+        )
+
+    def restricted_to(self, names: Collection[StationName]) -> StationTable:
+        """
+        Create a table of the stations with one of the given names, keeping their order.
+        :param names: Collection[StationName], the names of the stations to keep
+        :return: StationTable
+        """
+        kept_names = frozenset(names)
+        is_kept = np.fromiter((name in kept_names for name in self.names), dtype=bool, count=len(self))
+        point_counts, district_point_counts = np.diff(self.point_offsets), np.diff(self.district_point_offsets)
+        kept_points = np.repeat(is_kept, point_counts)
+        kept_district_points = np.flatnonzero(np.repeat(is_kept, district_point_counts))
+        return StationTable(
+            names=tuple(name for name, kept in zip(self.names, is_kept.tolist()) if kept),
+            point_offsets=np.append(0, np.cumsum(point_counts[is_kept])),
+            point_lat=self.point_lat[kept_points],
+            point_long=self.point_long[kept_points],
+            district_points=tuple(self.district_points[i] for i in kept_district_points.tolist()),
+            district_point_offsets=np.append(0, np.cumsum(district_point_counts[is_kept])),
+        )
+
+    def _calculate_mean_per_station(self, values: np.ndarray) -> np.ndarray:
+        """
+        Calculate the mean of the known values of the points of each station.
+        :param values: np.ndarray, a value per point
+        :return: np.ndarray, the mean per station, NaN if no value of the station is known
+        """
+        is_known = ~np.isnan(values)
+        station_of_point = self.station_of_point[is_known]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.bincount(station_of_point, weights=values[is_known], minlength=len(self)) / np.bincount(
+                station_of_point, minlength=len(self)
+            )
@@ -1,5 +1,25 @@
-from .network import LinePlanningNetwork, LPNLink, LPNNode
-from .parameters import LinePlanningParameters
-from .problem import LPP, LPPData, create_line_planning_problem
-from .result import LPPResult
-from .summary import LineDict, ParameterDict, Summary, create_summary
+from typing import TYPE_CHECKING
+
+from ..utils import lazy_exports
+
+if TYPE_CHECKING:
+    from .mps import LPPIndex, StreamedSolution, read_cbc_solution, write_line_planning_problem
+    from .network import LinePlanningNetwork, LPNLink, LPNNode
+    from .parameters import LinePlanningParameters
+    from .problem import LPP, LPPData, calculate_required_vehicles, create_line_planning_problem
+    from .result import LPPResult
+    from .solve import SolveHandle, SolveProgress
+    from .summary import LineDict, ParameterDict, Summary, create_summary
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        ".mps": ("LPPIndex", "StreamedSolution", "read_cbc_solution", "write_line_planning_problem"),
+        ".network": ("LinePlanningNetwork", "LPNLink", "LPNNode"),
+        ".parameters": ("LinePlanningParameters",),
+        ".problem": ("LPP", "LPPData", "calculate_required_vehicles", "create_line_planning_problem"),
+        ".result": ("LPPResult",),
+        ".solve": ("SolveHandle", "SolveProgress"),
+        ".summary": ("LineDict", "ParameterDict", "Summary", "create_summary"),
+    },
+)
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import gzip
+import json
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import IO, Iterator, NamedTuple
+
+import numpy as np
+
+from ..model import LineFrequency, LineNr, StationName
+from .network import Activity
+from .problem import (
+    LPPData,
+    _calculate_flow_balance_at_nodes,
+    _calculate_minimal_circulation_time,
+    _calculate_number_of_required_vehicles,
+    _calculate_vehicle_cost_per_configuration,
+    _create_transfer_node_lookup,
+    calculate_activity_weights,
+)
+
+_OBJECTIVE = "obj"
+_VEHICLES = "v"
+_COLUMN_PATTERN = re.compile(r"^(?:x(?P<origin>\d+)_(?P<link>\d+)|y(?P<configuration>\d+))$")
+
+
+class LPPIndex(NamedTuple):
+    """
+    Sidecar index of a streamed line planning problem, it maps the compact integer-based names back.
+        Flow variables are named ``x{origin}_{link}``, line configuration variables ``y{configuration}``.
+    """
+
+    origins: tuple[StationName, ...]
+    link_count: int
+    line_configurations: tuple[tuple[LineNr, LineFrequency], ...]
+
+    def dump(self, path: Path) -> None:
+        """
+        Write the index as json to the given path.
+        :param path: Path, the file to write to
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "origins": list(self.origins),
+                    "link_count": self.link_count,
+                    "line_configurations": [list(configuration) for configuration in self.line_configurations],
+                },
+                file,
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> LPPIndex:
+        """
+        Read an index that was written with ``dump``.
+        :param path: Path, the file to read from
+        :return: LPPIndex
+        """
+        with open(path, encoding="utf-8") as file:
+            raw = json.load(file)
+        return cls(
+            origins=tuple(StationName(origin) for origin in raw["origins"]),
+            link_count=int(raw["link_count"]),
+            line_configurations=tuple(
+                (LineNr(line_nr), LineFrequency(frequency)) for line_nr, frequency in raw["line_configurations"]
+            ),
+        )
+
+    def decode(self, column_name: str) -> None | tuple[StationName, int] | tuple[LineNr, LineFrequency]:
+        """
+        Decode a column name to the key used by ``LPP`` for the corresponding variable.
+        :param column_name: str, the name of the column in the written problem
+        :return: None if the name is not a column of this problem, (origin, link index) for passenger flows
+            and (line number, frequency) for line configurations
+        """
+        match = _COLUMN_PATTERN.match(column_name)
+        if match is None:
+            return None
+        if match["configuration"] is not None:
+            return self.line_configurations[int(match["configuration"])]
+        return self.origins[int(match["origin"])], int(match["link"])
+
+
+class StreamedSolution(NamedTuple):
+    status: str
+    objective: float
+    line_configuration: dict[tuple[LineNr, LineFrequency], float]
+    passenger_flow: dict[tuple[StationName, int], float]
+
+
+def index_path_for(path_to_problem: Path) -> Path:
+    """
+    Get the path of the sidecar index that belongs to the given problem file.
+    :param path_to_problem: Path, the path of the (possibly compressed) mps file
+    :return: Path, the path of the sidecar index
+    """
+    return path_to_problem.with_name(f"{path_to_problem.name}.index.json")
+
+
+def write_line_planning_problem(lpp_data: LPPData, path_to_problem: Path) -> LPPIndex:
+    """
+    Write the line planning problem as (free) MPS file, without building the pulp model.
+        The flow variables and conservation rows are emitted one origin after the other, such that the memory
+        used while writing is bounded by one origin's block. If the path ends with ``.gz`` the file is compressed,
+        note that the CBC binary shipped with pulp cannot read compressed files.
+        The sidecar index is written next to the problem, see ``index_path_for``.
+    :param lpp_data: LPPData, the data for the line planning problem
+    :param path_to_problem: Path, where to write the problem to (e.g. ``problem.mps.gz``)
+    :return: LPPIndex, the index that maps the written names back to the variables of ``LPP``
+    """
+    index = LPPIndex(
+        origins=lpp_data.scenario.demand_matrix.all_origins(),
+        link_count=lpp_data.network.graph.ecount(),
+        line_configurations=tuple(
+            (line.number, frequency) for line in lpp_data.scenario.bus_lines for frequency in line.permitted_frequencies
+        ),
+    )
+    with _open_for_writing(path_to_problem) as file:
+        file.write("NAME LPP FREE\n")
+        file.write("ROWS\n")
+        file.writelines(_row_lines(lpp_data, index))
+        file.write("COLUMNS\n")
+        file.writelines(_flow_column_lines(lpp_data, index))
+        file.write("    MARKER 'MARKER' 'INTORG'\n")
+        file.writelines(_configuration_column_lines(lpp_data, index))
+        file.write("    MARKER 'MARKER' 'INTEND'\n")
+        file.write("RHS\n")
+        file.writelines(_rhs_lines(lpp_data, index))
+        file.write("BOUNDS\n")
+        file.writelines(f" BV BND y{k}\n" for k in range(len(index.line_configurations)))
+        file.write("ENDATA\n")
+    index.dump(index_path_for(path_to_problem))
+    return index
+
+
+def read_cbc_solution(path_to_solution: Path, index: LPPIndex) -> StreamedSolution:
+    """
+    Read a solution file written by CBC (``-solution``) for a problem written by ``write_line_planning_problem``.
+    :param path_to_solution: Path, the solution file
+    :param index: LPPIndex, the index of the solved problem
+    :return: StreamedSolution, the status and the values keyed like the variables of ``LPP``
+    """
+    line_configuration: dict[tuple[LineNr, LineFrequency], float] = dict.fromkeys(index.line_configurations, 0.0)
+    passenger_flow: dict[tuple[StationName, int], float] = {}
+    with open(path_to_solution, encoding="utf-8") as file:
+        status, _, objective = file.readline().partition(" - objective value ")
+        for raw_line in file:
+            fields = raw_line.split()
+            if fields and fields[0] == "**":
+                fields = fields[1:]
+            if len(fields) < 3:
+                continue
+            key = index.decode(fields[1])
+            if key is None:
+                continue
+            if isinstance(key[0], str):
+                passenger_flow[key] = float(fields[2])  # type: ignore
+            else:
+                line_configuration[key] = float(fields[2])  # type: ignore
+    return StreamedSolution(
+        status.strip(), float(objective) if objective else float("nan"), line_configuration, passenger_flow
+    )
+
+
+def _open_for_writing(path: Path) -> IO[str]:
+    """
+    Open the file for writing text, compressed if the suffix is ``.gz``.
+    :param path: Path, the file to open
+    :return: IO[str], the file handle
+    """
+    if path.suffix == ".gz":
+        return gzip.open(path, "wt", encoding="ascii", compresslevel=6)
+    return open(path, "w", encoding="ascii")
+
+
+def _number(value: float) -> str:
+    """
+    Format a coefficient without loss of precision.
+    :param value: float, the coefficient
+    :return: str, the shortest representation that round-trips
+    """
+    return repr(float(value))
+
+
+def _capacity_rows(lpp_data: LPPData) -> dict[int, LineNr]:
+    """
+    Get the links that are restricted by the capacity of a line.
+    :param lpp_data: LPPData, the data for the line planning problem
+    :return: dict[int, LineNr], a dict whose key is the link index, while value is the line providing the capacity
+    """
+    return {
+        i: link.line_nr
+        for i, link in enumerate(lpp_data.network.all_links)
+        if link.activity in (Activity.IN_VEHICLE, Activity.ACCESS_LINE) and link.line_nr is not None
+    }
+
+
+def _row_lines(lpp_data: LPPData, index: LPPIndex) -> Iterator[str]:
+    """
+    Generate the ROWS section: objective, flow conservation (per origin and node), capacity,
+        configuration and vehicle rows.
+    :param lpp_data: LPPData, the data for the line planning problem
+    :param index: LPPIndex, the index of the problem
+    :return: Iterator[str], the lines of the section
+    """
+    yield f" N {_OBJECTIVE}\n"
+    node_count = lpp_data.network.graph.vcount()
+    for origin_index in range(len(index.origins)):
+        yield from (f" E f{origin_index}_{node_index}\n" for node_index in range(node_count))
+    yield from (f" L c{link_index}\n" for link_index in _capacity_rows(lpp_data))
+    yield from (f" L l{line_index}\n" for line_index in range(len(lpp_data.scenario.bus_lines)))
+    if lpp_data.parameters.maximal_number_of_vehicles is not None:
+        yield f" L {_VEHICLES}\n"
+
+
+def _flow_column_lines(lpp_data: LPPData, index: LPPIndex) -> Iterator[str]:
+    """
+    Generate the passenger flow columns, one origin after the other.
+    :param lpp_data: LPPData, the data for the line planning problem
+    :param index: LPPIndex, the index of the problem
+    :return: Iterator[str], the lines of the section
+    """
+    weights = calculate_activity_weights(lpp_data.network, lpp_data.parameters)
+    capacity_rows = _capacity_rows(lpp_data)
+    links = tuple(edge.tuple for edge in lpp_data.network.graph.es)
+    for origin_index in range(len(index.origins)):
+        for link_index, ((source, target), weight) in enumerate(zip(links, weights)):
+            column = f"x{origin_index}_{link_index}"
+            if weight != 0:
+                yield f"    {column} {_OBJECTIVE} {_number(weight)}\n"
+            yield f"    {column} f{origin_index}_{target} 1\n"
+            yield f"    {column} f{origin_index}_{source} -1\n"
+            if link_index in capacity_rows:
+                yield f"    {column} c{link_index} 1\n"
+
+
+def _configuration_column_lines(lpp_data: LPPData, index: LPPIndex) -> Iterator[str]:
+    """
+    Generate the (binary) line configuration columns.
+    :param lpp_data: LPPData, the data for the line planning problem
+    :param index: LPPIndex, the index of the problem
+    :return: Iterator[str], the lines of the section
+    """
+    links = lpp_data.network.all_links
+    capacity_links_by_line: dict[LineNr, list[int]] = defaultdict(list)
+    for link_index, line_nr in _capacity_rows(lpp_data).items():
+        capacity_links_by_line[line_nr].append(link_index)
+    line_index_by_nr = {line.number: i for i, line in enumerate(lpp_data.scenario.bus_lines)}
+    line_by_nr = {line.number: line for line in lpp_data.scenario.bus_lines}
+    vehicle_cost_per_configuration = _calculate_vehicle_cost_per_configuration(lpp_data)
+    parameters = lpp_data.parameters
+    for k, (line_nr, frequency) in enumerate(index.line_configurations):
+        column, line = f"y{k}", line_by_nr[line_nr]
+        if vehicle_cost_per_configuration[line_nr, frequency] != 0:
+            yield f"    {column} {_OBJECTIVE} {_number(vehicle_cost_per_configuration[line_nr, frequency])}\n"
+        for link_index in capacity_links_by_line[line_nr]:
+            if links[link_index].activity == Activity.IN_VEHICLE or links[link_index].frequency == frequency:
+                yield f"    {column} c{link_index} {_number(-line.capacity * frequency)}\n"
+        yield f"    {column} l{line_index_by_nr[line_nr]} 1\n"
+        if parameters.maximal_number_of_vehicles is not None:
+            required_vehicles = _calculate_number_of_required_vehicles(
+                frequency,
+                _calculate_minimal_circulation_time(line, parameters.dwell_time_at_terminal),
+                parameters.period_duration,
+            )
+            yield f"    {column} {_VEHICLES} {_number(required_vehicles)}\n"
+
+
+def _rhs_lines(lpp_data: LPPData, index: LPPIndex) -> Iterator[str]:
+    """
+    Generate the RHS section, the flow balances are calculated one origin after the other.
+    :param lpp_data: LPPData, the data for the line planning problem
+    :param index: LPPIndex, the index of the problem
+    :return: Iterator[str], the lines of the section
+    """
+    transfer_node_indices = _create_transfer_node_lookup(lpp_data.network)
+    flow_balance_at_nodes = np.zeros((lpp_data.network.graph.vcount(), 1))
+    for origin_index, origin_station in enumerate(index.origins):
+        _calculate_flow_balance_at_nodes(
+            flow_balance_at_nodes, origin_station, lpp_data.scenario.demand_matrix, transfer_node_indices
+        )
+        for node_index in np.flatnonzero(flow_balance_at_nodes[:, 0]):
+            yield f"    RHS f{origin_index}_{node_index} {_number(-flow_balance_at_nodes[node_index, 0])}\n"
+    yield from (f"    RHS l{line_index} 1\n" for line_index in range(len(lpp_data.scenario.bus_lines)))
+    if lpp_data.parameters.maximal_number_of_vehicles is not None:
+        yield f"    RHS {_VEHICLES} {_number(lpp_data.parameters.maximal_number_of_vehicles)}\n"
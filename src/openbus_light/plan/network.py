@@ -141,7 +141,12 @@ class LinePlanningNetwork:
         lines_with_directions = (
             (line, direction) for line in scenario.bus_lines for direction in (line.direction_up, line.direction_down)
         )
-        station_coordinates = {station.name: station.center_position for station in scenario.stations}
+        station_coordinates = {
+            name: PointIn2D(lat=lat, long=long)
+            for name, lat, long in zip(
+                scenario.stations.names, scenario.stations.center_lat.tolist(), scenario.stations.center_long.tolist()
+            )
+        }
         for line, direction in lines_with_directions:
             new_nodes, new_links = cls._create_nodes_and_links_for_direction(
                 line, direction, period_duration, station_coordinates
@@ -3,19 +3,31 @@ from dataclasses import dataclass
 from datetime import timedelta
 from itertools import chain
 from math import ceil
+from pathlib import Path
 from types import MappingProxyType
-from typing import Collection, NamedTuple
+from typing import Collection, Mapping, NamedTuple, Optional
 
 import numpy as np
 import pulp as pl
 from pulp import PULP_CBC_CMD, LpVariable
 from tqdm import tqdm
 
-from ..model import CHF, BusLine, CHFPerHour, Direction, LineFrequency, LineNr, PlanningScenario, StationName
+from ..model import (
+    CHF,
+    BusLine,
+    CHFPerHour,
+    DemandMatrix,
+    Direction,
+    LineFrequency,
+    LineNr,
+    PlanningScenario,
+    StationName,
+)
 from ..utils import pairwise
 from .network import Activity, LinePlanningNetwork
 from .parameters import LinePlanningParameters
 from .result import LPPResult, LPPSolution, PassengersPerLink
+from .solve import SolveHandle
 
 
 class LPPData(NamedTuple):
@@ -44,6 +56,16 @@ class LPP:
         if self._model.status == pl.LpStatusInfeasible:
             self._model.writeLP(f"{self.__class__.__name__}.lp")
 
+    async def solve_async(self, time_limit: Optional[timedelta] = None) -> SolveHandle:
+        """
+        Start solving the mixed integer linear program without blocking the event loop.
+        Await the returned handle for the status, afterwards ``get_result`` can be used as after ``solve``.
+        If it is infeasible, the model is written to a file (as by ``solve``).
+        :param time_limit: Optional[timedelta], time after which the solver stops and keeps its best solution
+        :return: SolveHandle, supports cancellation, progress polling and waiting with a timeout
+        """
+        return await SolveHandle.start(self._model, time_limit, Path(f"{self.__class__.__name__}.lp"))
+
     def get_result(self) -> LPPResult:
         """
         Get the result of the mixed integer linear program.
@@ -241,6 +263,21 @@ def _add_line_configuration_variables(data: LPPData) -> dict[tuple[LineNr, LineF
     return line_configuration_variables
 
 
+def calculate_required_vehicles(line: BusLine, frequency: LineFrequency, parameters: LinePlanningParameters) -> int:
+    """
+    Calculate the number of vehicles a line requires when operated at the given frequency, as in the problem.
+    :param line: BusLine, the line
+    :param frequency: LineFrequency, the number of services within the period
+    :param parameters: LinePlanningParameters, the dwell time at the terminals and the duration of the period
+    :return: int, the number of required vehicles
+    """
+    return _calculate_number_of_required_vehicles(
+        frequency,
+        _calculate_minimal_circulation_time(line, parameters.dwell_time_at_terminal),
+        parameters.period_duration,
+    )
+
+
 def _calculate_number_of_required_vehicles(
     frequency: int, minimal_circulation_time: timedelta, period_duration: timedelta
 ) -> int:
@@ -297,19 +334,31 @@ def _add_objective(data: LPPData, model: pl.LpProblem, variables: _LPPVariables)
     """
     weights = calculate_activity_weights(data.network, data.parameters)
     passenger_cost = pl.lpSum(weights[i] * variable for (_, i), variable in variables.passenger_flow.items())
+    vehicle_cost_per_configuration = _calculate_vehicle_cost_per_configuration(data)
     vehicle_cost = 0
-    for (line_index, line_freq), variable in tqdm(variables.line_configuration.items(), desc="adding objective"):
-        circulation_time = _calculate_minimal_circulation_time(
-            data.scenario.bus_lines[line_index - 1], data.parameters.dwell_time_at_terminal
-        )
-        vehicle_cost += (
-            _calculate_number_of_required_vehicles(line_freq, circulation_time, data.parameters.period_duration)
-            * data.parameters.vehicle_cost_per_period
-            * variable
-        )
+    for key, variable in tqdm(variables.line_configuration.items(), desc="adding objective"):
+        vehicle_cost += vehicle_cost_per_configuration[key] * variable
     model.objective = passenger_cost + vehicle_cost
 
 
+def _calculate_vehicle_cost_per_configuration(data: LPPData) -> dict[tuple[LineNr, LineFrequency], CHF]:
+    """
+    Calculate the cost of the vehicles required to operate each line configuration.
+    :param data: LPPData, data of the LP problem
+    :return: dict[tuple[LineNr, LineFrequency], CHF], a dict whose key is line number and frequency, while
+        value is the vehicle cost per period if this configuration is selected
+    """
+    vehicle_cost_per_configuration: dict[tuple[LineNr, LineFrequency], CHF] = {}
+    for line in data.scenario.bus_lines:
+        circulation_time = _calculate_minimal_circulation_time(line, data.parameters.dwell_time_at_terminal)
+        for frequency in line.permitted_frequencies:
+            vehicle_cost_per_configuration[line.number, frequency] = CHF(
+                _calculate_number_of_required_vehicles(frequency, circulation_time, data.parameters.period_duration)
+                * data.parameters.vehicle_cost_per_period
+            )
+    return vehicle_cost_per_configuration
+
+
 def calculate_activity_weights(
     line_planning_network: LinePlanningNetwork, parameters: LinePlanningParameters
 ) -> tuple[CHF, ...]:
@@ -380,21 +429,16 @@ def _add_flow_conservation_constraints(model: pl.LpProblem, variables: _LPPVaria
         passenger flow variables
     :param data: LPPData, data of the LP problem
     """
-    lpp_network = data.network
     lpp_graph = data.network.graph
     node_incidences = [
         (lpp_graph.incident(i, mode="in"), lpp_graph.incident(i, mode="out")) for i in lpp_graph.vs.indices
     ]
+    transfer_node_indices = _create_transfer_node_lookup(data.network)
     flow_balance_at_nodes = np.zeros((lpp_graph.vcount(), 1))
     for origin_station in tqdm(data.scenario.demand_matrix.all_origins(), desc="adding flow conservation constraints"):
-        flow_balance_at_nodes *= 0
-        for station_name, outflow in data.scenario.demand_matrix.matrix[origin_station].items():
-            if station_name == origin_station:
-                continue
-            node_index = lpp_graph.vs.find(name=lpp_network.transfer_node_name_from_station_name(station_name)).index
-            flow_balance_at_nodes[node_index] = round(-outflow, 2)
-        origin_index = lpp_graph.vs.find(name=lpp_network.transfer_node_name_from_station_name(origin_station)).index
-        flow_balance_at_nodes[origin_index] = -sum(flow_balance_at_nodes)
+        _calculate_flow_balance_at_nodes(
+            flow_balance_at_nodes, origin_station, data.scenario.demand_matrix, transfer_node_indices
+        )
         for flow_balance, (incoming_indices, outgoing_indices) in zip(flow_balance_at_nodes, node_incidences):
             model.addConstraint(
                 pl.lpSum(variables.passenger_flow[origin_station, i] for i in incoming_indices)
@@ -403,6 +447,44 @@ def _add_flow_conservation_constraints(model: pl.LpProblem, variables: _LPPVaria
             )
 
 
+def _create_transfer_node_lookup(network: LinePlanningNetwork) -> dict[StationName, int]:
+    """
+    Create a lookup from station names to the index of their transfer node in the network graph.
+    :param network: LinePlanningNetwork, the network of the line planning problem
+    :return: dict[StationName, int], a dict whose key is the station name, while value is the node index
+    """
+    node_index_by_name = {name: i for i, name in enumerate(network.all_node_names)}
+    prefix = network.transfer_node_name_from_station_name(StationName(""))
+    return {
+        StationName(name[len(prefix) :]): index for name, index in node_index_by_name.items() if name.startswith(prefix)
+    }
+
+
+def _calculate_flow_balance_at_nodes(
+    flow_balance_at_nodes: np.ndarray,
+    origin_station: StationName,
+    demand_matrix: DemandMatrix,
+    transfer_node_indices: Mapping[StationName, int],
+) -> None:
+    """
+    Calculate (in place) the flow balance at each node for the passengers starting at the given origin.
+        Destinations have a negative balance, the origin balances the total outflow.
+    :param flow_balance_at_nodes: np.ndarray, the array (one row per node) that is overwritten with the balances
+    :param origin_station: StationName, the origin of the passengers
+    :param demand_matrix: DemandMatrix, the demand of the scenario
+    :param transfer_node_indices: Mapping[StationName, int], the index of the transfer node of each station
+    """
+    flow_balance_at_nodes *= 0
+    destination_indices, outflows = demand_matrix.row(origin_station)
+    for destination_index, outflow in zip(destination_indices.tolist(), outflows.tolist()):
+        station_name = demand_matrix.destinations[destination_index]
+        if station_name == origin_station:
+            continue
+        flow_balance_at_nodes[transfer_node_indices[station_name]] = round(-outflow, 2)
+    origin_index = transfer_node_indices[origin_station]
+    flow_balance_at_nodes[origin_index] = -sum(flow_balance_at_nodes)
+
+
 def _add_at_most_one_config_per_line_allowed(model: pl.LpProblem, variables: _LPPVariables, data: LPPData) -> None:
     """
     Add configuration constraint, which ensures no more than one configuration is added to each line.
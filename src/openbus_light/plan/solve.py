@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Generator, NamedTuple, Optional
+
+import pulp as pl
+from pulp import PULP_CBC_CMD, PulpSolverError
+
+_OBJECTIVE_PATTERNS = (
+    re.compile(r"Integer solution of (?P<objective>\S+) found"),
+    re.compile(r"(?P<objective>\S+) best solution, best possible"),
+    re.compile(r"Objective value:\s+(?P<objective>\S+)"),
+)
+
+
+class SolveProgress(NamedTuple):
+    elapsed: timedelta
+    running: bool
+    best_objective: Optional[float]
+    last_message: str
+
+
+class SolveHandle:  # pylint: disable=too-many-instance-attributes
+    """
+    Handle of a CBC process solving a pulp model in the background, created by ``LPP.solve_async``.
+        Await the handle (or ``wait``) for completion, after which the values are assigned to the model
+        exactly as ``LpProblem.solve`` would do. ``cancel`` terminates the solver process.
+    """
+
+    def __init__(self, model: pl.LpProblem, path_if_infeasible: Optional[Path] = None) -> None:
+        self._model = model
+        self._path_if_infeasible = path_if_infeasible
+        self._started_at = time.monotonic()
+        self._best_objective: Optional[float] = None
+        self._last_message = ""
+        self._cancelled = False
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._task: Optional[asyncio.Task[int]] = None
+
+    @classmethod
+    async def start(
+        cls, model: pl.LpProblem, time_limit: Optional[timedelta] = None, path_if_infeasible: Optional[Path] = None
+    ) -> SolveHandle:
+        """
+        Start solving the model with CBC, return as soon as the solver process is running.
+        :param model: pl.LpProblem, the model to solve
+        :param time_limit: Optional[timedelta], time after which CBC stops and reports its best solution
+        :param path_if_infeasible: Optional[Path], where the model is written (as LP) if it is infeasible
+        :return: SolveHandle, the handle of the running solve
+        """
+        handle = cls(model, path_if_infeasible)
+        directory = tempfile.TemporaryDirectory(prefix="openbus_light_")  # pylint: disable=consider-using-with
+        try:
+            names = await asyncio.to_thread(model.writeMPS, str(Path(directory.name) / "model.mps"), rename=1)
+            handle._process = await asyncio.create_subprocess_exec(
+                *handle._create_command(Path(directory.name), time_limit),
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+            )
+        except BaseException:
+            directory.cleanup()
+            raise
+        handle._task = asyncio.create_task(handle._run(Path(directory.name), names, directory))
+        return handle
+
+    @property
+    def progress(self) -> SolveProgress:
+        """
+        Poll the progress of the solver.
+        :return: SolveProgress, elapsed time, best objective found so far and the last line of the solver log
+        """
+        return SolveProgress(
+            elapsed=timedelta(seconds=time.monotonic() - self._started_at),
+            running=not self.done(),
+            best_objective=self._best_objective,
+            last_message=self._last_message,
+        )
+
+    def done(self) -> bool:
+        """
+        Check whether the solve is finished (successfully, with an error or cancelled).
+        :return: bool
+        """
+        return self._task is not None and self._task.done()
+
+    def cancel(self) -> None:
+        """
+        Cancel the solve, the solver process is killed and its temporary files are removed.
+        """
+        self._cancelled = True
+        if self._process is not None and self._process.returncode is None:
+            self._process.kill()
+
+    async def wait(self, timeout: Optional[timedelta] = None) -> int:
+        """
+        Wait for the solve to finish. If the timeout expires or the waiting task is cancelled, the solve is cancelled.
+        :param timeout: Optional[timedelta], maximal time to wait
+        :return: int, the pulp status of the model (e.g. ``pulp.LpStatusOptimal``)
+        """
+        assert self._task is not None
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(self._task), None if timeout is None else timeout.total_seconds()
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            raise
+
+    def __await__(self) -> Generator[Any, None, int]:
+        return self.wait().__await__()
+
+    def _create_command(self, directory: Path, time_limit: Optional[timedelta]) -> list[str]:
+        """
+        Create the command line for CBC, as used by pulp.
+        :param directory: Path, the directory holding the model and receiving the solution
+        :param time_limit: Optional[timedelta], time after which CBC stops and reports its best solution
+        :return: list[str], the command
+        """
+        command = [PULP_CBC_CMD().path, str(directory / "model.mps")]
+        if self._model.sense == pl.LpMaximize:
+            command.append("-max")
+        if time_limit is not None:
+            command.extend(("-sec", str(time_limit.total_seconds())))
+        return command + ["-branch", "-printingOptions", "all", "-solution", str(directory / "model.sol")]
+
+    async def _run(
+        self, directory: Path, names: tuple[Any, ...], temporary_directory: tempfile.TemporaryDirectory
+    ) -> int:
+        """
+        Follow the solver log until the process exits, then read the solution into the model (and write the
+            model if it is infeasible and a path is given).
+        :param directory: Path, the directory holding the model and the solution
+        :param names: tuple[Any, ...], the variables and the renaming returned by ``writeMPS``
+        :param temporary_directory: TemporaryDirectory, removed once the solve is done
+        :return: int, the pulp status of the model
+        """
+        assert self._process is not None and self._process.stdout is not None
+        try:
+            async for raw_line in self._process.stdout:
+                self._follow_log(raw_line.decode(errors="replace").strip())
+            if await self._process.wait() != 0:
+                if self._cancelled:
+                    raise asyncio.CancelledError(f"{self} was cancelled")
+                raise PulpSolverError(f"Pulp: Error while executing {PULP_CBC_CMD().path}: {self._last_message}")
+            variables, variable_names, constraint_names, _ = names
+            status, values, _, _, _, solution_status = PULP_CBC_CMD().readsol_MPS(
+                str(directory / "model.sol"), self._model, variables, variable_names, constraint_names
+            )
+            self._model.assignVarsVals(values)
+            self._model.assignStatus(status, solution_status)
+            if self._model.status == pl.LpStatusInfeasible and self._path_if_infeasible is not None:
+                await asyncio.to_thread(self._model.writeLP, str(self._path_if_infeasible))
+            return self._model.status
+        finally:
+            if self._process.returncode is None:
+                self._process.kill()
+                await self._process.wait()
+            temporary_directory.cleanup()
+
+    def _follow_log(self, message: str) -> None:
+        """
+        Remember the last message of the solver and the best objective reported so far.
+        :param message: str, one line of the solver log
+        """
+        if not message:
+            return
+        self._last_message = message
+        for pattern in _OBJECTIVE_PATTERNS:
+            if (match := pattern.search(message)) is not None:
+                try:
+                    self._best_objective = float(match["objective"])
+                except ValueError:
+                    continue
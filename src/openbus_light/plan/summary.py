@@ -1,6 +1,8 @@
 from datetime import timedelta
 from typing import TypedDict
 
+import numpy as np
+
 from openbus_light.model.type import (
     CHF,
     CHFPerHour,
@@ -52,9 +54,9 @@ class Summary(TypedDict):
 
 def create_summary(planning_data: LPPData, result: LPPResult) -> Summary:
     demand_matrix = planning_data.scenario.demand_matrix
-    total_demand = sum(demand_matrix.starting_from(origins) for origins in demand_matrix.all_origins())
+    total_demand = demand_matrix.total()
     number_of_demand_relations = sum(
-        sum(demand > 0 for demand in demand_matrix.matrix[origins].values()) for origins in demand_matrix.all_origins()
+        int(np.count_nonzero(block.values > 0)) for block in demand_matrix.iterate_origin_blocks()
     )
 
     solution = result.solution
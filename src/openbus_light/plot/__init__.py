@@ -1,6 +1,23 @@
-from ._background import PlotBackground
-from ._cmap import ColorMap, create_colormap
-from .demand import create_od_plot, create_station_and_demand_plot
-from .line import create_station_and_line_plot, plot_lines_in_swiss_coordinates
-from .line_usage import plot_usage_for_each_direction
-from .network import plot_network_in_swiss_coordinate_grid, plot_network_usage_in_swiss_coordinates
+from typing import TYPE_CHECKING
+
+from ..utils import lazy_exports
+
+if TYPE_CHECKING:
+    from ._background import PlotBackground
+    from ._cmap import ColorMap, create_colormap
+    from .demand import create_od_plot, create_station_and_demand_plot
+    from .line import create_station_and_line_plot, plot_lines_in_swiss_coordinates
+    from .line_usage import plot_usage_for_each_direction
+    from .network import plot_network_in_swiss_coordinate_grid, plot_network_usage_in_swiss_coordinates
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "._background": ("PlotBackground",),
+        "._cmap": ("ColorMap", "create_colormap"),
+        ".demand": ("create_od_plot", "create_station_and_demand_plot"),
+        ".line": ("create_station_and_line_plot", "plot_lines_in_swiss_coordinates"),
+        ".line_usage": ("plot_usage_for_each_direction",),
+        ".network": ("plot_network_in_swiss_coordinate_grid", "plot_network_usage_in_swiss_coordinates"),
+    },
+)
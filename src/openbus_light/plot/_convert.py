@@ -1,15 +1,19 @@
 import math
+from typing import TypeVar
 
+import numpy as np
 from numba import njit
 
+FloatOrArray = TypeVar("FloatOrArray", float, np.ndarray)
 
-def wgs84_to_lv03(lat: float, lon: float) -> tuple[float, float]:
+
+def wgs84_to_lv03(lat: FloatOrArray, lon: FloatOrArray) -> tuple[FloatOrArray, FloatOrArray]:
     """
     Convert WGS84 coordinates (latitude, longitude) to Swiss coordinate system LV03 (CH1903).
 
     Args:
-        lat (float): Latitude in decimal degrees.
-        lon (float): Longitude in decimal degrees.
+        lat (float or np.ndarray): Latitude in decimal degrees, or an array of them.
+        lon (float or np.ndarray): Longitude in decimal degrees, or an array of them.
 
     Returns:
         tuple: A tuple containing the converted coordinates (east, north) in the Swiss coordinate system LV03.
@@ -45,7 +49,7 @@ def wgs84_to_lv03(lat: float, lon: float) -> tuple[float, float]:
     return east, north
 
 
-@njit
+@njit(cache=True)
 def shift_line_perpendicular(
     x_1: float, y_1: float, x_2: float, y_2: float, shift_distance: float
 ) -> tuple[float, float, float, float]:
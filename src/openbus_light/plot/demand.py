@@ -1,85 +1,74 @@
 from __future__ import annotations
 
 from itertools import chain
-from typing import Collection
 
 import numpy as np
 import plotly.graph_objects as go
 from matplotlib import pyplot as plt
+from matplotlib.collections import LineCollection
 from matplotlib.figure import Figure
-from matplotlib.lines import Line2D
 
-from ..model import DemandMatrix, Station
+from ..model import DemandMatrix, StationTable
 from ._background import PlotBackground
 from ._convert import shift_line_perpendicular, wgs84_to_lv03
 
 
-def create_station_and_demand_plot(stations: Collection[Station], plot_background: PlotBackground) -> Figure:
-    district_points = tuple(chain.from_iterable(station.district_points for station in stations))
+def create_station_and_demand_plot(stations: StationTable, plot_background: PlotBackground) -> Figure:
+    district_lat = np.array([point.position.lat for point in stations.district_points], dtype=np.float64)
+    district_long = np.array([point.position.long for point in stations.district_points], dtype=np.float64)
+    station_of_district_point = stations.station_of_district_point
     figure, axis = plt.subplots(figsize=(8, 8))
     axis.set_title("Default Title, if we see this in your report, it's not so good")
     axis.set_xlim(plot_background.bounding_box[0], plot_background.bounding_box[1])
     axis.set_ylim(plot_background.bounding_box[2], plot_background.bounding_box[3])
     background_image = plt.imread(plot_background.path_to_image)
     axis.imshow(background_image, zorder=0, extent=plot_background.bounding_box)
-    axis.scatter(
-        [point.position.long for point in district_points],
-        [point.position.lat for point in district_points],
-        zorder=1,
-        alpha=0.51,
-        c="b",
-        s=5,
-    )
-    axis.scatter(
-        [station.center_position.long for station in stations],
-        [station.center_position.lat for station in stations],
-        zorder=2,
-        alpha=0.5,
-        c="r",
-        s=10,
-    )
-    axis.scatter(
-        [station.center_position.long for station in stations],
-        [station.center_position.lat for station in stations],
-        zorder=4,
-        alpha=1,
-        c="r",
-        s=5,
+    axis.scatter(district_long, district_lat, zorder=1, alpha=0.51, c="b", s=5)
+    axis.scatter(stations.center_long, stations.center_lat, zorder=2, alpha=0.5, c="r", s=10)
+    axis.scatter(stations.center_long, stations.center_lat, zorder=4, alpha=1, c="r", s=5)
+    axis.add_collection(
+        LineCollection(
+            np.stack(
+                (
+                    np.column_stack(
+                        (
+                            stations.center_long[station_of_district_point],
+                            stations.center_lat[station_of_district_point],
+                        )
+                    ),
+                    np.column_stack((district_long, district_lat)),
+                ),
+                axis=1,
+            ),
+            linewidths=0.75,
+            colors=[(0.0, 0.0, 1.0)],
+            alpha=0.5,
+            zorder=3,
+        )
     )
-    for station in stations:
-        for point in station.district_points:
-            axis.add_line(
-                Line2D(
-                    [station.center_position.long, point.position.long],
-                    [station.center_position.lat, point.position.lat],
-                    linewidth=0.75,
-                    color=(0.0, 0.0, 1.0),
-                    alpha=0.5,
-                    zorder=3,
-                )
-            )
     return figure
 
 
 # pylint: disable=too-many-locals
-def create_od_plot(od_matrix: DemandMatrix, stations: Collection[Station]) -> go.Figure:
+def create_od_plot(od_matrix: DemandMatrix, stations: StationTable) -> go.Figure:
     """
     Create a plot of the origin-destination matrix with a slider for dynamically adjusting the minimum demand threshold.
     :param od_matrix: DemandMatrix, the origin-destination matrix
-    :param stations: Collection[Station], the collection of stations
+    :param stations: StationTable, the stations
     :return: go.Figure, the plotly figure
     """
-    station_coordinates = {
-        station.name: wgs84_to_lv03(station.center_position.lat, station.center_position.long) for station in stations
-    }
+    east, north = wgs84_to_lv03(stations.center_lat, stations.center_long)
+    station_coordinates = dict(zip(stations.names, zip(east.tolist(), north.tolist())))
 
-    # Pre-calculate min and max pax for slider range and normalization
-    min_pax = min(chain.from_iterable(v.values() for v in od_matrix.matrix.values()))
-    delta_pax = max(chain.from_iterable(v.values() for v in od_matrix.matrix.values())) - min_pax
+    # Pre-calculate min and max pax for slider range and normalization, pairs that are not stored have 0 pax
+    min_pax = 0.0
+    delta_pax = float(od_matrix.values.max(initial=0.0)) - min_pax
 
     pax_counts = []
     figure = go.Figure()
-    for origin, destination, pax in od_matrix.all_od_pairs():
+    for origin, destination, pax in chain.from_iterable(
+        block.all_od_pairs() for block in od_matrix.iterate_origin_blocks()
+    ):
         o_coordinates, d_coordinates = station_coordinates[origin], station_coordinates[destination]
         shifted_line = shift_line_perpendicular(
             o_coordinates[0],
@@ -118,11 +107,11 @@ def create_od_plot(od_matrix: DemandMatrix, stations: Collection[Station]) -> go
     )
 
     # Define steps for the slider
-    pax_counts.sort()
+    sorted_pax_counts = sorted(pax_counts)
     # sample 10 thresholds from the sorted list of passenger counts
     steps = []
-    for threshold in pax_counts[:: len(pax_counts) // 11][:10]:
-        visible_traces = [passengers >= threshold for _, _, passengers in od_matrix.all_od_pairs()] + [True]
+    for threshold in [min_pax, *sorted_pax_counts[:: max(len(sorted_pax_counts) // 11, 1)][1:10]]:
+        visible_traces = [passengers >= threshold for passengers in pax_counts] + [True]
         steps.append({"method": "update", "args": [{"visible": visible_traces}], "label": f"{threshold:.2f}"})
 
     figure.update_layout(
@@ -5,20 +5,20 @@ import matplotlib.pyplot as plt
 import numpy as np
 from plotly.graph_objs import graph_objs as go
 
-from openbus_light.model import BusLine, Direction, Station
+from openbus_light.model import BusLine, Direction, StationTable
 from openbus_light.plot._background import PlotBackground
 from openbus_light.plot._cmap import ColorMap
 from openbus_light.plot._convert import wgs84_to_lv03
 
 
 def create_station_and_line_plot(
-    stations: Collection[Station], lines: Collection[BusLine], plot_background: PlotBackground
+    stations: StationTable, lines: Collection[BusLine], plot_background: PlotBackground
 ) -> plt.Figure:
     """
     Create a plot showing the public transport network with stations and lines.
 
     Args:
-        stations (list): A list of Station objects with center_position attributes.
+        stations (StationTable): The stations, with their center coordinates.
         lines (list): A list of BusLine objects with direction_a and direction_b attributes.
         plot_background (PlotBackground): An object with path_to_image and bounding_box attributes for background image.
 
@@ -29,19 +29,12 @@ def create_station_and_line_plot(
     axis.imshow(plt.imread(plot_background.path_to_image), zorder=0, extent=plot_background.bounding_box)
 
     # Plot stations
-    center_lookup = {station.name: station.center_position for station in stations}
-    for station in stations:
-        axis.scatter(
-            station.center_position.long, station.center_position.lat, zorder=1, alpha=1, c="k", s=20, label="Stations"
-        )
+    axis.scatter(stations.center_long, stations.center_lat, zorder=1, alpha=1, c="k", s=20, label="Stations")
 
     for direction in chain.from_iterable((line.direction_up, line.direction_down) for line in lines):
+        station_indices = [stations.index_of(s_name) for s_name in direction.station_sequence]
         axis.plot(
-            [center_lookup[s_name].long for s_name in direction.station_sequence],
-            [center_lookup[s_name].lat for s_name in direction.station_sequence],
-            zorder=2,
-            alpha=0.5,
-            c="b",
+            stations.center_long[station_indices], stations.center_lat[station_indices], zorder=2, alpha=0.5, c="b"
         )
     # Optional: Customize the plot
     axis.set_title("Public Transport Network")
@@ -52,13 +45,13 @@ def create_station_and_line_plot(
 
 
 def plot_lines_in_swiss_coordinates(
-    stations: Collection[Station], lines: Collection[BusLine], cmap: None | ColorMap = None
+    stations: StationTable, lines: Collection[BusLine], cmap: None | ColorMap = None
 ) -> go.Figure:
     """
     Create a plot showing the public transport network with stations and lines in Swiss coordinates.
 
     Args:
-        stations (list): A list of Station objects with center_position attributes.
+        stations (StationTable): The stations, with their center coordinates.
         lines (list): A list of BusLine objects with direction_a and direction_b attributes.
         cmap (ColorMap): An object with color attributes for the lines.
 
@@ -68,18 +61,17 @@ def plot_lines_in_swiss_coordinates(
     """
     figure = go.Figure()
 
-    center_lookup = {}
-    for station in stations:
-        center_lookup[station.name] = wgs84_to_lv03(station.center_position.lat, station.center_position.long)
+    east, north = wgs84_to_lv03(stations.center_lat, stations.center_long)
+    center_lookup = dict(zip(stations.names, zip(east.tolist(), north.tolist())))
 
     figure.add_trace(
         go.Scatter(
-            x=[x_ for x_, _ in center_lookup.values()],
-            y=[y_ for _, y_ in center_lookup.values()],
+            x=east,
+            y=north,
             mode="markers",
             marker={"size": 10, "color": "black"},
             name="Stations",
-            text=[station.name for station in stations],
+            text=list(stations.names),
             hoverinfo="text",
         )
     )
@@ -0,0 +1,15 @@
+from typing import TYPE_CHECKING
+
+from ..utils import lazy_exports
+
+if TYPE_CHECKING:
+    from .server import PlanningServer, create_server
+    from .service import SCENARIO_PARAMETERS, PlanningQuery, PlanningService, parameters_from_dict
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        ".server": ("PlanningServer", "create_server"),
+        ".service": ("SCENARIO_PARAMETERS", "PlanningQuery", "PlanningService", "parameters_from_dict"),
+    },
+)
@@ -0,0 +1,52 @@
+import argparse
+import json
+from pathlib import Path
+
+from ..manipulate import ScenarioPaths
+from .server import create_server
+from .service import PlanningService, parameters_from_dict
+
+
+def main() -> None:
+    """
+    Load the scenario once and answer what-if queries until interrupted.
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Warm line planning server, POST /plan answers with a Summary.")
+    parser.add_argument(
+        "--parameters",
+        type=Path,
+        required=True,
+        help="Json file with the baseline parameters, as in the used_parameters of a Summary.",
+    )
+    parser.add_argument("--lines", type=Path, required=True, help="Directory with the line data.")
+    parser.add_argument("--stations", type=Path, required=True, help="Zip file with the stations.")
+    parser.add_argument("--districts", type=Path, required=True, help="Zip file with the district points.")
+    parser.add_argument("--demand", type=Path, required=True, help="Zip file with the demand.")
+    parser.add_argument("--measurements", type=Path, required=True, help="Zip file with the measurements.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on.")
+    args = parser.parse_args()
+
+    with open(args.parameters, encoding="utf-8") as file:
+        parameters = parameters_from_dict(json.load(file))
+    paths = ScenarioPaths(
+        to_demand=args.demand,
+        to_lines=args.lines,
+        to_stations=args.stations,
+        to_districts=args.districts,
+        to_measurements=args.measurements,
+    )
+    print("Loading the scenario...")
+    server = create_server(PlanningService.load(parameters, paths), args.host, args.port)
+    print(f"Loading the scenario...done, serving on http://{args.host}:{server.server_port}/plan")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
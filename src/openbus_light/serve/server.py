@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import json
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from .service import PlanningService
+
+
+class PlanningServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], service: PlanningService) -> None:
+        super().__init__(address, _PlanningRequestHandler)
+        self.service = service
+
+
+class _PlanningRequestHandler(BaseHTTPRequestHandler):
+    server: PlanningServer
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        if self.path != "/health":
+            self._reply(HTTPStatus.NOT_FOUND, {"error": f"unknown path {self.path}"})
+            return
+        self._reply(HTTPStatus.OK, {"status": "ok"})
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        if self.path != "/plan":
+            self._reply(HTTPStatus.NOT_FOUND, {"error": f"unknown path {self.path}"})
+            return
+        try:
+            query = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not isinstance(query, dict):
+                raise ValueError("the query must be a json object")
+            summary = self.server.service.plan(query)
+        except (ValueError, TypeError, KeyError) as error:
+            self._reply(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+        except UserWarning as warning:
+            self._reply(HTTPStatus.UNPROCESSABLE_ENTITY, {"error": str(warning)})
+        else:
+            self._reply(HTTPStatus.OK, summary)
+
+    def _reply(self, status: HTTPStatus, body: Any) -> None:
+        """
+        Send the body as json.
+        :param status: HTTPStatus, the status of the response
+        :param body: Any, a json serialisable object
+        """
+        encoded = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+
+def create_server(service: PlanningService, host: str = "127.0.0.1", port: int = 8765) -> PlanningServer:
+    """
+    Create the http server answering what-if queries, ``POST /plan`` with a json query returns a json Summary.
+    :param service: PlanningService, the warm service answering the queries
+    :param host: str, the address to listen on
+    :param port: int, the port to listen on, 0 picks a free port
+    :return: PlanningServer, call ``serve_forever`` to start serving
+    """
+    return PlanningServer((host, port), service)
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from datetime import timedelta
+from threading import Lock
+from typing import Any, Generic, Hashable, Mapping, NamedTuple, Optional, TypeVar
+
+from ..manipulate import ScenarioPaths, load_scenario
+from ..model import LineFrequency, LineNr, PlanningScenario, VehicleCapacity
+from ..plan import (
+    LPP,
+    LinePlanningNetwork,
+    LinePlanningParameters,
+    LPPData,
+    Summary,
+    create_line_planning_problem,
+    create_summary,
+)
+
+SCENARIO_PARAMETERS = frozenset(
+    (
+        "permitted_frequencies",
+        "demand_scaling",
+        "demand_association_radius",
+        "walking_speed_between_stations",
+        "maximal_walking_distance",
+    )
+)
+_DURATION_PARAMETERS = frozenset(("dwell_time_at_terminal", "period_duration"))
+
+KeyT = TypeVar("KeyT", bound=Hashable)
+ValueT = TypeVar("ValueT")
+
+
+class _LRUCache(Generic[KeyT, ValueT]):
+    def __init__(self, maxsize: int) -> None:
+        self._maxsize = maxsize
+        self._entries: OrderedDict[KeyT, ValueT] = OrderedDict()
+
+    def get(self, key: KeyT) -> Optional[ValueT]:
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, key: KeyT, value: ValueT) -> ValueT:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+        return value
+
+
+class PlanningQuery(NamedTuple):
+    parameters: LinePlanningParameters
+    frequencies: tuple[tuple[LineNr, tuple[LineFrequency, ...]], ...]
+    capacities: tuple[tuple[LineNr, VehicleCapacity], ...]
+
+
+class _WarmProblem(NamedTuple):
+    lpp: LPP
+    planning_data: LPPData
+
+
+def parameters_from_dict(
+    raw: Mapping[str, Any], base: Optional[LinePlanningParameters] = None
+) -> LinePlanningParameters:
+    """
+    Convert a json compatible dict (as in ``Summary["used_parameters"]``) to LinePlanningParameters.
+    :param raw: Mapping[str, Any], durations are given in seconds, the frequencies as list
+    :param base: Optional[LinePlanningParameters], parameters to take the missing values from
+    :return: LinePlanningParameters
+    """
+    if unknown := set(raw).difference(LinePlanningParameters._fields):
+        raise ValueError(f"unknown parameters {sorted(unknown)}")
+    converted: dict[str, Any] = {
+        key: (
+            timedelta(seconds=value)
+            if key in _DURATION_PARAMETERS
+            else tuple(LineFrequency(frequency) for frequency in value) if key == "permitted_frequencies" else value
+        )
+        for key, value in raw.items()
+    }
+    if base is not None:
+        return base._replace(**converted)
+    if missing := set(LinePlanningParameters._fields).difference(raw):
+        raise ValueError(f"missing parameters {sorted(missing)}")
+    return LinePlanningParameters(**converted)
+
+
+def _as_positive_int(value: Any, description: str) -> int:
+    """
+    Check that a value of a query is a positive integer, as json numbers are not checked by the NewTypes.
+    :param value: Any, the decoded json value
+    :param description: str, what the value is, for the error
+    :return: int, the value, raises ValueError if it is not a positive integer (booleans are not integers here)
+    """
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        raise ValueError(f"{description} must be a positive integer, not {value!r}")
+    return value
+
+
+class PlanningService:
+    """
+    Keeps the scenario, the line planning networks and the built line planning problems in memory,
+        such that a what-if query only pays for the overrides it contains and the solve.
+        Networks are shared between queries with the same frequencies and period duration,
+        problems between queries that are identical up to the overrides.
+    """
+
+    def __init__(
+        self, scenario: PlanningScenario, parameters: LinePlanningParameters, maximal_cached_problems: int = 8
+    ) -> None:
+        scenario.check_consistency()
+        self._scenario = scenario
+        self._parameters = parameters
+        self._networks: _LRUCache[Hashable, LinePlanningNetwork] = _LRUCache(maximal_cached_problems)
+        self._problems: _LRUCache[PlanningQuery, _WarmProblem] = _LRUCache(maximal_cached_problems)
+        self._lock = Lock()
+        self._get_warm_problem(self.parse_query({}))
+
+    @classmethod
+    def load(
+        cls, parameters: LinePlanningParameters, paths: ScenarioPaths, maximal_cached_problems: int = 8
+    ) -> PlanningService:
+        """
+        Load the scenario once and build the baseline problem.
+        :param parameters: LinePlanningParameters, the baseline parameters, also used to load the scenario
+        :param paths: ScenarioPaths, paths in the scenario
+        :param maximal_cached_problems: int, number of networks and problems kept in memory
+        :return: PlanningService
+        """
+        return cls(load_scenario(parameters, paths), parameters, maximal_cached_problems)
+
+    @property
+    def parameters(self) -> LinePlanningParameters:
+        return self._parameters
+
+    def parse_query(self, raw: Mapping[str, Any]) -> PlanningQuery:
+        """
+        Parse a what-if query, all fields are optional:
+            ``{"parameters": {...}, "frequencies": {"<line nr>": [...]}, "capacities": {"<line nr>": ...}}``.
+            Parameters that are used while loading the scenario can not be overridden.
+        :param raw: Mapping[str, Any], the decoded json query
+        :return: PlanningQuery, the complete query, missing values taken from the baseline
+        """
+        if unknown := set(raw).difference(("parameters", "frequencies", "capacities")):
+            raise ValueError(f"unknown fields {sorted(unknown)}")
+        parameter_overrides = raw.get("parameters", {})
+        if fixed := SCENARIO_PARAMETERS.intersection(parameter_overrides):
+            raise ValueError(f"{sorted(fixed)} are used to load the scenario, restart the service to change them")
+        frequencies = {line.number: line.permitted_frequencies for line in self._scenario.bus_lines}
+        capacities = {line.number: line.capacity for line in self._scenario.bus_lines}
+        for line_nr, line_frequencies in raw.get("frequencies", {}).items():
+            if LineNr(int(line_nr)) not in frequencies:
+                raise ValueError(f"unknown line {line_nr}")
+            if not isinstance(line_frequencies, list):
+                raise ValueError(f"the frequencies of line {line_nr} must be a list, not {line_frequencies!r}")
+            frequencies[LineNr(int(line_nr))] = tuple(
+                LineFrequency(_as_positive_int(frequency, f"a frequency of line {line_nr}"))
+                for frequency in line_frequencies
+            )
+        for line_nr, capacity in raw.get("capacities", {}).items():
+            if LineNr(int(line_nr)) not in capacities:
+                raise ValueError(f"unknown line {line_nr}")
+            capacities[LineNr(int(line_nr))] = VehicleCapacity(
+                _as_positive_int(capacity, f"the capacity of line {line_nr}")
+            )
+        return PlanningQuery(
+            parameters_from_dict(parameter_overrides, self._parameters),
+            tuple(frequencies.items()),
+            tuple(capacities.items()),
+        )
+
+    def plan(self, raw_query: Mapping[str, Any]) -> Summary:
+        """
+        Answer a what-if query with the summary of the optimal line plan.
+        :param raw_query: Mapping[str, Any], the decoded json query, see ``parse_query``
+        :return: Summary, the summary of the optimal solution
+        """
+        query = self.parse_query(raw_query)
+        with self._lock:
+            warm_problem = self._get_warm_problem(query)
+            warm_problem.lpp.solve()
+            result = warm_problem.lpp.get_result()
+        if not result.success:
+            raise UserWarning("No optimal solution found, please check the parameters.")
+        return create_summary(warm_problem.planning_data, result)
+
+    def _get_warm_problem(self, query: PlanningQuery) -> _WarmProblem:
+        """
+        Get the line planning problem of the query, build it (and its network) if it is not in memory.
+        :param query: PlanningQuery
+        :return: _WarmProblem, the problem and the data it was built from
+        """
+        if (warm_problem := self._problems.get(query)) is not None:
+            return warm_problem
+        frequencies, capacities = dict(query.frequencies), dict(query.capacities)
+        scenario = self._scenario._replace(
+            bus_lines=tuple(
+                line._replace(permitted_frequencies=frequencies[line.number], capacity=capacities[line.number])
+                for line in self._scenario.bus_lines
+            )
+        )
+        network_key = (query.frequencies, query.parameters.period_duration)
+        if (network := self._networks.get(network_key)) is None:
+            network = self._networks.put(
+                network_key, LinePlanningNetwork.create_from_scenario(scenario, query.parameters.period_duration)
+            )
+        planning_data = LPPData(query.parameters, scenario, network)
+        return self._problems.put(query, _WarmProblem(create_line_planning_problem(planning_data), planning_data))
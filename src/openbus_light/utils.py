@@ -1,5 +1,7 @@
+import sys
+from importlib import import_module
 from itertools import tee
-from typing import IO, Iterable, TypeVar
+from typing import IO, Any, Callable, Iterable, Mapping, TypeVar
 
 
 def skip_one_line_in_file(file_handle: IO) -> None:
@@ -14,3 +16,28 @@ def pairwise(iterable: Iterable[IterT]) -> Iterable[tuple[IterT, IterT]]:
     first, second = tee(iterable)
     next(second, None)
     return zip(first, second)
+
+
+def lazy_exports(
+    package_name: str, exports_by_module: Mapping[str, Iterable[str]]
+) -> tuple[Callable[[str], Any], Callable[[], list[str]]]:
+    """
+    Create the module level ``__getattr__`` and ``__dir__`` (PEP 562) of a package, such that its exports are
+        only imported from their submodule when they are accessed for the first time.
+    :param package_name: str, the ``__name__`` of the package
+    :param exports_by_module: Mapping[str, Iterable[str]], the exported names by (relative) submodule
+    :return: tuple[Callable, Callable], the ``__getattr__`` and ``__dir__`` of the package
+    """
+    module_by_export = {name: module for module, names in exports_by_module.items() for name in names}
+
+    def __getattr__(name: str) -> Any:
+        if name not in module_by_export:
+            raise AttributeError(f"module {package_name!r} has no attribute {name!r}")
+        value = getattr(import_module(module_by_export[name], package_name), name)
+        setattr(sys.modules[package_name], name, value)
+        return value
+
+    def __dir__() -> list[str]:
+        return sorted(set(vars(sys.modules[package_name])).union(module_by_export))
+
+    return __getattr__, __dir__
@@ -0,0 +1,51 @@
+import time
+
+import numpy as np
+
+
+def warm_up_compiled_kernels() -> None:
+    """
+    Compile all numba kernels of the package once, they are cached (``cache=True``) next to their modules,
+        such that later processes load the machine code from disk instead of compiling it again.
+        Run it once after installing the package, e.g. ``python -m openbus_light.warmup``.
+    """
+    # pylint: disable=import-outside-toplevel
+    from .analyse.stop_alignment import _calculate_common_subsequence_lengths
+    from .manipulate.point import (
+        calculate_distance_in_m,
+        calculate_distance_matrix_in_m,
+        calculate_distance_matrix_in_parallel,
+        calculate_distances_from_point_in_m,
+    )
+    from .manipulate.spatial_index import find_nearest_station_within_radius, find_pairs_within_radius
+    from .model import Meter, PointIn2D, StationName, StationTable
+    from .plot._convert import shift_line_perpendicular
+
+    calculate_distance_in_m(PointIn2D(47.5, 8.7), PointIn2D(47.6, 8.8))
+    lat, long = np.array([47.5, 47.6]), np.array([8.7, 8.8])
+    calculate_distances_from_point_in_m(47.5, 8.7, lat, long)
+    calculate_distance_matrix_in_m(lat, long, lat, long)
+    calculate_distance_matrix_in_parallel(lat, long, lat, long)
+    find_nearest_station_within_radius(
+        (PointIn2D(47.5, 8.7),),
+        StationTable.from_points((StationName("A"),), np.array([0, 1]), lat[1:], long[1:]),
+        Meter(1),
+    )
+    find_pairs_within_radius(lat, long, Meter(1))
+    shift_line_perpendicular(0.0, 0.0, 1.0, 1.0, 1.0)
+    _calculate_common_subsequence_lengths(np.array([0, 1]), np.array([0, 2]), np.array([1, 0]))
+
+
+def main() -> None:
+    """
+    Warm up the cache of the numba kernels and report how long it took.
+    :return: None
+    """
+    print("Warming up the compiled kernels...")
+    started_at = time.perf_counter()
+    warm_up_compiled_kernels()
+    print(f"Warming up the compiled kernels...done, after {time.perf_counter() - started_at:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
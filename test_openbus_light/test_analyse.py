@@ -0,0 +1,321 @@
+import pickle
+import unittest
+from dataclasses import replace
+from datetime import timedelta
+from typing import Optional, Sequence
+
+import numpy as np
+from test_openbus_light.shared import test_parameters
+
+from openbus_light.analyse import (
+    BINS_PER_DAY,
+    DelayCube,
+    QuantileSketch,
+    RunningTimeSketches,
+    align_recorded_trips,
+    analyse_headways,
+    calculate_dwell_times_by_station,
+    calculate_trip_times_by_station_pair,
+    compare_vehicle_requirements,
+    reconstruct_vehicle_blocks,
+)
+from openbus_light.model import (
+    BusLine,
+    CirculationId,
+    Direction,
+    DirectionName,
+    LineFrequency,
+    LineName,
+    LineNr,
+    RecordedTrip,
+    RecordedTripTable,
+    StationName,
+    TripNr,
+    VehicleCapacity,
+)
+
+_Stop = tuple[str, Optional[int], Optional[int], Optional[int], Optional[int]]
+
+
+def _create_table(trips: Sequence[Sequence[_Stop]]) -> RecordedTripTable:
+    """
+    Create a table of recorded trips, with the times of each stop in seconds after midnight (or None).
+    """
+    stops = [stop for trip in trips for stop in trip]
+    station_names, station_ids = np.unique([stop[0] for stop in stops], return_inverse=True)
+
+    def times_of(column: int) -> np.ndarray:
+        return np.array(
+            [np.datetime64("NaT") if stop[column] is None else np.datetime64(stop[column], "s") for stop in stops],
+            dtype="datetime64[ns]",
+        ).view(np.int64)
+
+    return RecordedTripTable(
+        station_names=tuple(StationName(name) for name in station_names.tolist()),
+        station_ids=station_ids.astype(np.int64),
+        arrival_planned=times_of(1),
+        arrival_observed=times_of(2),
+        departure_planned=times_of(3),
+        departure_observed=times_of(4),
+        trip_offsets=np.cumsum([0, *(len(trip) for trip in trips)]).astype(np.int64),
+    )
+
+
+def _with_recorded_trips(
+    line: BusLine, direction: Direction, trips: Sequence[Sequence[_Stop]], circulation_ids: Sequence[str]
+) -> Direction:
+    """
+    Replace the recorded trips of a direction of a line.
+    """
+    table = _create_table(trips)
+    return replace(
+        direction,
+        recorded_trips=tuple(
+            RecordedTrip(
+                line=line.name,
+                direction=direction.name,
+                trip_nr=TripNr(i),
+                circulation_id=CirculationId(circulation_id),
+                start=StationName(trip[0][0]),
+                end=StationName(trip[-1][0]),
+                stop_count=len(trip),
+                table=table,
+                position=i,
+            )
+            for i, (trip, circulation_id) in enumerate(zip(trips, circulation_ids))
+        ),
+    )
+
+
+class RunningTimeTestCase(unittest.TestCase):
+    def test_trip_and_dwell_times_are_grouped_by_station(self) -> None:
+        """
+        The trip times must be grouped by pair of consecutive stops, the dwell times by intermediate stop,
+            in the order of the trips, and missing times must give NaN.
+        """
+        table = _create_table(
+            [
+                [("A", None, None, 0, 10), ("B", 60, 80, 90, 100), ("C", 200, 230, None, None)],
+                [("A", None, None, 1000, 1000), ("B", 1060, None, 1070, 1090), ("C", 1200, 1180, None, None)],
+                [("C", None, None, 2000, 2005), ("B", 2100, 2110, 2130, 2120)],
+            ]
+        )
+        trip_times = calculate_trip_times_by_station_pair(table)
+        self.assertEqual(trip_times.keys, (("A", "B"), ("B", "C"), ("C", "B")))
+        np.testing.assert_array_equal(trip_times.planned_of((StationName("A"), StationName("B"))), [60, 60])
+        np.testing.assert_array_equal(trip_times.observed_of((StationName("A"), StationName("B"))), [70, np.nan])
+        np.testing.assert_array_equal(trip_times.observed_of((StationName("B"), StationName("C"))), [130, 90])
+        np.testing.assert_array_equal(trip_times.observed_of((StationName("C"), StationName("B"))), [105])
+        self.assertEqual(len(trip_times.observed_of((StationName("B"), StationName("A")))), 0)
+
+        dwell_times = calculate_dwell_times_by_station(table)
+        self.assertEqual(dwell_times.keys, ("B",))
+        np.testing.assert_array_equal(dwell_times.planned_of(StationName("B")), [30, 10])
+        np.testing.assert_array_equal(dwell_times.observed_of(StationName("B")), [20, np.nan])
+        self.assertEqual(len(dwell_times.observed_of(StationName("A"))), 0)
+
+
+class QuantileSketchTestCase(unittest.TestCase):
+    def test_merged_sketches_estimate_the_quantiles(self) -> None:
+        """
+        Sketches of parts of a stream, merged after pickling, must estimate the quantiles of the whole stream
+            within a small rank error, while holding only a small fraction of the values.
+        """
+        values = np.random.default_rng(42).exponential(60, 200_000)
+        sketches = []
+        for part in np.array_split(values, 4):
+            sketch = QuantileSketch()
+            for chunk in np.array_split(part, 10):
+                sketch.update(chunk)
+            sketches.append(pickle.loads(pickle.dumps(sketch)))
+        merged = sketches[0].merge(sketches[1]).merge(sketches[2].merge(sketches[3]))
+        self.assertEqual(merged.count, len(values))
+        self.assertLess(len(merged), 1000)
+        fractions = np.array([0.05, 0.25, 0.5, 0.75, 0.95])
+        ranks = np.searchsorted(np.sort(values), merged.quantile(fractions)) / len(values)
+        np.testing.assert_allclose(ranks, fractions, atol=0.02)
+
+        small = QuantileSketch()
+        small.update([3.0, np.nan, 1.0, 2.0])
+        self.assertEqual(small.quantile(0.5), 2.0)
+        self.assertTrue(np.isnan(QuantileSketch().quantile(0.5)))
+
+    def test_line_is_calibrated_to_observed_trip_times(self) -> None:
+        """
+        The trip times of a line must be calibrated to the quantiles of the observed trip times, station pairs
+            without observation must keep their trip time.
+        """
+        stations = (StationName("A"), StationName("B"), StationName("C"))
+        line = BusLine(
+            LineNr(0),
+            LineName("1"),
+            Direction(DirectionName("up"), stations, (timedelta(seconds=1),) * 2),
+            Direction(DirectionName("down"), stations[::-1], (timedelta(seconds=1),) * 2),
+            VehicleCapacity(100),
+            (LineFrequency(1),),
+        )
+        first, second = RunningTimeSketches(), RunningTimeSketches()
+        first.add_recorded_trips(
+            line.name, line.direction_up.name, _create_table([[("A", None, None, 0, 0), ("B", 60, 60, None, None)]])
+        )
+        second.add_recorded_trips(
+            line.name,
+            line.direction_up.name,
+            _create_table([[("A", None, None, 0, 0), ("B", 90, 80, 95, 85), ("C", 200, 205, None, None)]]),
+        )
+        calibrated = first.merge(second).calibrate(line, quantile=1.0)
+        self.assertEqual(calibrated.direction_up.trip_times, (timedelta(seconds=80), timedelta(seconds=120)))
+        self.assertEqual(calibrated.direction_down.trip_times, line.direction_down.trip_times)
+        self.assertEqual(
+            first.merge(second).dwell_time_quantiles(line.name, line.direction_up.name, 0.5),
+            {StationName("B"): timedelta(seconds=5)},
+        )
+
+
+class DelayCubeTestCase(unittest.TestCase):
+    def test_slices_aggregate_the_delays_per_time_of_day(self) -> None:
+        """
+        The delays must be binned by the planned time of day, slices must aggregate the matching cells, and
+            merging two cubes must add their cells.
+        """
+        table = _create_table(
+            [
+                [("A", None, None, 0, 10), ("B", 60, 80, 90, 100), ("C", 200, 230, None, None)],
+                [("A", None, None, 86400 + 1000, 86400 + 1000), ("B", 86400 + 1060, None, 86400 + 1070, 86400 + 1190)],
+            ]
+        )
+        cube = DelayCube(np.array([0.0, 60.0, 120.0]))
+        cube.add_recorded_trips(LineName("1"), DirectionName("up"), table)
+        cube.add_recorded_trips(LineName("2"), DirectionName("up"), table)
+
+        departures = cube.slice("departure", line=LineName("1"))
+        self.assertEqual(departures.counts.shape, (BINS_PER_DAY,))
+        self.assertEqual(departures.counts[:2].tolist(), [2, 2])
+        self.assertEqual(departures.counts.sum(), 4)
+        np.testing.assert_array_equal(departures.means[:2], [10.0, 60.0])
+        self.assertEqual(departures.histograms[1].tolist(), [0, 1, 0, 1])
+        self.assertEqual(departures.quantile(1.0)[1], 120.0)
+        self.assertTrue(np.isnan(departures.quantile(0.5)[2]))
+
+        arrivals = cube.slice("arrival", station=StationName("C"))
+        self.assertEqual(arrivals.counts[0], 2)
+        self.assertEqual(arrivals.means[0], 30.0)
+        np.testing.assert_array_equal(cube.merge(cube).slice("arrival").counts, 2 * cube.slice("arrival").counts)
+
+
+class StopAlignmentTestCase(unittest.TestCase):
+    def test_stop_sequences_are_aligned_with_both_directions(self) -> None:
+        """
+        The number of stops visited in the order of each direction must be the longest common subsequence,
+            stations the line does not serve never match.
+        """
+        stations = tuple(StationName(name) for name in "ABCD")
+        line = BusLine(
+            LineNr(0),
+            LineName("1"),
+            Direction(DirectionName("up"), stations, (timedelta(seconds=1),) * 3),
+            Direction(DirectionName("down"), stations[::-1], (timedelta(seconds=1),) * 3),
+            VehicleCapacity(100),
+            (LineFrequency(1),),
+        )
+        table = _create_table(
+            [
+                [(name, None, None, None, None) for name in trip]
+                for trip in (("A", "B", "C", "D"), ("A", "C", "B", "X", "D"), ("X", "Y"), ("D", "C", "A"))
+            ]
+        )
+        alignment = align_recorded_trips(line, table)
+        self.assertEqual(alignment.matched_stops.tolist(), [[4, 1], [3, 2], [0, 0], [1, 3]])
+        self.assertEqual(alignment.best_direction.tolist(), [0, 0, -1, 1])
+        np.testing.assert_allclose(alignment.stop_share[:, 0], [1.0, 0.6, 0.0, 1 / 3])
+        np.testing.assert_allclose(alignment.route_share[:, 1], [0.25, 0.5, 0.0, 0.75])
+
+
+class VehicleBlockTestCase(unittest.TestCase):
+    def test_blocks_are_split_by_circulation_and_layover(self) -> None:
+        """
+        Trips of one circulation form a block until a pause longer than the maximal layover, the peak must count
+            the blocks in service at once, and the modelled requirement must be the one of the planning problem.
+        """
+        line = BusLine(
+            LineNr(0),
+            LineName("1"),
+            Direction(DirectionName("up"), (StationName("A"), StationName("B")), (timedelta(seconds=1),)),
+            Direction(DirectionName("down"), (StationName("B"), StationName("A")), (timedelta(seconds=1),)),
+            VehicleCapacity(100),
+            (LineFrequency(6),),
+        )
+        day = 86400
+        line = line._replace(
+            direction_up=_with_recorded_trips(
+                line,
+                line.direction_up,
+                [
+                    [("A", None, None, 600, 610), ("B", 1200, 1210, None, None)],
+                    [("A", None, None, 300, None), ("B", 1500, None, None, None)],
+                    [("A", None, None, day + 600, None), ("B", day + 1200, None, None, None)],
+                    [("A", None, None, 0, None), ("B", 60, None, None, None)],
+                ],
+                ["U1", "U2", "U1", ""],
+            ),
+            direction_down=_with_recorded_trips(
+                line, line.direction_down, [[("B", None, None, 1500, 1510), ("A", 2100, 2100, None, None)]], ["U1"]
+            ),
+        )
+        blocks = reconstruct_vehicle_blocks((line,))
+        self.assertEqual(blocks.circulation_ids, ("U1", "U1", "U2"))
+        self.assertEqual(blocks.trip_counts.tolist(), [2, 1, 1])
+        self.assertEqual(blocks.ends[0], np.datetime64(2100, "s"))
+        self.assertEqual(blocks.peak_vehicles(), {LineName("1"): 2})
+        self.assertEqual(reconstruct_vehicle_blocks((line,), timedelta(minutes=1)).trip_counts.tolist(), [1, 1, 1, 1])
+        (requirement,) = compare_vehicle_requirements(blocks, (line,), test_parameters())
+        self.assertEqual((requirement.observed_peak, requirement.modelled), (2, 2))
+        second_trip_only = line._replace(
+            direction_up=replace(line.direction_up, recorded_trips=line.direction_up.recorded_trips[1:2])
+        )
+        blocks_of_second_trip = reconstruct_vehicle_blocks((second_trip_only,))
+        self.assertEqual(blocks_of_second_trip.circulation_ids, ("U1", "U2"))
+        self.assertEqual(blocks_of_second_trip.trip_counts.tolist(), [1, 1])
+        self.assertEqual(blocks_of_second_trip.ends[1], np.datetime64(1500, "s"))
+
+
+class HeadwayTestCase(unittest.TestCase):
+    def test_headways_are_binned_and_bunching_flagged(self) -> None:
+        """
+        The headways between consecutive observed departures at a station must be binned by time of day, gaps
+            longer than the maximal headway are no headways, and much shorter headways than planned are bunching.
+        """
+        line = BusLine(
+            LineNr(0),
+            LineName("1"),
+            Direction(DirectionName("up"), (StationName("A"), StationName("B")), (timedelta(seconds=1),)),
+            Direction(DirectionName("down"), (StationName("B"), StationName("A")), (timedelta(seconds=1),)),
+            VehicleCapacity(100),
+            (LineFrequency(6),),
+        )
+        departures = ((0, 0), (600, 600), (1200, 660), (1800, 1800), (86400, 86400))
+        line = line._replace(
+            direction_up=_with_recorded_trips(
+                line,
+                line.direction_up,
+                [
+                    [("A", None, None, planned, observed), ("B", planned + 60, None, None, None)]
+                    for planned, observed in departures
+                ],
+                ["U1"] * len(departures),
+            )
+        )
+        regularity, bunching = analyse_headways((line,))
+        row = regularity.keys.index((LineName("1"), DirectionName("up"), StationName("A")))
+        self.assertEqual(regularity.counts.shape, (2, 24))
+        self.assertEqual(regularity.counts[row, 0], 3)
+        self.assertEqual(regularity.counts.sum(), 3)
+        self.assertAlmostEqual(regularity.means[row, 0], 600.0)
+        self.assertAlmostEqual(regularity.coefficients_of_variation[row, 0], np.sqrt(194400) / 600)
+        self.assertEqual(bunching.key_indices.tolist(), [row])
+        self.assertEqual(bunching.departures[0], np.datetime64(660, "s"))
+        self.assertEqual((bunching.observed_headways.tolist(), bunching.planned_headways.tolist()), ([60.0], [600.0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
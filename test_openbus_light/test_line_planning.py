@@ -1,9 +1,18 @@
+import asyncio
+import gzip
+import json
+import subprocess
+import sys
+import tempfile
+import threading
 import unittest
-from copy import copy
+import urllib.request
 from datetime import timedelta
 from itertools import product
 from math import ceil
+from pathlib import Path
 
+import pulp as pl
 from test_openbus_light.shared import cached_scenario, test_parameters
 
 from openbus_light.model import (
@@ -19,6 +28,7 @@ from openbus_light.model import (
     PointIn2D,
     Station,
     StationName,
+    StationTable,
     VehicleCapacity,
     WalkableDistance,
 )
@@ -26,10 +36,15 @@ from openbus_light.plan import (
     LinePlanningNetwork,
     LinePlanningParameters,
     LPPData,
+    LPPIndex,
     LPPResult,
     create_line_planning_problem,
+    create_summary,
+    read_cbc_solution,
+    write_line_planning_problem,
 )
 from openbus_light.plan.network import Activity
+from openbus_light.serve import PlanningService, create_server
 
 
 def _create_non_walking_scenario() -> PlanningScenario:
@@ -71,7 +86,7 @@ def _create_non_walking_scenario() -> PlanningScenario:
             StationName("D"): {StationName("A"): 100, StationName("B"): 50, StationName("C"): 100},
         }
     )
-    return PlanningScenario(demand, bus_lines, tuple(), stations)
+    return PlanningScenario(demand, bus_lines, tuple(), StationTable.from_stations(stations))
 
 
 def _create_only_walking_scenario() -> PlanningScenario:
@@ -103,7 +118,7 @@ def _create_only_walking_scenario() -> PlanningScenario:
         for first_station, second_station in product(stations, stations)
         if first_station != second_station
     )
-    return PlanningScenario(demand, bus_lines, walking_distances, stations)
+    return PlanningScenario(demand, bus_lines, walking_distances, StationTable.from_stations(stations))
 
 
 def _solve_this_lpp(parameters: LinePlanningParameters, scenario: PlanningScenario) -> LPPResult:
@@ -248,6 +263,172 @@ class LinePlanningTestCase(unittest.TestCase):
         )
 
 
+class StreamedLinePlanningTestCase(unittest.TestCase):
+    def test_streamed_problem_has_same_optimum(self) -> None:
+        """
+        Write the problem without pulp, solve it with CBC and compare the optimum with the one of the pulp model.
+        """
+        parameters = test_parameters()._replace(maximal_number_of_vehicles=20)
+        for scenario in (_create_non_walking_scenario(), _create_only_walking_scenario()):
+            planning_data = LPPData(
+                parameters, scenario, LinePlanningNetwork.create_from_scenario(scenario, parameters.period_duration)
+            )
+            lpp = create_line_planning_problem(planning_data)
+            lpp.solve()
+            with tempfile.TemporaryDirectory() as directory:
+                path_to_problem, path_to_solution = Path(directory) / "lpp.mps", Path(directory) / "lpp.sol"
+                write_line_planning_problem(planning_data, path_to_problem)
+                write_line_planning_problem(planning_data, path_to_problem.with_suffix(".mps.gz"))
+                with gzip.open(path_to_problem.with_suffix(".mps.gz"), "rt") as compressed:
+                    self.assertEqual(compressed.read(), path_to_problem.read_text())
+                subprocess.run(
+                    [pl.PULP_CBC_CMD().path, str(path_to_problem), "-branch", "-solution", str(path_to_solution)],
+                    check=True,
+                    capture_output=True,
+                )
+                index = LPPIndex.load(Path(directory) / "lpp.mps.index.json")
+                solution = read_cbc_solution(path_to_solution, index)
+
+            self.assertEqual(solution.status, "Optimal")
+            self.assertAlmostEqual(solution.objective, pl.value(lpp._model.objective), 4)
+            self.assertEqual(len(solution.line_configuration), len(lpp._variables.line_configuration))
+            self.assertEqual(index.link_count, planning_data.network.graph.ecount())
+
+
+class AsyncLinePlanningTestCase(unittest.TestCase):
+    @staticmethod
+    def _create_planning_data() -> LPPData:
+        scenario = _create_non_walking_scenario()
+        return LPPData(
+            test_parameters(), scenario, LinePlanningNetwork.create_from_scenario(scenario, timedelta(hours=1))
+        )
+
+    def test_async_solve_gives_same_result(self) -> None:
+        """
+        Solve the same problem blocking and twice non-blocking at the same time, the results must be the same.
+        """
+        blocking_lpp = create_line_planning_problem(self._create_planning_data())
+        blocking_lpp.solve()
+        non_blocking_lpps = [create_line_planning_problem(self._create_planning_data()) for _ in range(2)]
+
+        async def solve_concurrently() -> list[int]:
+            handles = await asyncio.gather(*(lpp.solve_async() for lpp in non_blocking_lpps))
+            return list(await asyncio.gather(*handles))
+
+        self.assertEqual(asyncio.run(solve_concurrently()), [pl.LpStatusOptimal] * 2)
+        blocking_result = blocking_lpp.get_result()
+        for non_blocking_result in (lpp.get_result() for lpp in non_blocking_lpps):
+            self.assertTrue(non_blocking_result.success)
+            self.assertEqual(blocking_result.solution.used_vehicles, non_blocking_result.solution.used_vehicles)
+            self.assertEqual(
+                blocking_result.solution.generalised_travel_time, non_blocking_result.solution.generalised_travel_time
+            )
+
+    def test_cancelled_solve_stops_the_solver(self) -> None:
+        """
+        Cancel a solve and wait with a timeout, the solver process must be gone afterwards.
+        """
+
+        async def cancel_and_time_out() -> tuple[bool, bool]:
+            cancelled = await create_line_planning_problem(self._create_planning_data()).solve_async()
+            cancelled.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await cancelled
+            timed_out = await create_line_planning_problem(self._create_planning_data()).solve_async()
+            with self.assertRaises(asyncio.TimeoutError):
+                await timed_out.wait(timeout=timedelta(seconds=0))
+            return cancelled.done(), timed_out.progress.running
+
+        is_done, is_running = asyncio.run(cancel_and_time_out())
+        self.assertTrue(is_done)
+        self.assertFalse(is_running)
+
+
+class PlanningServiceTestCase(unittest.TestCase):
+    def test_query_gives_same_summary_as_full_run(self) -> None:
+        """
+        Answer what-if queries with a warm service, the summaries must be the same as when planning from scratch.
+        """
+        scenario, parameters = _create_non_walking_scenario(), test_parameters()
+        service = PlanningService(scenario, parameters)
+        query = {"frequencies": {"2": [2]}, "capacities": {"1": 150}, "parameters": {"vehicle_cost_per_period": 10}}
+        updated_parameters = parameters._replace(vehicle_cost_per_period=10)
+        updated_scenario = scenario._replace(
+            bus_lines=(
+                scenario.bus_lines[0]._replace(capacity=VehicleCapacity(150)),
+                scenario.bus_lines[1]._replace(permitted_frequencies=(LineFrequency(2),)),
+            )
+        )
+        planning_data = LPPData(
+            updated_parameters,
+            updated_scenario,
+            LinePlanningNetwork.create_from_scenario(updated_scenario, parameters.period_duration),
+        )
+        lpp = create_line_planning_problem(planning_data)
+        lpp.solve()
+        expected = create_summary(planning_data, lpp.get_result())
+
+        self.assertEqual(service.plan(query), expected)
+        self.assertEqual(service.plan(query), expected)
+        self.assertNotEqual(service.plan({}), expected)
+        with self.assertRaises(ValueError):
+            service.plan({"parameters": {"demand_scaling": 1.0}})
+        with self.assertRaises(ValueError):
+            service.plan({"frequencies": {"3": [1]}})
+        for invalid_query in (
+            {"capacities": {"1": "90"}},
+            {"capacities": {"1": 0}},
+            {"frequencies": {"2": 2}},
+            {"frequencies": {"2": [2.5]}},
+            {"frequencies": {"2": [True]}},
+        ):
+            with self.assertRaises(ValueError):
+                service.parse_query(invalid_query)
+
+    def test_server_answers_with_summary(self) -> None:
+        """
+        Query the server over http, it must answer with the summary or with an error.
+        """
+        service = PlanningService(_create_non_walking_scenario(), test_parameters())
+        server = create_server(service, port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/plan"
+            request = urllib.request.Request(url, data=json.dumps({"frequencies": {"2": [2]}}).encode(), method="POST")
+            with urllib.request.urlopen(request) as response:
+                summary = json.load(response)
+            self.assertEqual(summary, json.loads(json.dumps(service.plan({"frequencies": {"2": [2]}}))))
+            request = urllib.request.Request(url, data=b'{"unknown": 1}', method="POST")
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                urllib.request.urlopen(request)  # pylint: disable=consider-using-with
+            self.assertEqual(context.exception.code, 400)
+            context.exception.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+
+class LazyImportTestCase(unittest.TestCase):
+    def test_package_import_does_not_load_heavy_dependencies(self) -> None:
+        """
+        Import the packages in a fresh interpreter, the solver, graph and plotting libraries must not be loaded
+            until one of their exports is used.
+        """
+        heavy_modules = ("pulp", "igraph", "matplotlib", "plotly", "numba")
+        script = (
+            "import sys, openbus_light.manipulate, openbus_light.plan, openbus_light.plot, openbus_light.serve;"
+            f"print(sorted(name for name in {heavy_modules!r} if name in sys.modules));"
+            "openbus_light.plan.LPP;"
+            "print('pulp' in sys.modules)"
+        )
+        output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+        self.assertEqual(output.split("\n")[:2], ["[]", "True"])
+        with self.assertRaises(AttributeError):
+            getattr(__import__("openbus_light.plan").plan, "NotExported")
+
+
 class LinePlanningIntegrationTestCase(unittest.TestCase):
     _baseline_scenario: PlanningScenario
 
@@ -255,9 +436,12 @@ class LinePlanningIntegrationTestCase(unittest.TestCase):
         """
         Remove the demand matrix for origins starting from the 11th position onward.
         """
-        self._baseline_scenario = copy(cached_scenario())
-        for origin in sorted(self._baseline_scenario.demand_matrix.all_origins())[10:]:
-            self._baseline_scenario.demand_matrix.matrix.pop(origin)
+        scenario = cached_scenario()
+        self._baseline_scenario = scenario._replace(
+            demand_matrix=scenario.demand_matrix.restricted_to_origins(
+                sorted(scenario.demand_matrix.all_origins())[:10]
+            )
+        )
 
     def test_frequency_dependence(self) -> None:
         """
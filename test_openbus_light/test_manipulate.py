@@ -0,0 +1,520 @@
+import json
+import shutil
+import tempfile
+import unittest
+import zipfile
+from datetime import timedelta
+from itertools import combinations, product
+from pathlib import Path
+from typing import Optional, Sequence
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from exercise_3 import get_paths
+from test_openbus_light.shared import test_parameters
+
+from openbus_light.manipulate import MeasurementStore
+from openbus_light.manipulate.columnar_cache import load_columns_cached
+from openbus_light.manipulate.demand import (
+    _disaggregate_demand_to_stations,
+    _map_district_to_nearest_station,
+    load_demand_matrix,
+)
+from openbus_light.manipulate.line import LineFactory, load_lines_from_json
+from openbus_light.manipulate.point import (
+    calculate_distance_in_m,
+    calculate_distance_matrix_in_m,
+    calculate_distance_matrix_in_parallel,
+    calculate_distances_from_point_in_m,
+)
+from openbus_light.manipulate.recorded_trip import (
+    _find_indices_of_start_and_end_pairs,
+    _parse_measurements,
+    enrich_lines_with_recorded_trips,
+)
+from openbus_light.manipulate.spatial_index import find_nearest_station_within_radius
+from openbus_light.manipulate.walkable_distance import find_all_walkable_distances
+from openbus_light.model import (
+    BusLine,
+    Direction,
+    DirectionName,
+    DistrictName,
+    DistrictPoint,
+    DistrictPointId,
+    LineFrequency,
+    LineName,
+    LineNr,
+    Meter,
+    MeterPerSecond,
+    PointIn2D,
+    Station,
+    StationName,
+    StationTable,
+    VehicleCapacity,
+)
+
+
+def _create_random_stations(generator: np.random.Generator, count: int) -> tuple[Station, ...]:
+    """
+    Generate stations with one to three stop points around Winterthur.
+    :param generator: np.random.Generator
+    :param count: int, number of stations
+    :return: tuple[Station, ...]
+    """
+    return tuple(
+        Station(
+            StationName(f"S{i}"),
+            tuple(
+                PointIn2D(lat=47.5 + generator.normal(0, 0.02), long=8.72 + generator.normal(0, 0.03))
+                for _ in range(generator.integers(1, 4))
+            ),
+            (LineNr(1),),
+            [],
+            [],
+        )
+        for i in range(count)
+    )
+
+
+def _create_random_district_points(generator: np.random.Generator, count: int) -> tuple[DistrictPoint, ...]:
+    """
+    Generate district points around Winterthur.
+    :param generator: np.random.Generator
+    :param count: int, number of district points
+    :return: tuple[DistrictPoint, ...]
+    """
+    return tuple(
+        DistrictPoint(
+            PointIn2D(lat=47.5 + generator.normal(0, 0.03), long=8.72 + generator.normal(0, 0.04)),
+            "D",
+            DistrictPointId(str(i)),
+        )
+        for i in range(count)
+    )
+
+
+def _associate_by_comparing_all(
+    positions: Sequence[PointIn2D], stations: Sequence[Station], radius: Meter
+) -> list[Optional[int]]:
+    """
+    Associate each position with the nearest station by comparing it with every point of every station.
+    :param positions: Sequence[PointIn2D]
+    :param stations: Sequence[Station]
+    :param radius: Meter, only stations closer than this are associated
+    :return: list[Optional[int]], the index of the associated station per position
+    """
+    associated: list[Optional[int]] = []
+    for position in positions:
+        distances = tuple(
+            min(calculate_distance_in_m(position, point) for point in station.points) for station in stations
+        )
+        nearest_station_index = int(np.argmin(distances))
+        associated.append(nearest_station_index if distances[nearest_station_index] < radius else None)
+    return associated
+
+
+class DistrictAssociationTestCase(unittest.TestCase):
+    def test_spatial_index_gives_same_association(self) -> None:
+        """
+        Associate random district points with and without the spatial index, the associations must be identical.
+        """
+        generator = np.random.default_rng(42)
+        stations = _create_random_stations(generator, 200)
+        # a copy of the first station at the same place, the tie must be resolved to the first one
+        stations += (Station(StationName("Copy"), stations[0].points, (LineNr(1),), [], []),)
+        district_points = _create_random_district_points(generator, 2000) + (
+            DistrictPoint(stations[0].points[0], "D", DistrictPointId("on_first_station")),
+        )
+        positions = tuple(district_point.position for district_point in district_points)
+        for radius in (Meter(0), Meter(150), Meter(450), Meter(5000)):
+            associated = find_nearest_station_within_radius(positions, StationTable.from_stations(stations), radius)
+            self.assertEqual(
+                [None if i < 0 else i for i in associated], _associate_by_comparing_all(positions, stations, radius)
+            )
+            indexed = _map_district_to_nearest_station(district_points, StationTable.from_stations(stations), radius)
+            self.assertEqual(
+                [[point.id for point in station.district_points] for station in indexed.to_stations()],
+                [
+                    [district_points[j].id for j, i in enumerate(associated) if i == station_index]
+                    for station_index in range(len(stations))
+                ],
+            )
+        self.assertIn("on_first_station", [point.id for point in indexed.station(0).district_points])
+
+    def test_unbounded_coordinates_give_same_association(self) -> None:
+        """
+        Use coordinates whose cosine (of the latitude in degrees) changes sign and a station with a missing
+            point, such that no grid can be used, the associations must still be identical.
+        """
+        stations = (
+            Station(StationName("A"), (PointIn2D(1.0, 8.7),), (LineNr(1),), [], []),
+            Station(StationName("B"), (PointIn2D(2.0, 8.7), PointIn2D(float("nan"), 8.7)), (LineNr(1),), [], []),
+            Station(StationName("C"), (PointIn2D(float("nan"), 8.7), PointIn2D(3.0, 8.7)), (LineNr(1),), [], []),
+        )
+        positions = tuple(PointIn2D(lat, 8.7) for lat in np.linspace(0.5, 3.5, 31))
+        for radius in (Meter(1000), Meter(100_000)):
+            self.assertEqual(
+                [
+                    None if i < 0 else i
+                    for i in find_nearest_station_within_radius(positions, StationTable.from_stations(stations), radius)
+                ],
+                _associate_by_comparing_all(positions, stations, radius),
+            )
+
+    def test_distance_kernels_are_identical(self) -> None:
+        """
+        Calculate distances with the array kernels, they must be identical to the scalar distances.
+        """
+        generator = np.random.default_rng(3)
+        lat_1, long_1 = generator.normal(47.5, 0.1, 40), generator.normal(8.7, 0.1, 40)
+        lat_2, long_2 = generator.normal(47.5, 0.1, 60), generator.normal(8.7, 0.1, 60)
+        expected = np.array(
+            [
+                [calculate_distance_in_m(PointIn2D(a, b), PointIn2D(c, d)) for c, d in zip(lat_2, long_2)]
+                for a, b in zip(lat_1, long_1)
+            ]
+        )
+        np.testing.assert_array_equal(calculate_distance_matrix_in_m(lat_1, long_1, lat_2, long_2), expected)
+        np.testing.assert_array_equal(calculate_distance_matrix_in_parallel(lat_1, long_1, lat_2, long_2), expected)
+        np.testing.assert_array_equal(
+            calculate_distances_from_point_in_m(lat_1[0], long_1[0], lat_2, long_2), expected[0]
+        )
+
+
+class DemandDisaggregationTestCase(unittest.TestCase):
+    def test_matrix_product_gives_same_demand(self) -> None:
+        """
+        Disaggregate the demand between districts to stations, the result must match summing over all pairs
+            of district points.
+        """
+        generator = np.random.default_rng(5)
+        stations = _create_random_stations(generator, 60)
+        district_names = tuple(DistrictName(f"D{i}") for i in range(12))
+        district_points = tuple(
+            DistrictPoint(point.position, district_names[generator.integers(len(district_names))], point.id)
+            for point in _create_random_district_points(generator, 400)
+        )
+        demanded_relations = {
+            (origin, destination): float(generator.exponential(100))
+            for origin, destination in product(district_names, district_names)
+        }
+        table = _map_district_to_nearest_station(district_points, StationTable.from_stations(stations), Meter(300))
+        stations = table.to_stations()
+        covered_points = [point for station in stations for point in station.district_points]
+        points_per_district = {
+            name: sum(point.district_name == name for point in covered_points) for name in district_names
+        }
+        expected = {
+            origin.name: {
+                destination.name: sum(
+                    demanded_relations[first.district_name, second.district_name]
+                    / points_per_district[first.district_name]
+                    / points_per_district[second.district_name]
+                    * 1.5
+                    for first, second in product(origin.district_points, destination.district_points)
+                )
+                for destination in stations
+            }
+            for origin in stations
+        }
+        demand_matrix = _disaggregate_demand_to_stations(table, demanded_relations, 1.5)
+        self.assertEqual(demand_matrix.all_origins(), tuple(sorted(station.name for station in stations)))
+        for origin, flows_to in expected.items():
+            for destination, demand in flows_to.items():
+                self.assertAlmostEqual(demand_matrix.between(origin, destination), demand, delta=1e-9 * demand)
+        self.assertAlmostEqual(demand_matrix.total(), sum(map(sum, (row.values() for row in expected.values()))))
+        self.assertTrue((demand_matrix.values != 0).all())
+        with self.assertRaises(ValueError):
+            load_demand_matrix(
+                table.with_district_points((), np.empty(0, dtype=np.int64)), test_parameters(), get_paths()
+            )
+
+
+class ColumnarCacheTestCase(unittest.TestCase):
+    def test_parsed_columns_are_reused_until_the_source_changes(self) -> None:
+        """
+        Load the columns of a file twice, the second load must map the stored columns instead of parsing again,
+            a changed file must be parsed again.
+        """
+        parsed_sources = []
+
+        def parse(source: Path) -> dict[str, np.ndarray]:
+            parsed_sources.append(source)
+            names, values = zip(*(line.split(",") for line in source.read_text(encoding="utf-8").splitlines()))
+            return {"name": np.array(names, dtype=str), "value": np.array(values, dtype=np.float64)}
+
+        with tempfile.TemporaryDirectory() as directory:
+            source, cache_directory = Path(directory) / "source.csv", Path(directory) / "cache"
+            source.write_text("A,1.5\nB,2\n", encoding="utf-8")
+            first = load_columns_cached(source, parse, "test", cache_directory)
+            second = load_columns_cached(source, parse, "test", cache_directory)
+            self.assertEqual(len(parsed_sources), 1)
+            self.assertIsInstance(second["value"], np.memmap)
+            self.assertEqual(
+                {name: column.tolist() for name, column in first.items()}, {"name": ["A", "B"], "value": [1.5, 2.0]}
+            )
+            self.assertEqual(
+                {name: column.tolist() for name, column in second.items()}, {"name": ["A", "B"], "value": [1.5, 2.0]}
+            )
+            source.write_text("C,3\n", encoding="utf-8")
+            self.assertEqual(load_columns_cached(source, parse, "test", cache_directory)["name"].tolist(), ["C"])
+            self.assertEqual(len(parsed_sources), 2)
+            del first, second
+
+
+class LineCatalogueTestCase(unittest.TestCase):
+    def test_lines_are_numbered_by_file_name_and_compiled_once(self) -> None:
+        """
+        The lines must be numbered in the order of the file names, a second load must map the compiled catalogue
+            instead of reading the files, and a changed file, a copy of the files elsewhere or another format of
+            the catalogue must be compiled again.
+        """
+        factory = LineFactory(VehicleCapacity(60), (LineFrequency(6),))
+        with tempfile.TemporaryDirectory() as directory:
+            path_to_lines, cache_directory = Path(directory) / "lines", Path(directory) / "cache"
+            path_to_lines.mkdir()
+            for file_name, number, stations in (("b.json", 2, ["X", "Y", "Z"]), ("a.json", 1, ["Y", "X"])):
+                (path_to_lines / file_name).write_text(
+                    json.dumps(
+                        {
+                            "nummer": number,
+                            "linie_a": stations,
+                            "linie_b": stations[::-1],
+                            "fahrzeiten_a": [60.5] * (len(stations) - 1),
+                            "fahrzeiten_b": list(range(1, len(stations))),
+                            "stops_a": len(stations),
+                            "stops_b": len(stations),
+                        }
+                    ),
+                    encoding="utf-8",
+                )
+            compiled = load_lines_from_json(factory, path_to_lines, max_workers=2, cache_directory=cache_directory)
+            with patch("openbus_light.manipulate.line._read_json") as read_json:
+                mapped = load_lines_from_json(factory, path_to_lines, cache_directory=cache_directory)
+                read_json.assert_not_called()
+            self.assertEqual(mapped, compiled)
+            self.assertEqual([(line.number, line.name) for line in mapped], [(0, "1"), (1, "2")])
+            self.assertEqual(mapped[1].direction_down.station_sequence, ("Z", "Y", "X"))
+            self.assertEqual(mapped[1].direction_up.trip_times, (timedelta(seconds=60.5),) * 2)
+            self.assertEqual(mapped[1].direction_down.trip_times, (timedelta(seconds=1), timedelta(seconds=2)))
+            copied_lines = Path(shutil.copytree(path_to_lines, Path(directory) / "copied"))
+            self.assertEqual(load_lines_from_json(factory, copied_lines, cache_directory=cache_directory), compiled)
+            with patch("openbus_light.manipulate.line._CATALOGUE_FORMAT_VERSION", -1):
+                load_lines_from_json(factory, path_to_lines, cache_directory=cache_directory)
+            self.assertEqual(len(tuple(cache_directory.glob("line_catalogue-*"))), 3)
+            (path_to_lines / "a.json").unlink()
+            self.assertEqual(
+                [line.name for line in load_lines_from_json(factory, path_to_lines, cache_directory=cache_directory)],
+                ["2"],
+            )
+
+
+class MeasurementIngestionTestCase(unittest.TestCase):
+    def test_chunked_parsing_keeps_the_requested_lines(self) -> None:
+        """
+        Parse zipped measurements in small chunks, only the requested lines must be kept, with parsed times.
+        """
+        header = "LINIEN_TEXT;UMLAUF_ID;HALTESTELLEN_NAME;ANKUNFTSZEIT;ABFAHRTSZEIT;AN_PROGNOSE;AB_PROGNOSE;UNUSED"
+        rows = [
+            f"{line};U{line};S{i};01.02.2022 06:{i:02d};;01.02.2022 06:{i:02d}:30;;x"
+            for i, line in enumerate((1, 2, 3, 2, 1, 2, 3))
+        ] + ["2;;S7;unknown;;;;x"]
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "measurements.zip"
+            with zipfile.ZipFile(path, "w") as zip_file:
+                zip_file.writestr("measurements.csv", "\n".join(["SEP=;", header, *rows]))
+            with patch("openbus_light.manipulate.recorded_trip._MEASUREMENTS_PER_CHUNK", 3):
+                columns = _parse_measurements(path, {LineName("2"), LineName("3")})
+        self.assertEqual(columns["LINIEN_TEXT"].tolist(), ["2", "3", "2", "2", "3", "2"])
+        self.assertEqual(columns["HALTESTELLEN_NAME"].tolist(), ["S1", "S2", "S3", "S5", "S6", "S7"])
+        self.assertEqual(columns["UMLAUF_ID"].tolist(), ["U2", "U3", "U2", "U2", "U3", ""])
+        self.assertEqual(
+            columns["AN_PROGNOSE"][:-1].tolist(),
+            [pd.Timestamp(f"2022-02-01 06:{i:02d}:30").value for i in (1, 2, 3, 5, 6)],
+        )
+        self.assertEqual(columns["ANKUNFTSZEIT"][-1], np.datetime64("NaT").astype("datetime64[ns]").view(np.int64))
+        self.assertNotIn("UNUSED", columns)
+
+    def test_runs_are_paired_from_missing_arrivals_and_departures(self) -> None:
+        """
+        A run starts at a missing planned arrival and ends at the next missing planned departure, a start
+            without end is dropped, as is an end without start, and a run can start and end in the same row.
+        """
+        nat = np.datetime64("NaT", "ns").view(np.int64)
+        arrival_is_missing = [False, True, False, True, True, False, False, True, False]
+        departure_is_missing = [True, False, False, False, False, True, True, True, False]
+        begins, ends = _find_indices_of_start_and_end_pairs(
+            np.where(arrival_is_missing, nat, 1), np.where(departure_is_missing, nat, 1)
+        )
+        self.assertEqual(begins.tolist(), [4, 7])
+        self.assertEqual(ends.tolist(), [5, 7])
+
+    def test_recorded_trips_share_one_table_per_direction(self) -> None:
+        """
+        Enrich a line with recorded trips in both directions, each direction must hold its trips in one table,
+            which can be queried by station and by time window. Processing the lines in a pool of processes
+            gives the same trips, in the order of the line names.
+        """
+        rows = [
+            "U1;A;;01.02.2022 06:00;;01.02.2022 06:00:30",
+            "U1;B;01.02.2022 06:05;01.02.2022 06:05;01.02.2022 06:05:20;01.02.2022 06:05:40",
+            "U1;C;01.02.2022 06:09;;01.02.2022 06:09:30;",
+            "U2;C;;01.02.2022 07:00;;01.02.2022 07:00:30",
+            "U2;B;01.02.2022 07:05;;01.02.2022 07:05:20;",
+            "U1;A;;01.02.2022 09:00;;01.02.2022 09:00:30",
+            "U1;B;01.02.2022 09:05;;01.02.2022 09:05:20;",
+        ]
+        line = BusLine(
+            LineNr(0),
+            LineName("2"),
+            Direction(DirectionName("a"), (StationName("A"), StationName("B"), StationName("C")), (timedelta(1),) * 2),
+            Direction(DirectionName("b"), (StationName("C"), StationName("B"), StationName("A")), (timedelta(1),) * 2),
+            VehicleCapacity(100),
+            (LineFrequency(1),),
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "measurements.csv"
+            header = "LINIEN_TEXT;UMLAUF_ID;HALTESTELLEN_NAME;ANKUNFTSZEIT;ABFAHRTSZEIT;AN_PROGNOSE;AB_PROGNOSE"
+            measurements = [f"{name};{row}" for row in rows for name in ("3", "2")]
+            path.write_text("\n".join(["SEP=;", header, *measurements]), encoding="utf-8")
+            other_line = line._replace(name=LineName("3"))
+            enriched, _ = enrich_lines_with_recorded_trips(path, (other_line, line))
+            in_parallel = enrich_lines_with_recorded_trips(path, (other_line, line), max_workers=2)
+        self.assertEqual([enriched_line.name for enriched_line in in_parallel], ["2", "3"])
+        for direction in ("direction_up", "direction_down"):
+            for enriched_line in in_parallel:
+                self.assertEqual(
+                    [trip.record.to_dict("list") for trip in getattr(enriched_line, direction).recorded_trips],
+                    [trip.record.to_dict("list") for trip in getattr(enriched, direction).recorded_trips],
+                )
+        up, down = enriched.direction_up, enriched.direction_down
+        self.assertEqual([trip.station_names for trip in up.recorded_trips], [("A", "B", "C"), ("A", "B")])
+        self.assertEqual([trip.station_names for trip in down.recorded_trips], [("C", "B")])
+        self.assertEqual(up.recorded_trip_table.trip_count, 2)
+        self.assertEqual(down.recorded_trip_table.trip_count, 1)
+        self.assertEqual(up.recorded_trip_table.trips_stopping_at(StationName("C")).tolist(), [0])
+        self.assertEqual(up.recorded_trip_table.trips_stopping_at(StationName("A")).tolist(), [0, 1])
+        with self.assertRaises(KeyError):
+            up.recorded_trip_table.trips_stopping_at(StationName("D"))
+        self.assertEqual(
+            up.recorded_trip_table.trips_departing_within(
+                np.datetime64("2022-02-01T08:00"), np.datetime64("2022-02-01T09:00")
+            ).tolist(),
+            [1],
+        )
+        record = up.recorded_trips[0].record
+        self.assertEqual(record.station_name.tolist(), ["A", "B", "C"])
+        self.assertEqual(record.arrival_observed[1], pd.Timestamp("2022-02-01 06:05:20"))
+        self.assertTrue(pd.isnull(record.departure_planned[2]))
+
+    def test_trips_without_placeable_start_or_end_are_aligned(self) -> None:
+        """
+        A trip from and to a depot, which is not a station of the line, cannot be placed by its start and end,
+            it must be assigned by the alignment of its stops. A trip without enough stops of the line is reported.
+        """
+        rows = [
+            "U1;Depot;;01.02.2022 06:00;;01.02.2022 06:00:30",
+            "U1;A;01.02.2022 06:02;01.02.2022 06:02;01.02.2022 06:02:20;01.02.2022 06:02:40",
+            "U1;B;01.02.2022 06:05;01.02.2022 06:05;01.02.2022 06:05:20;01.02.2022 06:05:40",
+            "U1;C;01.02.2022 06:09;01.02.2022 06:09;01.02.2022 06:09:30;01.02.2022 06:09:40",
+            "U1;Garage;01.02.2022 06:12;;01.02.2022 06:12:30;",
+            "U2;Depot;;01.02.2022 07:00;;01.02.2022 07:00:30",
+            "U2;B;01.02.2022 07:02;01.02.2022 07:02;01.02.2022 07:02:20;01.02.2022 07:02:40",
+            "U2;Garage;01.02.2022 07:05;;01.02.2022 07:05:20;",
+        ]
+        line = BusLine(
+            LineNr(0),
+            LineName("2"),
+            Direction(DirectionName("a"), (StationName("A"), StationName("B"), StationName("C")), (timedelta(1),) * 2),
+            Direction(DirectionName("b"), (StationName("C"), StationName("B"), StationName("A")), (timedelta(1),) * 2),
+            VehicleCapacity(100),
+            (LineFrequency(1),),
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "measurements.csv"
+            header = "LINIEN_TEXT;UMLAUF_ID;HALTESTELLEN_NAME;ANKUNFTSZEIT;ABFAHRTSZEIT;AN_PROGNOSE;AB_PROGNOSE"
+            path.write_text("\n".join(["SEP=;", header, *(f"2;{row}" for row in rows)]), encoding="utf-8")
+            with self.assertWarns(RuntimeWarning):
+                (enriched,) = enrich_lines_with_recorded_trips(path, (line,))
+        self.assertEqual(
+            [trip.station_names for trip in enriched.direction_up.recorded_trips], [("Depot", "A", "B", "C", "Garage")]
+        )
+        self.assertEqual([trip.direction for trip in enriched.direction_up.recorded_trips], ["a"])
+        self.assertEqual(enriched.direction_down.recorded_trips, ())
+
+    def test_store_ingests_each_file_once_and_queries_by_date(self) -> None:
+        """
+        Append the measurements of two days to a store, appending a file again must not ingest it twice,
+            a query must only return the trips departing within its window, before and after compaction.
+        """
+        header = "LINIEN_TEXT;UMLAUF_ID;HALTESTELLEN_NAME;ANKUNFTSZEIT;ABFAHRTSZEIT;AN_PROGNOSE;AB_PROGNOSE"
+        line = BusLine(
+            LineNr(0),
+            LineName("2"),
+            Direction(DirectionName("a"), (StationName("A"), StationName("B")), (timedelta(1),)),
+            Direction(DirectionName("b"), (StationName("B"), StationName("A")), (timedelta(1),)),
+            VehicleCapacity(100),
+            (LineFrequency(1),),
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            sources = []
+            for day in (1, 2):
+                sources.append(Path(directory) / f"measurements_{day}.csv")
+                rows = [
+                    f"2;U{day};A;;0{day}.02.2022 06:00;;0{day}.02.2022 06:00:30",
+                    f"2;U{day};B;0{day}.02.2022 06:05;;0{day}.02.2022 06:05:20;",
+                    f"2;U{day};B;;0{day}.02.2022 07:00;;0{day}.02.2022 07:00:10",
+                    f"2;U{day};A;0{day}.02.2022 07:05;;0{day}.02.2022 07:06:00;",
+                ]
+                sources[-1].write_text("\n".join(["SEP=;", header, *rows]), encoding="utf-8")
+            store = MeasurementStore(Path(directory) / "store", (line,))
+            self.assertEqual([store.append(source) for source in (*sources, sources[0])], [True, True, False])
+            second_day = (np.datetime64("2022-02-02T00:00"), np.datetime64("2022-02-02T23:59"))
+            for _ in range(2):
+                (queried,) = MeasurementStore(Path(directory) / "store", (line,)).query(*second_day)
+                self.assertEqual([trip.circulation_id for trip in queried.direction_up.recorded_trips], ["U2"])
+                self.assertEqual(queried.direction_down.recorded_trips[0].station_names, ("B", "A"))
+                self.assertEqual(
+                    queried.direction_down.recorded_trips[0].times("arrival_observed")[-1],
+                    np.datetime64("2022-02-02T07:06:00"),
+                )
+                (everything,) = store.query()
+                self.assertEqual([trip.trip_nr for trip in everything.direction_up.recorded_trips], [0, 1])
+                store.compact()
+                self.assertEqual(len(store.partitions), 1)
+            with self.assertRaises(ValueError):
+                MeasurementStore(Path(directory) / "store", (line._replace(name=LineName("3")),))
+
+
+class WalkableDistanceTestCase(unittest.TestCase):
+    def test_neighbour_search_gives_same_walkable_distances(self) -> None:
+        """
+        Find the walkable distances with the grid and by comparing all pairs, the results must be identical.
+        """
+        stations = _create_random_stations(np.random.default_rng(7), 500)
+        # stations whose cosine (of the latitude in degrees) changes sign, such that all pairs are compared
+        unbounded_stations = tuple(
+            Station(StationName(f"U{i}"), (PointIn2D(lat, 8.7),), (LineNr(1),), [], [])
+            for i, lat in enumerate(np.linspace(1.0, 2.0, 1100))
+        )
+        for stations, maximal_walking_distance in product(
+            (stations, unbounded_stations), (Meter(0), Meter(300), Meter(1000))
+        ):
+            parameters = test_parameters()._replace(
+                maximal_walking_distance=maximal_walking_distance, walking_speed_between_stations=MeterPerSecond(0.6)
+            )
+            expected = [
+                (first.name, second.name, timedelta(seconds=distance / 0.6))
+                for first, second in combinations(stations, r=2)
+                if (distance := calculate_distance_in_m(first.center_position, second.center_position))
+                < maximal_walking_distance
+            ]
+            found = find_all_walkable_distances(StationTable.from_stations(stations), parameters)
+            self.assertEqual(
+                [(walk.starting_at.name, walk.ending_at.name, walk.walking_time) for walk in found], expected
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,25 @@
+import pickle
+import tempfile
 import unittest
-from copy import copy
 from datetime import timedelta
+from pathlib import Path
 
+import numpy as np
 from test_openbus_light.shared import cached_scenario
 
-from openbus_light.model import PlanningScenario, PointIn2D, Station, StationName, WalkableDistance
+from openbus_light.manipulate import DemandMatrixWriter, open_demand_matrix, save_demand_matrix
+from openbus_light.model import (
+    DemandMatrix,
+    DistrictName,
+    DistrictPoint,
+    DistrictPointId,
+    PlanningScenario,
+    PointIn2D,
+    Station,
+    StationName,
+    StationTable,
+    WalkableDistance,
+)
 
 
 class MyTestCase(unittest.TestCase):
@@ -36,10 +51,16 @@ class MyTestCase(unittest.TestCase):
         """
         Test that demand for a non-served stop raises Error.
         """
-        invalid_scenario = copy(self._baseline_scenario)
-        invalid_scenario.demand_matrix.matrix[invalid_scenario.demand_matrix.all_origins()[0]][
-            StationName("DUMMY$$")
-        ] = 123
+        demand_matrix = self._baseline_scenario.demand_matrix
+        first_origin = demand_matrix.all_origins()[0]
+        invalid_scenario = self._baseline_scenario._replace(
+            demand_matrix=DemandMatrix(
+                {
+                    origin: {**flows_to, **({StationName("DUMMY$$"): 123} if origin == first_origin else {})}
+                    for origin, flows_to in demand_matrix.matrix.items()
+                }
+            )
+        )
 
         with self.assertRaises(ValueError):
             invalid_scenario.check_consistency()
@@ -57,5 +78,93 @@ class MyTestCase(unittest.TestCase):
             scenario_with_only_one_line.check_consistency()
 
 
+class DemandMatrixTestCase(unittest.TestCase):
+    def test_sparse_rows_match_the_mapping(self) -> None:
+        """
+        Create the demand matrix from a mapping and from a dense array, the lookups and sums must match the mapping.
+        """
+        names = tuple(StationName(name) for name in "ABCD")
+        dense = np.array([[0, 3.5, 0, 1], [2, 0, 0, 0], [0, 0, 0, 0], [0.25, 4, 0, 0]])
+        mapping = {
+            origin: {destination: float(dense[i, j]) for j, destination in enumerate(names) if dense[i, j]}
+            for i, origin in enumerate(names)
+        }
+        for demand_matrix in (DemandMatrix(mapping), DemandMatrix.from_dense(names, dense)):
+            self.assertEqual({origin: dict(flows_to) for origin, flows_to in demand_matrix.matrix.items()}, mapping)
+            self.assertEqual([demand_matrix.starting_from(name) for name in names], dense.sum(axis=1).tolist())
+            self.assertEqual([demand_matrix.arriving_at(name) for name in names], dense.sum(axis=0).tolist())
+            self.assertEqual(
+                [demand_matrix.between(origin, destination) for origin in names for destination in names],
+                dense.ravel().tolist(),
+            )
+            self.assertEqual(demand_matrix.total(), dense.sum())
+            self.assertEqual(len(demand_matrix.all_od_pairs()), 5)
+            self.assertEqual(demand_matrix.matrix[StationName("C")][StationName("A")], 0.0)
+            with self.assertRaises(KeyError):
+                _ = demand_matrix.matrix[StationName("C")][StationName("E")]
+        restricted = DemandMatrix(mapping).restricted_to_origins((StationName("D"), StationName("A")))
+        self.assertEqual(restricted.all_origins(), ("D", "A"))
+        self.assertEqual(restricted, DemandMatrix({name: mapping[name] for name in ("D", "A")}))
+        self.assertEqual(pickle.loads(pickle.dumps(restricted)), restricted)
+
+    def test_memory_mapped_matrix_gives_same_demand(self) -> None:
+        """
+        Save a demand matrix, write one row by row and open both memory-mapped, the demand must be identical.
+        """
+        generator = np.random.default_rng(11)
+        names = tuple(StationName(f"S{i}") for i in range(300))
+        dense = generator.exponential(10, (300, 300)) * (generator.random((300, 300)) < 0.1)
+        demand_matrix = DemandMatrix.from_dense(names, dense)
+        with tempfile.TemporaryDirectory() as directory:
+            save_demand_matrix(demand_matrix, Path(directory) / "saved")
+            with DemandMatrixWriter(Path(directory) / "written", names) as writer:
+                for origin, row in zip(names, dense):
+                    destination_indices = np.flatnonzero(row)[::-1]
+                    writer.add_row(origin, destination_indices, row[destination_indices])
+            for name in ("saved", "written"):
+                opened = open_demand_matrix(Path(directory) / name)
+                self.assertIsInstance(opened.values, np.memmap)
+                self.assertEqual(opened, demand_matrix)
+                for array in ("row_offsets", "destination_indices", "values", "row_sums", "column_sums"):
+                    np.testing.assert_array_equal(getattr(opened, array), getattr(demand_matrix, array))
+                blocks = tuple(opened.iterate_origin_blocks(7))
+                self.assertEqual(sum((block.all_od_pairs() for block in blocks), ()), demand_matrix.all_od_pairs())
+                np.testing.assert_allclose(sum(block.column_sums for block in blocks), demand_matrix.column_sums)
+                del opened, blocks
+
+
+class StationTableTestCase(unittest.TestCase):
+    def test_table_keeps_points_and_district_points_of_stations(self) -> None:
+        """
+        The views of a table must have the points and district points of the stations, the centers must ignore
+            missing coordinates like ``Station.center_position``, and restricting must keep the order.
+        """
+        district_point = DistrictPoint(PointIn2D(1.0, 1.0), DistrictName("D"), DistrictPointId("P"))
+        stations = (
+            Station(
+                StationName("B"), (PointIn2D(1.0, 2.0), PointIn2D(float("nan"), 4.0)), tuple(), [district_point], []
+            ),
+            Station(StationName("A"), (PointIn2D(3.0, 5.0),), tuple(), [], []),
+            Station(StationName("C"), (PointIn2D(2.0, 1.0), PointIn2D(4.0, 3.0)), tuple(), [district_point] * 2, []),
+        )
+        table = StationTable.from_stations(stations)
+        self.assertEqual(
+            [(station.center_position.lat, station.center_position.long) for station in stations],
+            list(zip(table.center_lat.tolist(), table.center_long.tolist())),
+        )
+        self.assertEqual(table.index_of(StationName("A")), 1)
+        restricted = table.restricted_to({StationName("C"), StationName("B")})
+        self.assertEqual(restricted.names, ("B", "C"))
+        self.assertEqual([tuple(point) for point in restricted.station(1).points], [(2.0, 1.0), (4.0, 3.0)])
+        self.assertEqual(restricted.station(1).district_points, [district_point] * 2)
+        reassociated = restricted.with_district_points([district_point] * 3, np.array([1, -1, 1]))
+        self.assertEqual(np.diff(reassociated.district_point_offsets).tolist(), [0, 2])
+        names = (StationName("A"), StationName("B"))
+        with self.assertRaises(ValueError):
+            StationTable.from_points(names, np.array([0, 1, 1]), np.array([1.0]), np.array([2.0]))
+        with self.assertRaises(ValueError):
+            StationTable.from_points(names, np.array([0, 1, 2]), np.array([1.0, np.nan]), np.array([2.0, 3.0]))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -123,6 +123,7 @@ goto :eof
     for /f "delims=" %%i in ('dir .\\dist\\*.whl /s /b') do set "wheel_file=%%i"
     call %venv_activation% & pip uninstall -y openbus-light
     call %venv_activation% & pip install %wheel_file%
+    call %venv_activation% & py -m openbus_light.warmup
     call :run_tests
     goto :eof
 
@@ -157,6 +158,7 @@ goto :eof
     for /f "delims=" %%i in ('dir .\\dist\\*.whl /s /b') do set "wheel_file=%%i"
     call venv\Scripts\activate & pip uninstall -y openbus-light
     call venv\Scripts\activate & pip install %wheel_file%
+    call venv\Scripts\activate & py -m openbus_light.warmup
 
 
 
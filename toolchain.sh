@@ -75,6 +75,7 @@ function build_install_and_test {
   echo "installing your package (using the .whl in dist)"
   wheel_file=$(ls ./dist/*.whl)
   pip install $wheel_file --force-reinstall
+  warm_up_compiled_kernels
   run_tests
 }
 
@@ -86,6 +87,12 @@ function install_in_user_venv {
   wheel_file=$(ls ./dist/*.whl)
   source venv/bin/activate
   pip install $wheel_file --force-reinstall
+  warm_up_compiled_kernels
+}
+
+function warm_up_compiled_kernels {
+  echo "compiling the numba kernels once, such that they are loaded from the cache afterwards"
+  python -m openbus_light.warmup
 }
 
 function run_tests {